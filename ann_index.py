@@ -0,0 +1,227 @@
+import fcntl
+import os
+from contextlib import contextmanager
+import numpy as np
+from matching import normalize_rows, top_k
+
+# --- ANN-INDEX (IVF) ---
+# Inverted File Index: k-means-Zentroide teilen den Vektorraum in Listen.
+# Eine Anfrage scannt nur die `nprobe` nächsten Listen statt aller Profile.
+# nprobe ist der Regler zwischen Recall und Latenz (nprobe = n_lists -> exakte Suche).
+# Mit Filter (Raum, Geschlecht, Ziel) wird nprobe erweitert, bis k erlaubte Treffer gefunden sind.
+# Neue DNA-Einträge werden inkrementell einsortiert, ohne neu zu trainieren.
+# Die Listen halten nur ids. Bewertet werden die Kandidaten über `scores` – im LiveIndex die Matrix
+# des Matching-Index (gemeinsame float32-Matrix, int8/float16 aus quantization.py), damit es keine
+# zweite Vektor-Kopie pro App-Prozess gibt. Ohne `scores` (Benchmarks) hält der Index eine eigene Matrix.
+# Bearbeitete/gelöschte Profile wechseln in O(1) die Liste (Slot -> Liste/Position), gespeichert wird dabei nicht.
+# Die Index-Datei merkt sich den Stand von meta.jsonl (Byte-Position, Inode), bis zu dem sie alles enthält;
+# beim Laden werden nur die danach geschriebenen Meta-Zeilen nachgeholt. Geschrieben wird sie nur in
+# load_or_build, unter einem Datei-Lock und nur, wenn sie damit neuer wird (ein Schreiber, eigene .tmp je PID).
+
+INDEX_FILE = "ivf_index.npz"
+ANN_MIN_PROFILES = 500   # darunter ist der lineare Scan schneller (siehe SKALIERUNG.md)
+DEFAULT_NPROBE = 8
+SAVE_EVERY = 64          # nachsortierte Profile, ab denen die Index-Datei neu geschrieben wird
+
+
+def default_n_lists(n):
+    return max(1, min(4096, int(4 * np.sqrt(n))))
+
+
+class IVFIndex:
+    def __init__(self, centroids, nprobe=DEFAULT_NPROBE, scores=None):
+        self.centroids = normalize_rows(centroids)
+        self.nprobe = nprobe
+        self.dim = self.centroids.shape[1]
+        # optional: Callable (Anfrage, ids) -> Scores, dann ohne eigene Vektoren
+        self.scores = scores if scores is not None else self._own_scores
+        self._vectors = None if scores is not None else np.empty((0, self.dim), dtype=np.float32)
+        n_lists = self.centroids.shape[0]
+        # Pro Liste ein wachsender id-Puffer (Kapazität verdoppelt sich -> amortisiert O(1) pro Insert)
+        self._ids = [np.empty(0, dtype=np.int64) for _ in range(n_lists)]
+        self._sizes = np.zeros(n_lists, dtype=np.int64)
+        # id -> Liste (-1: in keiner) und Position darin
+        self._list_of = np.empty(0, dtype=np.int64)
+        self._pos_of = np.empty(0, dtype=np.int64)
+        self.state = None   # (meta_pos, meta_ino) des Stores, bis zu dem der Index alles einsortiert hat
+
+    @property
+    def n_lists(self):
+        return self.centroids.shape[0]
+
+    def __len__(self):
+        return int(self._sizes.sum())
+
+    # --- AUFBAU ---
+    @classmethod
+    def train(cls, vectors, n_lists=None, nprobe=DEFAULT_NPROBE, sample=50_000, seed=0, scores=None):
+        """Sphärisches k-means auf (einer Stichprobe) der normierten Vektoren."""
+        from sklearn.cluster import MiniBatchKMeans   # erst beim Training: scikit-learn bremst den Kaltstart
+        vectors = normalize_rows(vectors)
+        n_lists = n_lists or default_n_lists(len(vectors))
+        rng = np.random.default_rng(seed)
+        train_set = vectors if len(vectors) <= sample else vectors[rng.choice(len(vectors), sample, replace=False)]
+        kmeans = MiniBatchKMeans(n_clusters=min(n_lists, len(train_set)), random_state=seed,
+                                 batch_size=4096, n_init=1)
+        kmeans.fit(train_set)
+        index = cls(kmeans.cluster_centers_, nprobe=nprobe, scores=scores)
+        index.add(np.arange(len(vectors)), vectors)
+        return index
+
+    def assign(self, vectors):
+        return np.argmax(normalize_rows(vectors) @ self.centroids.T, axis=1)
+
+    def add(self, ids, vectors):
+        """Sortiert neue Vektoren in ihre Listen ein (inkrementell, ohne Retraining)."""
+        vectors = normalize_rows(vectors).reshape(-1, self.dim)
+        ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+        if self._vectors is not None:
+            self._store(ids, vectors)
+        lists = self.assign(vectors)
+        for l in np.unique(lists):
+            self._append(l, ids[lists == l])
+
+    def update(self, ids, vectors):
+        """Ersetzt die Vektoren bestehender ids (Profil bearbeitet/gelöscht): raus aus der alten Liste, neu einsortieren."""
+        self.remove(ids)
+        self.add(ids, vectors)
+
+    def remove(self, ids):
+        """Nimmt ids aus ihren Listen – O(1) je id: die letzte id der Liste rückt auf den frei gewordenen Platz."""
+        for i in np.unique(np.asarray(ids, dtype=np.int64).reshape(-1)):
+            if i >= len(self._list_of) or self._list_of[i] < 0:
+                continue
+            l, pos = self._list_of[i], self._pos_of[i]
+            last = self._sizes[l] - 1
+            moved = self._ids[l][last]
+            self._ids[l][pos] = moved
+            self._pos_of[moved] = pos
+            self._sizes[l] = last
+            self._list_of[i] = -1
+
+    def _append(self, l, ids):
+        size, extra = self._sizes[l], len(ids)
+        if size + extra > len(self._ids[l]):
+            grown = np.empty(max(16, 2 * (size + extra)), dtype=np.int64)
+            grown[:size] = self._ids[l][:size]
+            self._ids[l] = grown
+        self._ids[l][size:size + extra] = ids
+        self._sizes[l] += extra
+        needed = int(ids.max()) + 1 if extra else 0
+        if needed > len(self._list_of):
+            capacity = max(needed, 2 * len(self._list_of))
+            self._list_of = np.concatenate([self._list_of, np.full(capacity - len(self._list_of), -1, np.int64)])
+            self._pos_of = np.concatenate([self._pos_of, np.zeros(capacity - len(self._pos_of), np.int64)])
+        self._list_of[ids] = l
+        self._pos_of[ids] = np.arange(size, size + extra)
+
+    def _store(self, ids, vectors):
+        """Eigene Matrix (nur ohne `scores`): Zeile = id, wächst wie die Listen."""
+        needed = int(ids.max()) + 1 if len(ids) else 0
+        if needed > len(self._vectors):
+            grown = np.zeros((max(needed, 2 * len(self._vectors)), self.dim), dtype=np.float32)
+            grown[:len(self._vectors)] = self._vectors
+            self._vectors = grown
+        self._vectors[ids] = vectors
+
+    def _own_scores(self, query, ids):
+        return self._vectors[ids] @ normalize_rows(query).ravel()
+
+    # --- SUCHE ---
+    def search(self, vector, k=5, nprobe=None, allowed=None):
+        """Top-k (ids, scores). `allowed` ist eine optionale Bool-Maske über die ids.
+
+        Bleiben in den geprobten Listen nach dem Filter weniger als k Treffer übrig (z.B. ein kleiner
+        Embedding-Raum), wird nprobe vervierfacht, bis k Treffer da sind oder alle Listen gescannt
+        sind – dann ist die Suche exakt über die erlaubten ids.
+        """
+        query = normalize_rows(vector).ravel()
+        nprobe = min(nprobe or self.nprobe, self.n_lists)
+        order = np.argsort(-(self.centroids @ query), kind="stable")
+        ids, scores, probed = [], [], 0
+        while True:
+            found = [self._ids[l][:self._sizes[l]] for l in order[probed:nprobe]]
+            found = np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+            if allowed is not None:
+                found = found[allowed[found]]
+            # Sortierte ids: ein vorwärts laufender Gather über die Matrix
+            found.sort()
+            ids.append(found)
+            scores.append(self.scores(query, found) if len(found) else np.empty(0, dtype=np.float32))
+            probed = nprobe
+            if sum(map(len, ids)) >= k or probed == self.n_lists:
+                break
+            nprobe = min(4 * nprobe, self.n_lists)
+        ids, scores = np.concatenate(ids), np.concatenate(scores)
+        best = top_k(scores, k)
+        return ids[best], scores[best]
+
+    # --- PERSISTENZ ---
+    def save(self, path):
+        ids = np.concatenate([self._ids[l][:s] for l, s in enumerate(self._sizes)])
+        vectors = self._vectors[:int(ids.max()) + 1 if len(ids) else 0] if self._vectors is not None else None
+        extra = {} if vectors is None else {"vectors": vectors}
+        if self.state is not None:
+            extra["state"] = np.array(self.state, dtype=np.int64)
+        tmp = f"{path}.{os.getpid()}.tmp.npz"   # eigene Datei je Prozess, sichtbar erst per rename
+        np.savez(tmp, centroids=self.centroids, sizes=self._sizes, ids=ids, nprobe=self.nprobe, **extra)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path, scores=None):
+        with np.load(path) as data:
+            index = cls(data["centroids"], nprobe=int(data["nprobe"]), scores=scores)
+            ids, sizes = data["ids"], data["sizes"]
+            if "state" in data.files:
+                index.state = tuple(int(x) for x in data["state"])
+            if scores is None:
+                index._store(np.arange(len(data["vectors"])), data["vectors"])
+        offsets = np.concatenate([[0], np.cumsum(sizes)])
+        for l in range(index.n_lists):
+            start, end = offsets[l], offsets[l + 1]
+            if end > start:
+                index._append(l, ids[start:end])
+        return index
+
+    @classmethod
+    def load_or_build(cls, store, path=None, nprobe=DEFAULT_NPROBE, scores=None):
+        """Lädt den Index und holt nach, was seit dem Speichern in meta.jsonl steht.
+
+        Neue Slots (ab len(index)) werden einsortiert, bearbeitete/gelöschte neu zugeordnet. Passt die Datei
+        nicht mehr zum Store (reset, Kompaktierung, neue Spalte), wird neu trainiert. Der Datei-Lock sorgt
+        dafür, dass mehrere App-Prozesse nicht gleichzeitig trainieren: der erste schreibt, die anderen laden.
+        """
+        path = path or os.path.join(store.root, INDEX_FILE)
+        meta_pos, meta_ino = store.position()
+        with _file_lock(path):
+            index = cls.load(path, scores=scores) if os.path.exists(path) else None
+            if index is not None and index.dim == store.dim and len(index) <= len(store) \
+                    and (index.state is None or (index.state[1] == meta_ino and index.state[0] <= meta_pos)):
+                known, legacy = len(index), index.state is None   # legacy: Datei ohne Stand (ältere Version)
+                changed = ([] if legacy else
+                           sorted({e["slot"] for e in store.entries_since(index.state[0]) if e["slot"] < known}))
+                if changed:
+                    index.update(changed, store.vectors()[changed])
+                if known < len(store):
+                    index.add(np.arange(known, len(store)), store.vectors()[known:])
+                index.state = (meta_pos, meta_ino)
+                if legacy or len(changed) + len(store) - known >= SAVE_EVERY:
+                    index.save(path)
+            else:
+                # Kein Index oder der Store wurde neu aufgebaut (reset) -> neu trainieren
+                index = cls.train(store.vectors(), nprobe=nprobe, scores=scores)
+                index.state = (meta_pos, meta_ino)
+                index.save(path)
+        return index
+
+
+@contextmanager
+def _file_lock(path):
+    """Ein Prozess zur Zeit lädt/trainiert/schreibt die Index-Datei `path`."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path + ".lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
@@ -1,18 +1,29 @@
+import time
+_SCRIPT_T0 = time.perf_counter()   # Ladezeit des Skripts (Admin -> Performance: script_load)
 import streamlit as st
-import json
 import os
 import datetime
 import uuid
 import hashlib
 import re
+import math
 import html
+import platform
 import numpy as np
-import plotly.graph_objects as go
-from openai import OpenAI
 from dotenv import load_dotenv
-import telebot
-import psutil
-from cryptography.fernet import Fernet
+import crypto_layer
+from matching import UNKNOWN_GENDER, SharedMatchingIndex, target_of
+from reciprocal_matches import MATCH_FILE, MatchTable
+from live_index import LiveIndex
+from version import VERSION, VERSION_VIBE
+from quantization import QuantizedIndex
+from profile_store import ProfileStore, SpaceChanged
+from embedding_backends import get_backend, space_of
+from metrics import METRICS
+from rate_limit import VIBE_CHECKS_PER_HOUR, RateLimiter
+from sharding import region_hash
+from snapshots import purge_all, snapshotter_from_env
+from multi_vector import MULTI_PRUNE, ChunkSets, embed_manifesto, embed_manifestos
 
 # --- INITIALISIERUNG & KONFIG ---
 # 1. Pfade definieren
@@ -27,31 +38,76 @@ env_targets = [
 
 # 3. .env laden
 # Wir gehen die Liste durch. Das aktuelle Element heißt "target".
-for target in env_targets:
-    if os.path.exists(target):          # Prüfe das einzelne "target"
-        load_dotenv(target, override=True) # Lade das einzelne "target"
-        break                           # Stop, wenn eine gefunden wurde
+with METRICS.stage("env"):
+    for target in env_targets:
+        if os.path.exists(target):          # Prüfe das einzelne "target"
+            load_dotenv(target, override=True) # Lade das einzelne "target"
+            break                           # Stop, wenn eine gefunden wurde
 
-VERSION = "v0.4.1-ARCHITECT"
 APP_NAME = "I AM"  # Hier direkt das neue Branding setzen
 
+# Kompakte Vektoren im RAM (siehe quantization.py): float32 | float16 | int8
+VECTOR_PRECISION = os.getenv("AIM_VECTOR_PRECISION", "float32")
+VECTOR_DIMS = int(os.getenv("AIM_VECTOR_DIMS", "0")) or None
+RERANK = int(os.getenv("AIM_RERANK", "50"))
+# float32: alle App-Prozesse lesen dieselbe normierte Matrix (profile_store.SharedMatrix) statt je einer Kopie
+SHARED_MATRIX = VECTOR_PRECISION == "float32" and not VECTOR_DIMS
+
+# --- CACHING ÜBER RERUNS ---
+# Streamlit führt main() bei jeder Interaktion neu aus. Client, Cipher, Store und
+# Index leben deshalb als cache_resource im Prozess; der Index gleicht sich pro
+# Anfrage per stat() mit dem Store ab und hängt nur neue Profile an.
+@st.cache_resource
+def _backend_for(embedding):
+    return get_backend(embedding=embedding)
+
+def get_embedding_backend():
+    """openai | local | auto laut AIM_EMBEDDING_BACKEND (siehe embedding_backends.py).
+
+    Nach `reembed.py switch` nennt manifest.json das Ziel-Backend: der Index lädt den Store neu
+    (neue generation) und jeder Raum bekommt sein eigenes gecachtes Backend – ohne App-Neustart.
+    """
+    live = get_live_index()
+    live.refresh()
+    return _backend_for(live.store.embedding)
+
+@st.cache_resource
+def _cipher_for(keys):
+    return crypto_layer.build_cipher(keys)
+
+@st.cache_resource
+def get_live_index(version=VERSION):
+    return LiveIndex(ProfileStore(), build=build_index, shared=SHARED_MATRIX)
+
+def get_profile_store():
+    return get_live_index().store
+
+@st.cache_resource
+def get_chunk_sets(version=VERSION):
+    """Abschnitts-Vektoren der Manifeste (multi_vector.py) neben dem Profil-Store."""
+    return ChunkSets(get_profile_store())
+
 # --- SECURITY & VERSCHLÜSSELUNG ---
 def get_cipher():
-    """Nutzt den Key aus .env oder secrets.toml für AES-Verschlüsselung."""
-    key = os.getenv("ENCRYPTION_KEY") or st.secrets.get("ENCRYPTION_KEY")
-    if not key:
+    """Nutzt den Key aus .env oder secrets.toml für AES-Verschlüsselung (einmal gebaut, dann gecacht)."""
+    try:
+        with METRICS.stage("env"):
+            keys = crypto_layer.load_keys(st.secrets)
+        return _cipher_for(keys)
+    except RuntimeError:
         st.error("🚨 KRITISCHER FEHLER: ENCRYPTION_KEY nicht gefunden!")
         st.stop()
-    return Fernet(key.encode())
+
+def get_region_key():
+    """HMAC-Key für den Regions-Hash: der Ort landet nur verschlüsselt bzw. gehasht in der DB."""
+    with METRICS.stage("env"):
+        return crypto_layer.load_region_key(st.secrets)
 
 def encrypt_data(data):
-    return get_cipher().encrypt(data.encode()).decode() if data else ""
+    return crypto_layer.encrypt_value(data, get_cipher())
 
 def decrypt_data(token):
-    try:
-        return get_cipher().decrypt(token.encode()).decode()
-    except Exception:
-        return "[Entschlüsselungsfehler]"
+    return crypto_layer.decrypt_value(token, get_cipher())
 
 def sanitize_input(text):
     if not text: return ""
@@ -63,82 +119,327 @@ def hash_key(vibe_key):
 
 # --- HELFER-FUNKTIONEN ---
 def calculate_similarity(vec1, vec2):
-    v1, v2 = np.array(vec1), np.array(vec2)
-    return np.dot(v1, v2) / (np.linalg.norm(v1) * np.linalg.norm(v2))
+    """Einzelvergleich zweier Vektoren. Für die Suche über die DB: matching.MatchingIndex."""
+    v1, v2 = np.asarray(vec1, dtype=np.float32), np.asarray(vec2, dtype=np.float32)
+    return float(np.dot(v1, v2) / (np.linalg.norm(v1) * np.linalg.norm(v2)))
+
+def build_index(store):
+    if SHARED_MATRIX:
+        return SharedMatchingIndex.from_store(store)
+    return QuantizedIndex.from_store(store, precision=VECTOR_PRECISION, dims=VECTOR_DIMS, rerank=RERANK)
+
+def find_matches(vector, k=5, exclude=None, chunks=None, **filters):
+    """Top-k Resonanz über die ganze DB: ein Mat-Vec-Produkt statt n Einzelvergleiche.
+
+    `chunks`: Abschnitte + Gewichte des Manifests -> die besten MULTI_PRUNE Kandidaten des
+    Profil-Vektors werden per Max-Sim über alle Abschnitte neu bewertet.
+    """
+    live = get_live_index()
+    if chunks is None:
+        hits = live.query(vector, k=k, exclude=exclude, **filters)
+    else:
+        candidates = live.query(vector, k=max(k, MULTI_PRUNE), exclude=exclude, **filters)
+        with METRICS.stage("matching"):
+            hits = get_chunk_sets().rerank([i for i, _ in candidates], *chunks, k=k)
+    # Lazy: entschlüsselt wird nur, was von den Top-k tatsächlich angezeigt wird
+    cipher = get_cipher()
+    return [(crypto_layer.LazyProfile(live.store.record(i), cipher), score) for i, score in hits]
+
+@st.cache_resource
+def _match_table(path, mtime):
+    return MatchTable(path)
+
+def get_match_table():
+    """Nächtlich vorberechnete Tabelle (reciprocal_matches.py); neu geladen, sobald die Datei ersetzt wurde."""
+    path = os.path.join(get_profile_store().root, MATCH_FILE)
+    try:
+        return _match_table(path, os.path.getmtime(path))
+    except FileNotFoundError:
+        return None
+
+def find_mutual_matches(slot, vector, record, k=5, regional=False):
+    """Gegenseitige Matches: aus der Nacht-Tabelle in O(1), für neue/geänderte Profile live mit beidseitigem Filter.
+
+    `regional`: nur der Shard der eigenen Region (die Nacht-Tabelle ist bundesweit).
+    """
+    region = record.get("region") if regional else None
+    table = get_match_table()
+    if not region and table is not None and slot in table and record.get("timestamp", "") <= table.built:
+        store = get_profile_store()
+        with METRICS.stage("matching"):
+            hits = [(i, score) for i, score in table.lookup(slot)
+                    if not store.record(i).get("deleted")][:k]   # seit der Nacht gelöschte raus
+        cipher = get_cipher()
+        return [(crypto_layer.LazyProfile(store.record(i), cipher), score) for i, score in hits]
+    return find_matches(vector, k=k, exclude=slot, chunks=get_chunk_sets().of(slot), gender=record.get("gender", UNKNOWN_GENDER),
+                        target_gender=target_of(record), space=space_of(record), region=region)
+
+@st.cache_resource
+def get_rate_limiter():
+    return RateLimiter()
+
+def rate_limit_keys():
+    """Limit gilt pro Session UND pro Vibe-Key (überlebt so auch einen neuen Tab)."""
+    session_id = st.session_state.setdefault("session_id", str(uuid.uuid4()))
+    keys = [f"session:{session_id}"]
+    if st.session_state.get("vibe_key_hash"):
+        keys.append(f"vibe:{st.session_state['vibe_key_hash']}")
+    return keys
+
+@st.cache_resource
+def get_notifier():
+    """Ein Bot + Worker-Thread pro Prozess (None ohne Telegram-Konfiguration)."""
+    from notifier import notifier_from_env   # telebot erst beim ersten Versand laden
+    return notifier_from_env()
 
 def send_telegram_msg(msg, silent=False):
-    token = os.getenv("TELEGRAM_BOT_TOKEN")
-    admin_id = os.getenv("TELEGRAM_ADMIN_ID")
-
-    if token and admin_id:
-        try:
-            bot = telebot.TeleBot(token)
-            # Nur das int() lassen wir zur Sicherheit, da IDs immer Zahlen sind
-            bot.send_message(int(admin_id), msg, parse_mode='Markdown', disable_notification=silent)
-        except Exception as e:
-            st.error(f"Telegram-Fehler: {e}")
+    """Nicht-blockierend: der Versand läuft im Hintergrund (gebündelt, rate-limitiert, mit Outbox)."""
+    notifier = get_notifier()
+    if notifier:
+        with METRICS.stage("telegram"):
+            notifier.notify(msg, silent=silent)
+
+@st.cache_resource
+def get_snapshotter():
+    """Ein Snapshot-Thread pro Prozess (None bei AIM_SNAPSHOT_INTERVAL=0); blockiert nie das Rendern."""
+    return snapshotter_from_env()
+
+# --- SCHREIBEN IM AKTUELLEN EMBEDDING-RAUM ---
+SPACE_CHANGED = ("🔀 Das Matching wurde gerade auf ein neues Modell umgestellt, deine Eingabe ist nicht "
+                 "gespeichert. Bitte versuche es in einem Moment noch einmal.")
+
+def in_current_space(backend, write):
+    """write(backend) – hat reembed.py den Store dazwischen umgestellt (SpaceChanged, geprüft unter dem
+    Schreib-Lock), wird einmal mit dem Backend des neuen Raums neu eingebettet; sonst Hinweis statt Absturz, None."""
+    try:
+        return write(backend)
+    except SpaceChanged:
+        METRICS.count("space_changed")
+    try:
+        return write(get_embedding_backend())
+    except SpaceChanged:
+        st.warning(SPACE_CHANGED)
+        return None
+
+def create_dna(backend, manifesto, name, loc, contact, vibe_key):
+    """Bettet ein, verschlüsselt und speichert eine neue DNA. Liefert (Slot, Vektor, Datensatz)."""
+    with METRICS.stage("embedding"):
+        emb, chunk_vectors, weights = embed_manifesto(backend, manifesto)
+    with METRICS.stage("encryption"):
+        name_enc, loc_enc, contact_enc, manifesto_enc = crypto_layer.encrypt_many(
+            [name, loc, contact, manifesto], get_cipher())
+    record = backend.tag({
+        "name": name_enc,
+        "gender": UNKNOWN_GENDER, "target_gender": "all",
+        "loc": loc_enc,
+        "region": region_hash(loc, get_region_key()),
+        "contact": contact_enc,
+        "vibe_key_hash": hash_key(vibe_key),
+        "vector": emb,
+        "chunks": get_chunk_sets().add(chunk_vectors, weights),
+        "timestamp": datetime.datetime.now().isoformat(),
+        "manifesto": manifesto_enc
+    })
+    slot, = get_live_index().add([record])
+    return slot, emb, record
+
+def update_manifesto(backend, slot, manifesto):
+    """Neues Manifest für einen bestehenden Eintrag (Vektor an Ort und Stelle). Liefert den neuen Datensatz."""
+    with METRICS.stage("embedding"):
+        emb, chunk_vectors, weights = embed_manifesto(backend, manifesto)
+    with METRICS.stage("encryption"):
+        manifesto_enc = encrypt_data(manifesto)
+    return get_live_index().update(slot, backend.tag({
+        "vector": emb, "manifesto": manifesto_enc,
+        "chunks": get_chunk_sets().add(chunk_vectors, weights),
+        "timestamp": datetime.datetime.now().isoformat(),
+    }))
 
 # --- TEST-USER INJEKTOR ---
-def inject_test_users(client):
+def inject_test_users(backend):
     """Erzeugt Test-Profile für den Vibe-Check."""
     test_data = [
         {"name": "Techno Marc (Test)", "loc": "Lützow", "manifesto": "Ich liebe treibende Beats, ARM-Server und effizienten Code.", "contact": "@test_admin"},
         {"name": "Yoga Yvonne (Test)", "loc": "Hamburg", "manifesto": "Achtsamkeit, Meditation und spirituelle Energie sind mein Weg.", "contact": "@test_yoga"}
     ]
     
-    db = []
-    if os.path.exists('profiles_db.json'):
-        with open('profiles_db.json', 'r') as f: db = json.load(f)
-
-    for profile in test_data:
-        emb = client.embeddings.create(input=profile['manifesto'], model="text-embedding-3-small").data[0].embedding
+    # Alle Abschnitte aller Manifeste in einem gebatchten Request
+    embeddings = embed_manifestos(backend, [profile['manifesto'] for profile in test_data])
+    records = []
+    for profile, (emb, chunk_vectors, weights) in zip(test_data, embeddings):
         record = {
             "name": encrypt_data(profile['name']),
             "gender": "m", "target_gender": "all",
             "loc": encrypt_data(profile['loc']),
+            "region": region_hash(profile['loc'], get_region_key()),
             "contact": encrypt_data(profile['contact']),
+            "manifesto": encrypt_data(profile['manifesto']),   # sonst bei reembed.py nicht neu einbettbar
             "vibe_key_hash": hash_key(str(uuid.uuid4())),
             "vector": emb,
+            "chunks": get_chunk_sets().add(chunk_vectors, weights),
             "timestamp": datetime.datetime.now().isoformat(),
             "is_test": True
         }
-        db.append(record)
-    
-    with open('profiles_db.json', 'w') as f:
-        json.dump(db, f, indent=2)
+        records.append(backend.tag(record))
+
+    # Anhängen statt die komplette DB neu zu schreiben
+    get_live_index().add(records)
+    snapshotter = get_snapshotter()
+    if snapshotter:
+        snapshotter.trigger()   # Seed-Läufe sofort sichern
     st.success(f"{len(test_data)} Test-User erfolgreich injiziert!")
 
+# --- UI: EIGENER EINTRAG ---
+def show_my_entry(backend):
+    code = st.text_input("Dein persönlicher Code", type="password", key="my_code")
+    if not code:
+        return
+    live = get_live_index()
+    live.refresh()
+    slot = live.store.lookup(hash_key(code.strip()))
+    if slot is None:
+        st.warning("Kein Eintrag zu diesem Code gefunden.")
+        return
+    record = live.store.record(slot)
+    profile = crypto_layer.LazyProfile(record, get_cipher())
+    st.write(f"Eintrag: **{profile['name']}** · {profile['loc']}")
+
+    new_manifesto = st.text_area("Neues Manifesto", key="my_manifesto")
+    c1, c2 = st.columns(2)
+    if c1.button("Manifesto aktualisieren") and new_manifesto:
+        st.session_state["vibe_key_hash"] = record["vibe_key_hash"]
+        allowed, retry_after = get_rate_limiter().acquire(rate_limit_keys())
+        if not allowed:
+            st.warning(f"⏳ Nächster Vibe-Check in ca. {math.ceil(retry_after / 60)} Minuten.")
+        else:
+            with METRICS.request("update"):
+                updated = in_current_space(backend, lambda b: update_manifesto(b, slot, new_manifesto))
+            if updated:
+                get_chunk_sets().remove(record)
+                record = updated
+                st.success("Dein Manifesto ist aktualisiert.")
+    if c2.button("Eintrag endgültig löschen"):
+        live.delete(slot)
+        get_chunk_sets().remove(record)
+        # Alte Zeilen sofort physisch entfernen, auch aus den Backups (DSGVO)
+        snapshotter = get_snapshotter()
+        if snapshotter:
+            snapshotter.trigger()
+        else:
+            purge_all(live.store.root)
+        send_telegram_msg(f"🗑️ Eintrag gelöscht (Slot {slot})", silent=True)
+        st.success("Dein Eintrag ist gelöscht und taucht in keinem Matching mehr auf.")
+        return
+
+    matches = find_mutual_matches(slot, live.store.vectors()[slot], record)
+    if matches:
+        st.caption("Deine gegenseitigen Matches")
+        for match, score in matches:
+            st.write(f"**{match['name']}** · {score:.1%}")
+
 # --- UI: ADMIN BEREICH ---
-def show_admin_dashboard(client):
+def show_admin_dashboard(backend):
     st.divider()
     st.subheader("🛡️ AIM-Vibe Engine - Admin Control")
     admin_pwd = st.text_input("Master Password", type="password")
     
     if admin_pwd == st.secrets["ADMIN_PASSWORD"]:
+        import psutil   # nur im Admin-Bereich gebraucht
         st.success("Willkommen im Maschinenraum, Marc.")
         col1, col2, col3 = st.columns(3)
-        col1.metric("Server", "CAX11 ARM", "Hetzner")
+        col1.metric("Server", platform.node(), f"{platform.machine()} · {os.cpu_count()} CPUs")
         col2.metric("CPU", f"{psutil.cpu_percent()}%")
         col3.metric("RAM", f"{psutil.virtual_memory().percent}%")
 
         if st.button("🧪 Test-User (Seed) injizieren"):
-            inject_test_users(client)
+            inject_test_users(backend)
+
+        # Nur die angezeigten Zeilen entschlüsseln, nicht die ganze DB
+        store = get_profile_store()
+        latest = [store.record(slot) for slot in range(len(store) - 1, max(len(store) - 11, -1), -1)]
+        latest = [record for record in latest if not record.get("deleted")]
+        if latest:
+            st.caption("Letzte Einträge")
+            rows = crypto_layer.reveal_records(latest, get_cipher(), fields=("name", "loc"))
+            st.dataframe([{"Name": r["name"], "Ort": r["loc"], "Zeit": r.get("timestamp", "")} for r in rows])
+
+        show_snapshot_status()
+        show_performance_panel()
+
+def show_snapshot_status():
+    """Letzter Snapshot dieses Prozesses; 'Jetzt sichern' weckt nur den Hintergrund-Thread."""
+    snapshotter = get_snapshotter()
+    if snapshotter is None:
+        st.caption("💾 Snapshots deaktiviert (AIM_SNAPSHOT_INTERVAL=0).")
+        return
+    if snapshotter.error:
+        st.error(f"💾 Letzter Snapshot fehlgeschlagen: {snapshotter.error}")
+    elif snapshotter.last:
+        last = snapshotter.last
+        st.caption(f"💾 Letzter Snapshot: {last['created'][:19]} · {last['kind']} · "
+                   f"{last['count']} Profile · {last['bytes'] / 1024:.0f} KB")
+    else:
+        st.caption("💾 Noch kein Snapshot in diesem Prozess.")
+    if st.button("💾 Jetzt sichern"):
+        snapshotter.trigger()
+
+def show_performance_panel():
+    """Hot-Path-Metriken: API-Verbrauch und Kosten nach KOSTEN.md über alle Prozesse, Latenzen dieses Prozesses."""
+    import plotly.graph_objects as go   # plotly erst beim Öffnen des Panels laden
+    st.subheader("⏱️ Performance")
+    summary = METRICS.summary()
+    counters = METRICS.counter_totals()
+    cost = METRICS.cost_estimate(counters)
+    m1, m2, m3, m4 = st.columns(4)
+    dna = summary.get("request_dna", {})
+    m1.metric("DNA-Requests", counters.get("dna_created", 0), f"p50 {dna.get('p50_ms', 0):.0f} ms (dieser Prozess)")
+    m2.metric("API-Calls", counters.get("embedding_api_calls", 0), f"{counters.get('embedding_tokens', 0)} Tokens")
+    m3.metric("Kosten (variabel)", f"{cost['variable_eur']:.4f} €", f"Formel: {cost['formula_eur']:.2f} €")
+    m4.metric("Guthaben (Schätzung)", f"{cost['credit_left_eur']:.2f} €")
+
+    st.caption(f"Zähler und Kosten: alle Prozesse seit Beginn der Zählung ({os.path.basename(METRICS.path)}) · "
+               f"Latenzen und Spuren: nur dieser Prozess (PID {os.getpid()}).")
+    if not summary:
+        st.caption("Noch keine Messwerte in diesem Prozess.")
+        return
+
+    # Letzte Requests nach Stufe aufgeschlüsselt: der dickste Balken ist der Flaschenhals
+    traces = list(METRICS.traces)
+    if traces:
+        stages = sorted({stage for trace in traces for stage in trace["stages"]})
+        fig = go.Figure([go.Bar(name=stage, x=list(range(len(traces))),
+                                y=[trace["stages"].get(stage, 0) * 1000 for trace in traces]) for stage in stages])
+        fig.update_layout(barmode="stack", height=300, margin=dict(l=0, r=0, t=30, b=0),
+                          title="Letzte Requests nach Stufe (ms)", xaxis_title="Request", yaxis_title="ms")
+        st.plotly_chart(fig, width="stretch")
+
+    # Rollende Verteilung je Stufe
+    fig = go.Figure([go.Box(name=stage, y=METRICS.samples(stage), boxpoints=False) for stage in summary])
+    fig.update_layout(height=300, margin=dict(l=0, r=0, t=30, b=0), title="Latenz je Stufe (rollend, ms)",
+                      yaxis_type="log", showlegend=False)
+    st.plotly_chart(fig, width="stretch")
+    st.dataframe([{"Stufe": stage, "Anzahl": s["count"], "p50 ms": round(s["p50_ms"], 2),
+                   "p99 ms": round(s["p99_ms"], 2), "max ms": round(s["max_ms"], 2)}
+                  for stage, s in summary.items()])
+
+    METRICS.export()
+    st.download_button("📈 Prometheus-Export", METRICS.prometheus_text(), file_name="aim_metrics.prom")
 
 # --- MAIN APP ---
 # --- NEU: DESIGN INJEKTION ---
 # --- NEU: DESIGN INJEKTION (Das volle AIM-Vibe CSS) ---
 def apply_minimalist_theme():
-    st.markdown(f"""
+    st.markdown("""
         <style>
         /* Grundlayout */
-        .stApp {{ background-color: #F8F9FA; color: #222; }}
+        .stApp { background-color: #F8F9FA; color: #222; }
         
         /* Branding Header */
-        .brand-header {{
+        .brand-header {
             text-align: center;
             padding: 40px 0 20px 0;
-        }}
-        .brand-title {{
+        }
+        .brand-title {
             font-size: 7rem;
             font-weight: 900;
             letter-spacing: 0.5rem;
@@ -147,54 +448,54 @@ def apply_minimalist_theme():
             color: #000;
             text-transform: uppercase;
             display: block;
-        }}
-        .brand-subtitle {{
+        }
+        .brand-subtitle {
             font-size: 1.1rem;
             color: #777;
             font-weight: 300;
             margin-top: 10px;
-        }}
+        }
 
         /* Mona Lisa & Visual Anchor */
-        .visual-anchor {{
+        .visual-anchor {
             display: flex;
             flex-direction: column;
             gap: 25px;
             margin-top: 54px; /* Exakter Versatz für Oberkanten-Alignment */
-        }}
-        .m-box {{
+        }
+        .m-box {
             display: flex;
             align-items: flex-start;
             gap: 20px;
             height: 100px;
-        }}
-        .m-img-container {{
+        }
+        .m-img-container {
             width: 100px; height: 100px;
             overflow: hidden;
             border-radius: 4px;
             border: 1px solid #eee;
             flex-shrink: 0;
-        }}
-        .m-img-container img {{ width: 100%; height: 100%; object-fit: cover; }}
-        .img-low img {{ filter: grayscale(100%) blur(8px) contrast(200%); transform: scale(1.1); }}
-        .img-high img {{ filter: grayscale(100%) contrast(110%); }}
+        }
+        .m-img-container img { width: 100%; height: 100%; object-fit: cover; }
+        .img-low img { filter: grayscale(100%) blur(8px) contrast(200%); transform: scale(1.1); }
+        .img-high img { filter: grayscale(100%) contrast(110%); }
 
         /* Typo-Simulation */
-        .m-skeleton {{
+        .m-skeleton {
             flex-grow: 1;
             background-image: repeating-linear-gradient(
                 to bottom, #e0e0e0, #e0e0e0 12px, transparent 12px, transparent 22px
             );
-        }}
-        .sk-low {{ height: 34px; width: 40%; }}
-        .sk-high {{ height: 100%; width: 90%; }}
+        }
+        .sk-low { height: 34px; width: 40%; }
+        .sk-high { height: 100%; width: 90%; }
 
         /* Streamlit Widgets anpassen */
-        .stTextArea textarea {{ background-color: #fafafa !important; border: 2px solid #e0e0e0 !important; }}
-        .stTextInput input {{ background-color: #fafafa !important; border: 2px solid #e0e0e0 !important; }}
+        .stTextArea textarea { background-color: #fafafa !important; border: 2px solid #e0e0e0 !important; }
+        .stTextInput input { background-color: #fafafa !important; border: 2px solid #e0e0e0 !important; }
         
         /* Der schwarze Button */
-        div.stButton > button {{
+        div.stButton > button {
             background-color: #000 !important;
             color: #fff !important;
             border: none !important;
@@ -203,28 +504,27 @@ def apply_minimalist_theme():
             text-transform: uppercase !important;
             width: 100% !important;
             border-radius: 0px !important;
-        }}
+        }
         
         /* Footer Box */
-        .footer-box {{
+        .footer-box {
             background-color: #e9ecef;
             padding: 30px;
             margin-top: 50px;
             font-size: 0.9rem;
             color: #444;
-        }}
+        }
         </style>
     """, unsafe_allow_html=True)
 
 # --- MAIN APP ---
 def main():
     # 1. Config & Theme
-    VERSION_VIBE = "v0.4.0-AIM-VIBE"
-    st.set_page_config(page_title=f"I AM | AIM", page_icon="🎯", layout="wide")
+    st.set_page_config(page_title="I AM | AIM", page_icon="🎯", layout="wide")
     apply_minimalist_theme()
     
-    # OpenAI Client Initialisierung
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    # Sicherung des Stores im Hintergrund (inkrementell, siehe snapshots.py)
+    get_snapshotter()
 
     # 2. Beta-Schutz (unverändert)
     if "authenticated" not in st.session_state:
@@ -239,9 +539,12 @@ def main():
                 st.rerun()
         st.stop()
 
+    # Embedding-Backend (OpenAI oder lokal auf der CPU) – passend zum Raum des Stores
+    backend = get_embedding_backend()
+
     # 3. Sidebar Admin (Optional)
     if st.sidebar.checkbox("Admin-Bereich"):
-        show_admin_dashboard(client)
+        show_admin_dashboard(backend)
 
     # 4. Branding Header
     st.markdown(f"""
@@ -290,17 +593,49 @@ def main():
     u_name = sanitize_input(c1.text_input("Identität", placeholder="Name / Pseudonym", help="Wie du im System geführt werden willst."))
     u_loc = sanitize_input(c2.text_input("Präsenz", placeholder="Ort / Heimat", help="Dein Standort für regionales Matching."))
     u_contact = sanitize_input(c3.text_input("Signal", placeholder="Telegram Handle", help="Dein verschlüsselter Rückkanal."))
+    radius = st.selectbox("Suchradius", ["Egal (überall)", "Nur meine Region"],
+                          help="Regional wird nur in deinem Regions-Shard gesucht (Ort als Hash, nie im Klartext).")
 
     # 7. Button & Matching Logik
     if st.button("ERZEUGE MEINE DIGITALE DNA FÜR DAS MATCHING [I AM]"):
-        if u_name and manifesto and u_contact:
+        complete = bool(u_name and manifesto and u_contact)
+        # Nur vollständige Eingaben verbrauchen einen Vibe-Check
+        allowed, retry_after = get_rate_limiter().acquire(rate_limit_keys()) if complete else (True, 0.0)
+        if not allowed:
+            st.warning(f"⏳ Maximal {VIBE_CHECKS_PER_HOUR:g} Vibe-Checks pro Stunde. "
+                       f"Nächster Versuch in ca. {math.ceil(retry_after / 60)} Minuten.")
+        elif complete:
             st.info("AIM analysiert die Geometrie deiner Resonanz...")
-            # ... DEINE BESTEHENDE EMBEDDING & DB LOGIK HIER ...
+            vibe_key = str(uuid.uuid4())
+            # Eine Spur pro DNA: welche Stufe macht den Request langsam? (Admin -> Performance)
+            with METRICS.request("dna"):
+                stored = in_current_space(backend, lambda b: create_dna(b, manifesto, u_name, u_loc, u_contact, vibe_key))
+                if stored:
+                    slot, emb, record = stored
+                    METRICS.count("dna_created")
+                    send_telegram_msg(f"🧬 Neue DNA erzeugt (Slot {slot})", silent=True)
+                    # Nur gegenseitige Treffer aus demselben Vektorraum
+                    matches = find_mutual_matches(slot, emb, record, regional=radius == "Nur meine Region")
+                    with METRICS.stage("decryption"):
+                        names = [(match["name"], score) for match, score in matches]
+            METRICS.export()
+            if stored:
+                st.success("Deine DNA ist gespeichert. Dein persönlicher Code:")
+                st.code(vibe_key)
+                st.session_state["vibe_key_hash"] = hash_key(vibe_key)
+            if stored and names:
+                st.subheader("Deine Resonanz-Matches")
+                for name, score in names:
+                    st.write(f"**{name}** · {score:.1%}")
         else:
             st.warning("Bitte alle Felder ausfüllen, um eine präzise DNA zu erzeugen.")
 
-    # 8. Footer (Transparenz Box)
-    st.markdown(f"""
+    # 8. Eigenen Eintrag bearbeiten / löschen (per persönlichem Code, O(1) über den Schlüssel-Index)
+    with st.expander("🔑 Mein Eintrag (persönlicher Code)"):
+        show_my_entry(backend)
+
+    # 9. Footer (Transparenz Box)
+    st.markdown("""
         <div class="footer-box">
             <h3>Beta-Status & Transparenz</h3>
             <p>Wir befinden uns aktuell im <strong>Beta-Stadium</strong>. Bitte seht es uns nach, falls noch nicht alles 100% rund läuft.<br>
@@ -310,5 +645,8 @@ def main():
         </div>
     """, unsafe_allow_html=True)
 
+# Erster Lauf nach dem Aufwachen = Kaltstart (Imports); danach nur noch der Rerun-Overhead
+METRICS.observe("script_load", time.perf_counter() - _SCRIPT_T0, traced=False)
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,72 @@
+import argparse
+import json
+import time
+import numpy as np
+from ann_index import IVFIndex
+from matching import top_k
+from synthetic_profiles import clustered_vectors
+
+# --- BENCHMARK: ANN (IVF) vs. EXAKTE COSINUS-SUCHE ---
+# Misst recall@k gegen den exakten Scan sowie p50/p99-Latenz pro Anfrage
+# für verschiedene Profilzahlen und nprobe-Werte. Komplett offline (synthetische Vektoren).
+#   python bench_ann.py --sizes 1000 10000 100000 --nprobe 1 4 8 16 32
+
+
+def percentiles(samples_ms):
+    return {"p50_ms": float(np.percentile(samples_ms, 50)), "p99_ms": float(np.percentile(samples_ms, 99))}
+
+
+def bench_size(n, dim, k, nprobes, n_queries, seed=0):
+    data = clustered_vectors(n + n_queries, dim, seed=seed)
+    vectors, queries = data[:n], data[n:]
+
+    exact_ms, truth = [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        truth.append(set(top_k(vectors @ q, k).tolist()))
+        exact_ms.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    index = IVFIndex.train(vectors, seed=seed)
+    build_s = time.perf_counter() - t0
+
+    result = {"profiles": n, "dim": dim, "k": k, "n_lists": index.n_lists,
+              "build_s": build_s, "exact": percentiles(exact_ms), "ivf": []}
+    for nprobe in nprobes:
+        latencies, hits = [], 0
+        for q, expected in zip(queries, truth):
+            t0 = time.perf_counter()
+            ids, _ = index.search(q, k=k, nprobe=nprobe)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            hits += len(expected.intersection(ids.tolist()))
+        result["ivf"].append({"nprobe": nprobe, "recall_at_k": hits / (k * len(queries)), **percentiles(latencies)})
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall/Latenz-Benchmark für den IVF-Index")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--json", help="Ergebnisse zusätzlich als JSON speichern")
+    args = parser.parse_args()
+
+    results = []
+    for n in args.sizes:
+        r = bench_size(n, args.dim, args.k, args.nprobe, args.queries)
+        results.append(r)
+        print(f"\n📊 {n:>7} Profile | {r['n_lists']} Listen | Build {r['build_s']:.1f}s")
+        print(f"   exakt        recall 100.0% | p50 {r['exact']['p50_ms']:7.2f} ms | p99 {r['exact']['p99_ms']:7.2f} ms")
+        for row in r["ivf"]:
+            print(f"   nprobe {row['nprobe']:>4}  recall {row['recall_at_k']:6.1%} | "
+                  f"p50 {row['p50_ms']:7.2f} ms | p99 {row['p99_ms']:7.2f} ms")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+import numpy as np
+from cryptography.fernet import Fernet
+import crypto_layer
+from ann_index import ANN_MIN_PROFILES, IVFIndex
+from embedding_cache import EmbeddingCache
+from embedding_pipeline import embed_texts
+from matching import MatchingIndex
+from profile_store import ProfileStore
+from synthetic_profiles import DIM, FakeEmbeddingClient, generate_profiles
+from version import VERSION, VERSION_VIBE
+
+# --- BENCHMARK-SUITE (OFFLINE) ---
+# Misst pro DB-Größe: Schreiben, DB-Laden, Index-Aufbau, Embedding (Fake-Client),
+# Verschlüsselung, Matching p50/p99, Peak-RSS und Plattenbedarf.
+# Jede Größe läuft in einem eigenen Prozess, damit Peak-RSS nicht von der vorigen erbt.
+# Ergebnis als JSON (mit VERSION/VERSION_VIBE), --compare zeigt Regressionen zur Vorversion.
+#   python benchmark_suite.py --sizes 1000 10000 100000
+#   python benchmark_suite.py --compare bench_results/benchmark_v0.4.1-ARCHITECT.json
+
+RESULTS_DIR = "bench_results"
+WRITE_CHUNK = 10_000
+
+
+def _timed(func, *args, **kwargs):
+    t0 = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - t0
+
+
+def _latencies(func, inputs):
+    samples = []
+    for item in inputs:
+        t0 = time.perf_counter()
+        func(item)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return {"p50_ms": float(np.percentile(samples, 50)), "p99_ms": float(np.percentile(samples, 99))}
+
+
+def _dir_size(path):
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+
+def bench_size(n, dim, workdir, n_queries=200, k=10, sample=10_000, seed=0):
+    root = os.path.join(workdir, f"store_{n}")
+    result = {"profiles": n, "dim": dim}
+
+    # Schreiben (append-only, blockweise)
+    store = ProfileStore(root)
+    store.reset()
+    profiles = generate_profiles(n, dim, seed=seed)
+    t0 = time.perf_counter()
+    while chunk := list(islice(profiles, WRITE_CHUNK)):
+        store.extend(chunk)
+    result["write_s"] = time.perf_counter() - t0
+    result["disk_bytes"] = _dir_size(root)
+
+    # DB laden (kalter Store) + Index-Aufbau
+    def load():
+        fresh = ProfileStore(root)
+        return fresh, fresh.records(), fresh.vectors()
+    (fresh, records, _), result["load_s"] = _timed(load)
+    index, result["index_build_s"] = _timed(MatchingIndex.from_store, fresh)
+
+    # Matching: Anfragen = verrauschte Kopien vorhandener Profile, mit Filtern wie in der App
+    rng = np.random.default_rng(seed + 1)
+    picks = rng.integers(0, n, n_queries)
+    queries = np.asarray(fresh.vectors()[np.sort(picks)]) + rng.standard_normal((n_queries, dim), dtype=np.float32) * 0.1
+    result["match_exact"] = _latencies(lambda q: index.query(q, k=k), queries)
+    result["match_filtered"] = _latencies(lambda q: index.query(q, k=k, gender="w", target_gender="m"), queries)
+    if n >= ANN_MIN_PROFILES:
+        ivf, result["ivf_build_s"] = _timed(IVFIndex.train, fresh.vectors(), seed=seed)
+        result["match_ivf"] = _latencies(lambda q: ivf.search(q, k=k), queries)
+
+    # Embedding über Pipeline + Cache (Fake-Client, kein Netzwerk)
+    texts = [f"{r['manifesto']} {r['loc']} {r['id']}" for r in islice(records, sample)]
+    cache = EmbeddingCache(os.path.join(workdir, f"cache_{n}.sqlite"), max_entries=len(texts) + 1)
+    client = FakeEmbeddingClient(dim=dim)
+    _, cold = _timed(embed_texts, client, texts, cache=cache)
+    _, warm = _timed(embed_texts, client, texts, cache=cache)
+    result["embed"] = {"texts": len(texts), "cold_texts_per_s": len(texts) / cold,
+                       "cached_texts_per_s": len(texts) / warm, "requests": client.requests}
+
+    # Verschlüsselung (Batch-API)
+    cipher = crypto_layer.build_cipher((Fernet.generate_key().decode(),))
+    names = [r["name"] for r in islice(records, sample)]
+    tokens, enc = _timed(crypto_layer.encrypt_many, names, cipher)
+    _, dec = _timed(crypto_layer.decrypt_many, tokens, cipher)
+    result["crypto"] = {"fields": len(names), "encrypt_per_s": len(names) / enc, "decrypt_per_s": len(names) / dec}
+
+    # ru_maxrss ist auf Linux in KB, auf macOS in Bytes
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    result["peak_rss_bytes"] = peak if platform.system() == "Darwin" else peak * 1024
+    return result
+
+
+def run_suite(sizes, dim=DIM, n_queries=200, k=10, workdir=None):
+    workdir = workdir or tempfile.mkdtemp(prefix="aim_bench_")
+    report = {
+        "version": VERSION,
+        "version_vibe": VERSION_VIBE,
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "machine": platform.machine(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "cpus": os.cpu_count(),
+        "results": [],
+    }
+    ctx = multiprocessing.get_context("spawn")
+    try:
+        for n in sizes:
+            with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+                result = pool.submit(bench_size, n, dim, workdir, n_queries, k).result()
+            report["results"].append(result)
+            print(f"📊 {n:>8} Profile | Laden {result['load_s']:.2f}s | Index {result['index_build_s']:.2f}s | "
+                  f"Match p50 {result['match_exact']['p50_ms']:.2f} ms / p99 {result['match_exact']['p99_ms']:.2f} ms | "
+                  f"RSS {result['peak_rss_bytes'] / 2**20:.0f} MB | Disk {result['disk_bytes'] / 2**20:.1f} MB")
+            shutil.rmtree(os.path.join(workdir, f"store_{n}"), ignore_errors=True)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return report
+
+
+# Kennzahlen für den Versionsvergleich: (Pfad, größer ist besser?)
+COMPARE_METRICS = [
+    (("load_s",), False), (("index_build_s",), False),
+    (("match_exact", "p50_ms"), False), (("match_exact", "p99_ms"), False),
+    (("embed", "cold_texts_per_s"), True), (("crypto", "decrypt_per_s"), True),
+    (("peak_rss_bytes",), False), (("disk_bytes",), False),
+]
+
+
+def compare(old, new, tolerance=0.10):
+    """Druckt die Veränderung je Kennzahl; markiert Verschlechterungen über `tolerance`."""
+    old_by_size = {r["profiles"]: r for r in old["results"]}
+    for result in new["results"]:
+        before = old_by_size.get(result["profiles"])
+        if not before:
+            continue
+        print(f"\n🔍 {result['profiles']} Profile: {old['version']} → {new['version']}")
+        for path, higher_is_better in COMPARE_METRICS:
+            a, b = before, result
+            for key in path:
+                a, b = a.get(key, {}), b.get(key, {})
+            if not isinstance(a, (int, float)) or not isinstance(b, (int, float)) or not a:
+                continue
+            change = (b - a) / a
+            worse = change < -tolerance if higher_is_better else change > tolerance
+            print(f"   {'⚠️ ' if worse else '  '}{'.'.join(path):<22} {a:>14.3f} → {b:>14.3f} ({change:+.1%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline-Benchmark der AIM-Vibe Engine")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--dim", type=int, default=DIM)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--out", help=f"JSON-Ziel (Standard: {RESULTS_DIR}/benchmark_<VERSION>.json)")
+    parser.add_argument("--compare", help="Früheres Ergebnis-JSON zum Vergleich")
+    args = parser.parse_args()
+
+    report = run_suite(args.sizes, args.dim, args.queries, args.k)
+    out = args.out or os.path.join(RESULTS_DIR, f"benchmark_{VERSION}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✅ Ergebnisse in '{out}' gespeichert.")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
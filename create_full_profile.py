@@ -1,10 +1,10 @@
-import os
 import json
 from dotenv import load_dotenv
-from openai import OpenAI
+from embedding_backends import get_backend
+from pillar_matching import embed_pillars
 
 load_dotenv()
-client = OpenAI()
+backend = get_backend()
 
 profile_config = {
     "user": "Marc Vietor",
@@ -37,15 +37,12 @@ profile_config = {
     ]
 }
 
-print(f"Erzeuge Master-Vektoren für den Vietor-Vektor...")
+print("Erzeuge Master-Vektoren für den Vietor-Vektor...")
 
-for pillar in profile_config["pillars"]:
-    print(f"Vektorisierung läuft: {pillar['category']}...")
-    response = client.embeddings.create(
-        input=pillar["text"],
-        model="text-embedding-3-small"
-    )
-    pillar["vector"] = response.data[0].embedding
+pillars = profile_config["pillars"]
+print(f"Vektorisierung läuft: {', '.join(p['category'] for p in pillars)}...")
+# Alle Säulen in einem Request
+embed_pillars(backend, profile_config)
 
 with open('marc_master_profile.json', 'w', encoding='utf-8') as f:
     json.dump(profile_config, f, ensure_ascii=False, indent=4)
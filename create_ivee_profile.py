@@ -1,10 +1,10 @@
-import os
 import json
 from dotenv import load_dotenv
-from openai import OpenAI
+from embedding_backends import get_backend
+from pillar_matching import embed_pillars
 
 load_dotenv()
-client = OpenAI()
+backend = get_backend()
 
 # --- IVEES DATEN-INPUT ---
 # Hier fügst du ihre Texte ein, sobald sie dir diese gibt.
@@ -35,17 +35,17 @@ ivee_config = {
 
 print(f"Erzeuge Vektoren für {ivee_config['user']}...")
 
+ready = []
 for pillar in ivee_config["pillars"]:
     if "HIER" in pillar["text"]:
         print(f"⚠️ Warnung: Text für {pillar['category']} fehlt noch!")
         continue
         
     print(f"Vektorisierung läuft: {pillar['category']}...")
-    response = client.embeddings.create(
-        input=pillar["text"],
-        model="text-embedding-3-small"
-    )
-    pillar["vector"] = response.data[0].embedding
+    ready.append(pillar)
+
+# Alle fertigen Säulen in einem Request
+embed_pillars(backend, ivee_config, ready)
 
 # Speichern der Ivee-DNA
 with open('ivee_master_profile.json', 'w', encoding='utf-8') as f:
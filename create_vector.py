@@ -1,11 +1,10 @@
-import os
 import json
 from dotenv import load_dotenv
-from openai import OpenAI
+from embedding_backends import get_backend
 
 # 1. Umgebung laden
 load_dotenv()
-client = OpenAI()
+backend = get_backend()
 
 # 2. Dein Datensatz
 profile_data = {
@@ -19,14 +18,9 @@ profile_data = {
 
 print(f"Verarbeite Statement für: {profile_data['user']}...")
 
-# 3. Vektor erzeugen
-response = client.embeddings.create(
-    input=profile_data["statement"],
-    model="text-embedding-3-small"
-)
-
-# 4. Daten zusammenführen
-profile_data["vector"] = response.data[0].embedding
+# 3. Vektor erzeugen (Backend laut AIM_EMBEDDING_BACKEND) & 4. Daten zusammenführen
+profile_data["vector"] = backend.embed_one(profile_data["statement"])
+backend.tag(profile_data)
 
 # 5. Als JSON-Datei speichern
 with open('marc_profile.json', 'w', encoding='utf-8') as f:
@@ -0,0 +1,143 @@
+import hashlib
+import hmac
+import os
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+# --- KRYPTO-SCHICHT ---
+# Der Cipher wird einmal gebaut und wiederverwendet (statt pro encrypt/decrypt).
+# Key-Rotation: ENCRYPTION_KEY verschlüsselt, ENCRYPTION_KEYS_OLD (kommagetrennt)
+# dürfen weiterhin entschlüsseln, bis alle Datensätze rotiert sind.
+# `cryptography` wird erst beim ersten Cipher geladen (schnellerer Kaltstart der App).
+
+ENCRYPTED_FIELDS = ("name", "loc", "contact")
+DECRYPT_ERROR = "[Entschlüsselungsfehler]"
+FERNET_PREFIX = "gAAAAA"
+BATCH_THRESHOLD = 64   # darunter lohnt sich kein Worker-Pool
+MAX_WORKERS = 4
+
+
+def _lookup(name, secrets=None):
+    value = os.getenv(name)
+    if not value and secrets is not None:
+        try:
+            value = secrets.get(name)
+        except FileNotFoundError:   # keine secrets.toml vorhanden
+            value = None
+    return value or ""
+
+
+def load_keys(secrets=None):
+    """Aktiver Key zuerst, danach die alten Keys für die Rotation."""
+    primary = _lookup("ENCRYPTION_KEY", secrets)
+    if not primary:
+        raise RuntimeError("ENCRYPTION_KEY nicht gefunden!")
+    old = [k.strip() for k in _lookup("ENCRYPTION_KEYS_OLD", secrets).split(",") if k.strip()]
+    return (primary, *old)
+
+
+def load_region_key(secrets=None):
+    """HMAC-Key für den Regions-Hash (sharding.py): REGION_KEY, sonst vom aktiven ENCRYPTION_KEY abgeleitet.
+
+    Ein eigener REGION_KEY ist besser: sonst ändert jede Key-Rotation alle Regions-Hashes (-> backfill).
+    """
+    key = _lookup("REGION_KEY", secrets)
+    if key:
+        return key.encode()
+    return hmac.new(load_keys(secrets)[0].encode(), b"aim-region", hashlib.sha256).digest()
+
+
+@lru_cache(maxsize=4)
+def build_cipher(keys):
+    from cryptography.fernet import Fernet, MultiFernet
+    return MultiFernet([Fernet(k.encode()) for k in keys])
+
+
+def get_cipher(secrets=None):
+    """Gecachter MultiFernet. Ändern sich die Keys, entsteht automatisch ein neuer."""
+    return build_cipher(load_keys(secrets))
+
+
+def is_encrypted(value):
+    return bool(value) and value.startswith(FERNET_PREFIX)
+
+
+def encrypt_value(value, cipher):
+    return cipher.encrypt(value.encode()).decode() if value else ""
+
+
+def decrypt_value(token, cipher):
+    from cryptography.fernet import InvalidToken
+    try:
+        return cipher.decrypt(token.encode()).decode()
+    except (InvalidToken, AttributeError, ValueError):
+        return DECRYPT_ERROR
+
+
+def reveal_value(value, cipher):
+    """Entschlüsselt Fernet-Felder, Klartext (z.B. aus generate_test_data) bleibt wie er ist."""
+    return decrypt_value(value, cipher) if is_encrypted(value) else (value or "")
+
+
+def _map(func, values, workers):
+    values = list(values)
+    if len(values) < BATCH_THRESHOLD or workers <= 1:
+        return [func(v) for v in values]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(func, values, chunksize=max(1, len(values) // (workers * 4))))
+
+
+def encrypt_many(values, cipher, workers=MAX_WORKERS):
+    return _map(lambda v: encrypt_value(v, cipher), values, workers)
+
+
+def decrypt_many(tokens, cipher, workers=MAX_WORKERS):
+    return _map(lambda t: reveal_value(t, cipher), tokens, workers)
+
+
+def rotate_many(tokens, cipher, workers=MAX_WORKERS):
+    """Verschlüsselt Tokens mit dem aktiven Key neu (MultiFernet.rotate)."""
+    return _map(lambda t: cipher.rotate(t.encode()).decode() if is_encrypted(t) else t, tokens, workers)
+
+
+def encrypt_record(record, cipher, fields=ENCRYPTED_FIELDS):
+    return {k: encrypt_value(v, cipher) if k in fields else v for k, v in record.items()}
+
+
+class LazyProfile(Mapping):
+    """Read-only Sicht auf ein Profil, die verschlüsselte Felder erst beim Zugriff entschlüsselt.
+
+    So werden nur die Felder der Top-k-Treffer entschlüsselt, die tatsächlich angezeigt werden.
+    """
+
+    def __init__(self, record, cipher, fields=ENCRYPTED_FIELDS):
+        self._record = record
+        self._cipher = cipher
+        self._fields = fields
+        self._plain = {}
+
+    def __getitem__(self, key):
+        if key in self._fields:
+            if key not in self._plain:
+                self._plain[key] = reveal_value(self._record.get(key), self._cipher)
+            return self._plain[key]
+        return self._record[key]
+
+    def __iter__(self):
+        return iter(self._record)
+
+    def __len__(self):
+        return len(self._record)
+
+    @property
+    def raw(self):
+        """Der unveränderte (verschlüsselte) Datensatz."""
+        return self._record
+
+
+def reveal_records(records, cipher, fields=ENCRYPTED_FIELDS, workers=MAX_WORKERS):
+    """Entschlüsselt eine Ergebnisliste spaltenweise im Batch (z.B. für Admin-Tabellen)."""
+    records = list(records)
+    columns = {f: decrypt_many([r.get(f, "") for r in records], cipher, workers) for f in fields}
+    return [dict(r, **{f: columns[f][i] for f in fields}) for i, r in enumerate(records)]
@@ -0,0 +1,277 @@
+import glob
+import json
+import os
+import sys
+import threading
+import time
+import numpy as np
+from embedding_cache import DEFAULT_DIMENSIONS, DEFAULT_MODEL, cache_key
+from metrics import METRICS
+from rate_limit import SingleFlight
+
+# --- EMBEDDING-BACKENDS ---
+# Eine Schnittstelle für App und Skripte: backend.embed(texts) -> Liste von Vektoren.
+#   openai -> text-embedding-3-small über Pipeline + Cache (Netzwerk)
+#   local  -> scikit-learn auf der CPU, im Prozess, ohne Netzwerk:
+#             Hashing-Features (char-n-grams) -> SVD -> gelernte Projektion in den OpenAI-Raum
+#   auto   -> openai, bei API-Ausfall automatisch local: openai ohne Retries (sofort ausweichen),
+#             nach FAILURE_THRESHOLD Fehlern in Folge (oder leerem Guthaben) bleibt der Schalter
+#             CIRCUIT_OPEN_SECONDS offen – so lange geht alles direkt an local, danach ein Probe-Versuch
+# Auswahl per AIM_EMBEDDING_BACKEND. Jedes Profil speichert `embedding_space`, das Matching
+# vergleicht nur Vektoren aus demselben Raum.
+
+FULL_DIM = 1536
+LOCAL_MODEL_PATH = os.getenv("AIM_LOCAL_EMBEDDER", "local_embedder.joblib")
+HASH_FEATURES = 2 ** 14   # Hashing-Raum vor der SVD (hält SVD-Komponenten klein: 256 x 16384)
+SVD_COMPONENTS = 256
+FAILURE_THRESHOLD = 3
+CIRCUIT_OPEN_SECONDS = float(os.getenv("AIM_EMBEDDING_CIRCUIT_SECONDS", "120"))
+FAIL_FAST_TIMEOUT = 10.0   # s pro Request, wenn ein Ausweich-Backend bereitsteht
+
+
+def space_id(backend, model, dim):
+    return f"{backend}:{model}:{dim}"
+
+
+# Alle Profile ohne Eintrag stammen aus der Zeit vor den Backends
+LEGACY_SPACE = space_id("openai", DEFAULT_MODEL, FULL_DIM)
+
+# Gleichzeitige identische Manifeste (Doppelklick, mehrere Tabs) -> ein API-Call.
+# Schlüssel ist der ganze Batch, also auch die Abschnitte eines Manifests (multi_vector.py)
+_IN_FLIGHT = SingleFlight()
+
+
+def space_of(record):
+    return record.get("embedding_space", LEGACY_SPACE)
+
+
+def _vectorizer(n_features):
+    from sklearn.feature_extraction.text import HashingVectorizer
+    return HashingVectorizer(analyzer="char_wb", ngram_range=(3, 5), n_features=n_features,
+                             alternate_sign=False, norm="l2")
+
+
+class EmbeddingBackend:
+    name = "base"
+
+    def __init__(self, model, dim):
+        self.model = model
+        self.dim = dim
+
+    @property
+    def space(self):
+        """Vektorraum, in dem die Vektoren liegen – nur gleiche Räume sind vergleichbar."""
+        return space_id(self.name, self.model, self.dim)
+
+    def embed(self, texts):
+        raise NotImplementedError
+
+    def embed_one(self, text):
+        return self.embed([text])[0]
+
+    def tag(self, record):
+        """Vermerkt Raum und Backend im Datensatz."""
+        record["embedding_space"] = self.space
+        record["embedding_backend"] = self.name
+        return record
+
+
+class OpenAIBackend(EmbeddingBackend):
+    name = "openai"
+
+    def __init__(self, client=None, model=DEFAULT_MODEL, dimensions=DEFAULT_DIMENSIONS, fail_fast=False):
+        super().__init__(model, dimensions or FULL_DIM)
+        self.dimensions = dimensions
+        self.fail_fast = fail_fast   # ohne eigene Retries und die des Clients (FallbackBackend weicht aus)
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            from openai import OpenAI
+            kwargs = {"max_retries": 0, "timeout": FAIL_FAST_TIMEOUT} if self.fail_fast else {}
+            self._client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), **kwargs)
+        return self._client
+
+    def embed(self, texts):
+        texts = list(texts)
+        return _IN_FLIGHT.do(cache_key("\x00".join(texts), self.model, self.dimensions), self._embed, texts)
+
+    def _embed(self, texts):
+        from embedding_pipeline import MAX_ATTEMPTS, embed_texts
+        return embed_texts(self.client, texts, model=self.model, dimensions=self.dimensions,
+                           attempts=1 if self.fail_fast else MAX_ATTEMPTS)
+
+
+class LocalBackend(EmbeddingBackend):
+    """CPU-Embedder im Prozess. Mit trainierter Projektion liegen die Vektoren im OpenAI-Raum,
+    ohne Training in einem eigenen Hashing-Raum (dann nur untereinander vergleichbar)."""
+
+    name = "local"
+
+    def __init__(self, model_path=LOCAL_MODEL_PATH, dim=FULL_DIM):
+        self.svd = self.projection = self.target_space = None
+        if os.path.exists(model_path):
+            import joblib
+            bundle = joblib.load(model_path)
+            self.svd, self.projection = bundle["svd"], bundle["projection"]
+            self.target_space, dim = bundle["target_space"], bundle["dim"]
+            self.vectorizer = _vectorizer(HASH_FEATURES)
+        else:
+            # Ohne Training: die Hashing-Features selbst sind der Vektor (eigener Raum, gleiche Länge)
+            self.vectorizer = _vectorizer(dim)
+        super().__init__("hash-proj" if self.projection is not None else "hash", dim)
+
+    @property
+    def space(self):
+        return self.target_space or super().space
+
+    def embed(self, texts):
+        features = self.vectorizer.transform(list(texts))
+        if self.projection is not None:
+            vectors = self.projection.predict(self.svd.transform(features))
+        else:
+            vectors = features.toarray()
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (vectors / norms).tolist()
+
+
+class FallbackBackend(EmbeddingBackend):
+    """Primär-Backend mit Ausweichen auf ein zweites, wenn es ausfällt (API down, Guthaben leer).
+
+    Circuit Breaker: nach FAILURE_THRESHOLD Fehlern in Folge (leeres Guthaben: sofort) wird das
+    Primär-Backend CIRCUIT_OPEN_SECONDS lang gar nicht erst gefragt.
+    """
+
+    def __init__(self, primary, fallback):
+        super().__init__(primary.model, primary.dim)
+        self.primary, self.fallback = primary, fallback
+        self._used = threading.local()   # welches Backend hat in DIESEM Thread zuletzt geliefert
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._open_until = 0.0
+        self.last_error = None
+
+    @property
+    def last(self):
+        return getattr(self._used, "backend", self.primary)
+
+    name = property(lambda self: self.last.name)
+    space = property(lambda self: self.last.space)
+
+    @property
+    def circuit_open(self):
+        return time.monotonic() < self._open_until
+
+    def _call(self, method, *args):
+        if not self.circuit_open:
+            try:
+                self._used.backend = self.primary
+                result = getattr(self.primary, method)(*args)
+                with self._lock:
+                    self._failures = 0
+                return result
+            except Exception as e:
+                self._failed(e)
+        METRICS.count("embedding_fallbacks")
+        self._used.backend = self.fallback
+        return getattr(self.fallback, method)(*args)
+
+    def _failed(self, error):
+        with self._lock:
+            self._failures += 1
+            self.last_error = f"{type(error).__name__}: {error}"
+            if self._failures >= FAILURE_THRESHOLD or getattr(error, "code", None) == "insufficient_quota":
+                self._open_until = time.monotonic() + CIRCUIT_OPEN_SECONDS
+                self._failures = 0
+                METRICS.count("embedding_circuit_opened")
+
+    def embed(self, texts):
+        return self._call("embed", texts)
+
+    def embed_one(self, text):
+        # über embed_one des Primär-Backends: gleichzeitige identische Manifeste bleiben ein API-Call
+        return self._call("embed_one", text)
+
+
+def describe(backend):
+    """Backend, Modell und Dimension als JSON-taugliches Dict (manifest.json nach reembed.py switch)."""
+    return {"backend": backend.name, "model": backend.model, "dims": getattr(backend, "dimensions", None),
+            "space": backend.space}
+
+
+def get_backend(kind=None, embedding=None):
+    """Backend laut AIM_EMBEDDING_BACKEND (openai | local | auto).
+
+    `embedding`: Raum des Stores (describe, aus manifest.json) – nach einem Modellwechsel bestimmt er
+    Backend, Modell und Dimension; 'auto' weicht dann nur aus, wenn local in denselben Raum projiziert.
+    """
+    kind = (kind or os.getenv("AIM_EMBEDDING_BACKEND", "openai")).lower()
+    if embedding is not None:
+        if embedding["backend"] == "local":
+            return LocalBackend()
+        model, dims = embedding["model"], embedding["dims"]
+        fallback = LocalBackend() if kind == "auto" else None
+        if fallback is not None and fallback.space == embedding["space"]:
+            return FallbackBackend(OpenAIBackend(model=model, dimensions=dims, fail_fast=True), fallback)
+        return OpenAIBackend(model=model, dimensions=dims)
+    if kind == "local":
+        return LocalBackend()
+    if kind == "auto":
+        return FallbackBackend(OpenAIBackend(fail_fast=True), LocalBackend())
+    return OpenAIBackend()
+
+
+# --- TRAINING DER LOKALEN PROJEKTION ---
+def training_pairs(store_root=None):
+    """(Text, OpenAI-Vektor)-Paare aus dem, was im Repo schon liegt: Store-Manifeste und Master-Säulen."""
+    from profile_store import ProfileStore, STORE_DIR
+    texts, vectors = [], []
+    store = ProfileStore(store_root or STORE_DIR)
+    matrix = store.vectors()
+    seen = set()
+    for record in store.records():
+        text = record.get("manifesto", "")
+        if text and not text.startswith("gAAAAA") and space_of(record) == LEGACY_SPACE and text not in seen:
+            seen.add(text)
+            texts.append(text)
+            vectors.append(np.asarray(matrix[record["slot"]]))
+    for path in glob.glob("*_master_profile.json"):
+        with open(path, "r", encoding="utf-8") as f:
+            profile = json.load(f)
+        if space_of(profile) == LEGACY_SPACE:
+            for pillar in profile["pillars"]:
+                if pillar.get("vector") and pillar["text"] not in seen:
+                    seen.add(pillar["text"])
+                    texts.append(pillar["text"])
+                    vectors.append(np.asarray(pillar["vector"], dtype=np.float32))
+    return texts, np.asarray(vectors, dtype=np.float32)
+
+
+def fit_local(texts, vectors, path=LOCAL_MODEL_PATH, target_space=LEGACY_SPACE):
+    """Lernt Hashing-Features -> OpenAI-Vektor (SVD + Ridge) und speichert das Modell."""
+    import joblib
+    from sklearn.decomposition import TruncatedSVD
+    from sklearn.linear_model import Ridge
+    features = _vectorizer(HASH_FEATURES).transform(texts)
+    svd = TruncatedSVD(n_components=max(1, min(SVD_COMPONENTS, len(texts) - 1)), random_state=0)
+    reduced = svd.fit_transform(features)
+    projection = Ridge(alpha=1.0).fit(reduced, vectors)
+    joblib.dump({"svd": svd, "projection": projection, "target_space": target_space,
+                 "dim": vectors.shape[1]}, path)
+    return projection.score(reduced, vectors)
+
+
+if __name__ == "__main__":
+    # python embedding_backends.py fit  -> trainiert die lokale Projektion
+    if sys.argv[1:] == ["fit"]:
+        texts, vectors = training_pairs()
+        if len(texts) < 2:
+            sys.exit("Zu wenige (Text, Vektor)-Paare zum Trainieren.")
+        r2 = fit_local(texts, vectors)
+        print(f"✅ Lokaler Embedder aus {len(texts)} Paaren trainiert (R² {r2:.2f}) -> '{LOCAL_MODEL_PATH}'")
+    else:
+        backend = get_backend()
+        print(f"Backend: {backend.name} | Raum: {backend.space}")
@@ -0,0 +1,142 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+
+# --- EMBEDDING-CACHE ---
+# Persistenter Cache für Embeddings, adressiert über sha256(model, dimensions, text).
+# Gleicher Text -> kein zweiter API-Call, egal ob aus der App oder einem Generator-Skript.
+# Größenbegrenzt mit LRU-Verdrängung, Treffer/Fehlschläge werden mitgezählt.
+# Der LRU-Zeitstempel ist die Uhrzeit (ns) und gilt damit über alle Prozesse auf derselben Datei.
+# Die Größe wird mitgezählt statt per COUNT(*) pro Eintrag; läuft sie über, wird einmal gezählt und
+# gleich EVICT_RATIO der Einträge zusätzlich verdrängt. Treffer schreiben ihren Zeitstempel gesammelt.
+
+DEFAULT_MODEL = "text-embedding-3-small"
+# Gekürzte Vektoren direkt von der API (z.B. 512 statt 1536), leer = volle Dimension
+DEFAULT_DIMENSIONS = int(os.getenv("AIM_EMBEDDING_DIMENSIONS", "0")) or None
+CACHE_PATH = os.getenv("AIM_EMBEDDING_CACHE", "embedding_cache.sqlite")
+MAX_ENTRIES = int(os.getenv("AIM_EMBEDDING_CACHE_MAX", "20000"))
+EVICT_RATIO = 0.05   # bei Überlauf zusätzlich verdrängter Anteil (Platz für die nächsten Einträge)
+TOUCH_BATCH = 64     # Treffer, deren Zeitstempel zusammen geschrieben werden
+
+
+def cache_key(text, model=DEFAULT_MODEL, dimensions=None):
+    raw = f"{model}\x00{dimensions or ''}\x00{text}".encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()
+
+
+class EmbeddingCache:
+    def __init__(self, path=CACHE_PATH, max_entries=MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.evict_batch = max(1, int(max_entries * EVICT_RATIO))
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._touched = {}   # key -> Zeitstempel der Treffer, gesammelt geschrieben
+        self._last = 0
+        # isolation_level=None: Transaktionen steuern wir selbst (BEGIN IMMEDIATE, wie rate_limit.py)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")   # ein Cache: nach einem Absturz fehlen höchstens Einträge
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY, vector BLOB NOT NULL, used INTEGER NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS embeddings_used ON embeddings(used)")
+        self._count = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def _now(self):
+        """LRU-Zeitstempel (ns): gilt für alle Prozesse auf derselben Datei, im Prozess streng steigend."""
+        self._last = max(time.time_ns(), self._last + 1)
+        return self._last
+
+    def get(self, key):
+        """Vektor als Liste oder None. Ein Treffer frischt den LRU-Zeitstempel auf (gesammelt geschrieben)."""
+        with self._lock:
+            row = self._db.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._touched[key] = self._now()
+            if len(self._touched) >= TOUCH_BATCH:
+                self._write([])
+        return np.frombuffer(row[0], dtype=np.float32).tolist()
+
+    def put(self, key, vector):
+        self.put_many([(key, vector)])
+
+    def put_many(self, items):
+        """Speichert (key, Vektor)-Paare in einer Transaktion (z.B. ein ganzer API-Batch)."""
+        rows = [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in items]
+        with self._lock:
+            self._write(rows)
+
+    def _write(self, rows):
+        """Neue Einträge und gesammelte Treffer schreiben; verdrängt wird erst, wenn die Zählung überläuft."""
+        touched, self._touched = self._touched, {}
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            for key, blob in rows:
+                now = self._now()
+                added = self._db.execute("INSERT OR IGNORE INTO embeddings (key, vector, used) VALUES (?, ?, ?)",
+                                         (key, blob, now)).rowcount
+                if added:
+                    self._count += 1
+                else:
+                    self._db.execute("UPDATE embeddings SET vector = ?, used = ? WHERE key = ?", (blob, now, key))
+            self._db.executemany("UPDATE embeddings SET used = ? WHERE key = ?",
+                                 [(used, key) for key, used in touched.items()])
+            if self._count > self.max_entries:
+                self._evict()
+            self._db.execute("COMMIT")
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            self._touched = {**touched, **self._touched}
+            raise
+
+    def _evict(self):
+        """Entfernt die am längsten ungenutzten Einträge – gleich evict_batch mehr, damit das selten nötig ist.
+
+        Die laufende Zählung kennt nur die eigenen Einträge; vor dem Löschen wird einmal echt gezählt.
+        """
+        count = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._db.execute(
+                "DELETE FROM embeddings WHERE key IN "
+                "(SELECT key FROM embeddings ORDER BY used ASC LIMIT ?)",
+                (min(count, overflow + self.evict_batch),),
+            )
+            count -= min(count, overflow + self.evict_batch)
+        self._count = count
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+def get_cache():
+    """Ein Cache pro Prozess, geteilt von App und Skripten (auch bei gleichzeitigen ersten Aufrufen)."""
+    global _shared
+    if _shared is None:
+        with _shared_lock:
+            if _shared is None:
+                _shared = EmbeddingCache()
+    return _shared
+
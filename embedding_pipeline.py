@@ -0,0 +1,111 @@
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import numpy as np
+import openai
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_random_exponential
+from embedding_cache import DEFAULT_DIMENSIONS, DEFAULT_MODEL, cache_key, get_cache
+from metrics import METRICS
+
+# --- EMBEDDING-PIPELINE (BATCHED & PARALLEL) ---
+# Statt einem HTTP-Roundtrip pro Text:
+#   1. Duplikate zusammenfassen und den Embedding-Cache fragen
+#   2. Fehlende Texte in Batches nach Token-Budget packen (der Endpoint nimmt Listen)
+#   3. Höchstens MAX_IN_FLIGHT Requests gleichzeitig (Backpressure), Retry mit Backoff
+#      (nicht bei insufficient_quota – leeres Guthaben wird durch Warten nicht voller)
+#   4. Ergebnisse in Eingabe-Reihenfolge zurückgeben
+
+MAX_BATCH_TOKENS = 50_000   # API-Limit liegt bei 300k Tokens pro Request
+MAX_BATCH_INPUTS = 2048     # API-Limit für Inputs pro Request
+MAX_IN_FLIGHT = 4
+MAX_ATTEMPTS = 6
+
+RETRYABLE = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.InternalServerError,
+)
+# Kommt als RateLimitError (429), wird aber durch Warten nicht besser: Guthaben leer
+NOT_RETRYABLE_CODES = ("insufficient_quota",)
+
+
+def is_retryable(error):
+    return isinstance(error, RETRYABLE) and getattr(error, "code", None) not in NOT_RETRYABLE_CODES
+
+
+def estimate_tokens(text):
+    """Grobe, bewusst pessimistische Schätzung (deutscher Text: ~3 Zeichen pro Token)."""
+    return len(text) // 3 + 1
+
+
+def make_batches(texts, max_tokens=MAX_BATCH_TOKENS, max_inputs=MAX_BATCH_INPUTS):
+    """Teilt Texte in Batches, die das Token- und Input-Budget einhalten."""
+    batch, budget = [], 0
+    for text in texts:
+        tokens = estimate_tokens(text)
+        if batch and (budget + tokens > max_tokens or len(batch) >= max_inputs):
+            yield batch
+            batch, budget = [], 0
+        batch.append(text)
+        budget += tokens
+    if batch:
+        yield batch
+
+
+@retry(
+    retry=retry_if_exception(is_retryable),
+    wait=wait_random_exponential(min=1, max=30),
+    stop=stop_after_attempt(MAX_ATTEMPTS),
+    reraise=True,
+)
+def _embed_batch(client, batch, model, dimensions):
+    kwargs = {"dimensions": dimensions} if dimensions else {}
+    with METRICS.stage("embedding_api"):
+        response = client.embeddings.create(input=batch, model=model, **kwargs)
+    usage = getattr(response, "usage", None)
+    METRICS.count("embedding_api_calls")
+    METRICS.count("embedding_texts", len(batch))
+    METRICS.count("embedding_tokens", getattr(usage, "total_tokens", None) or sum(map(estimate_tokens, batch)))
+    # Die API liefert einen Index pro Eingabe – darauf verlassen wir uns, nicht auf die Reihenfolge.
+    return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+
+def embed_texts(client, texts, model=DEFAULT_MODEL, dimensions=DEFAULT_DIMENSIONS, cache=None,
+                max_in_flight=MAX_IN_FLIGHT, max_batch_tokens=MAX_BATCH_TOKENS, attempts=MAX_ATTEMPTS):
+    """Embeddings für viele Texte: Cache, Batching und parallele Requests in einem Aufruf.
+
+    `attempts`: Versuche pro Batch (1 = kein Retry, z.B. wenn ein Ausweich-Backend bereitsteht).
+    """
+    cache = cache if cache is not None else get_cache()
+    embed_batch = _embed_batch if attempts == MAX_ATTEMPTS else _embed_batch.retry_with(stop=stop_after_attempt(attempts))
+    texts = list(texts)
+    vectors = {}
+    missing = []
+    for text in dict.fromkeys(texts):
+        cached = cache.get(cache_key(text, model, dimensions))
+        if cached is None:
+            missing.append(text)
+        else:
+            vectors[text] = cached
+    METRICS.count("embedding_cache_hits", len(vectors))
+
+    batches = make_batches(missing, max_tokens=max_batch_tokens)
+    with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+        in_flight = {}
+        for batch in batches:
+            # Backpressure: erst wieder einreichen, wenn ein Slot frei ist
+            if len(in_flight) >= max_in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    _collect(future, in_flight.pop(future), vectors, cache, model, dimensions)
+            in_flight[pool.submit(embed_batch, client, batch, model, dimensions)] = batch
+        for future in list(in_flight):
+            _collect(future, in_flight.pop(future), vectors, cache, model, dimensions)
+
+    return [vectors[text] for text in texts]
+
+
+def _collect(future, batch, vectors, cache, model, dimensions):
+    results = future.result()
+    cache.put_many((cache_key(text, model, dimensions), vector) for text, vector in zip(batch, results))
+    for text, vector in zip(batch, results):
+        vectors[text] = np.asarray(vector, dtype=np.float32).tolist()
@@ -0,0 +1,73 @@
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+# --- FAKE TELEGRAM BOT API (NUR FÜR TESTS) ---
+# Nimmt sendMessage entgegen, merkt sich die Nachrichten und kann Rate-Limits (429) simulieren.
+#   python fake_telegram_api.py 8081
+#   TELEGRAM_API_URL=http://127.0.0.1:8081 TELEGRAM_BOT_TOKEN=123:test TELEGRAM_ADMIN_ID=1 streamlit run app.py
+
+
+class FakeBotAPI:
+    def __init__(self, port=0, rate_limit_every=0, retry_after=1):
+        self.messages = []
+        self.rate_limit_every = rate_limit_every   # jede n-te Anfrage -> 429
+        self.retry_after = retry_after
+        self._requests = 0
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode()
+                if "json" in self.headers.get("Content-Type", ""):
+                    params = json.loads(body or "{}")
+                else:
+                    params = {k: v[0] for k, v in parse_qs(body).items()}
+                params.update({k: v[0] for k, v in parse_qs(self.path.partition("?")[2]).items()})
+                self._answer(*api.handle(self.path.split("?")[0].rsplit("/", 1)[-1], params))
+
+            do_GET = do_POST
+
+            def _answer(self, status, payload):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def handle(self, method, params):
+        self._requests += 1
+        if self.rate_limit_every and self._requests % self.rate_limit_every == 0:
+            return 429, {"ok": False, "error_code": 429, "description": "Too Many Requests",
+                         "parameters": {"retry_after": self.retry_after}}
+        if method == "sendMessage":
+            self.messages.append(params)
+            message = {"message_id": len(self.messages), "date": 0, "text": params.get("text", ""),
+                       "chat": {"id": int(params.get("chat_id", 0)), "type": "private"}}
+            return 200, {"ok": True, "result": message}
+        return 200, {"ok": True, "result": True}
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+
+
+if __name__ == "__main__":
+    api = FakeBotAPI(port=int(sys.argv[1]) if len(sys.argv) > 1 else 8081)
+    print(f"🤖 Fake Bot API läuft auf {api.url}")
+    try:
+        api.server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n{len(api.messages)} Nachrichten empfangen.")
@@ -1,41 +1,42 @@
-import json
-import os
 import random
-from openai import OpenAI
 from dotenv import load_dotenv
+from profile_store import ProfileStore
+from embedding_cache import get_cache
+from embedding_backends import get_backend
+from crypto_layer import load_region_key
+from sharding import region_hash
 
 # --- INITIALISIERUNG ---
 load_dotenv()
-client = OpenAI()
 
 # --- KONFIGURATION FÜR v0.2.1 ---
 CITIES = ["Lützow", "Obertshausen", "Frankfurt", "Hamburg", "Berlin", "München", "Köln"]
 GENDERS = ["m", "w", "d"]
 SEARCH_OPTIONS = ["Partnerin (w)", "Partner (m)", "Freunde (egal)"]
+ARCHETYPES = [
+    {"name": "R. Giskard", "bio": "Gerechtigkeit ist ein kosmisches Gesetz."},
+    {"name": "R. Daneel", "bio": "Harmonie durch Verbindung und Geschichte."},
+    {"name": "R. Sammy", "bio": "Harter Industrial Techno. Präzision pur."},
+    {"name": "R. Jander", "bio": "Klangfarben und emotionale Tiefe."},
+    {"name": "R. Fastolfe", "bio": "Wissenschaftliche Distanz und Resilienz."},
+    {"name": "R. Gladia", "bio": "Freiheit und Mut zum Abgrund."},
+    {"name": "R. Dors", "bio": "Schutz der Schwachen durch Struktur."},
+    {"name": "R. Eto", "bio": "Flexibilität als höchste Form der Macht."},
+    {"name": "R. Baley", "bio": "Wahrheit auf dem nassen Asphalt der Stadt."},
+    {"name": "R. Seldon", "bio": "Statistische Perfektion im Miteinander."}
+]
 
-def get_embedding(text):
-    response = client.embeddings.create(input=text, model="text-embedding-3-small")
-    return response.data[0].embedding
+def get_embeddings(texts, backend):
+    # Gebatcht & über den Cache: 10 Archetypen -> ein Request mit 10 Texten
+    return backend.embed(texts)
 
 def run_upgrade():
-    archetypes = [
-        {"name": "R. Giskard", "bio": "Gerechtigkeit ist ein kosmisches Gesetz."},
-        {"name": "R. Daneel", "bio": "Harmonie durch Verbindung und Geschichte."},
-        {"name": "R. Sammy", "bio": "Harter Industrial Techno. Präzision pur."},
-        {"name": "R. Jander", "bio": "Klangfarben und emotionale Tiefe."},
-        {"name": "R. Fastolfe", "bio": "Wissenschaftliche Distanz und Resilienz."},
-        {"name": "R. Gladia", "bio": "Freiheit und Mut zum Abgrund."},
-        {"name": "R. Dors", "bio": "Schutz der Schwachen durch Struktur."},
-        {"name": "R. Eto", "bio": "Flexibilität als höchste Form der Macht."},
-        {"name": "R. Baley", "bio": "Wahrheit auf dem nassen Asphalt der Stadt."},
-        {"name": "R. Seldon", "bio": "Statistische Perfektion im Miteinander."}
-    ]
-
     profiles_db = []
     print("🚀 [UPGRADE] AIM aktualisiert die 100 Seelen für v0.2.1...")
+    region_key = load_region_key()   # derselbe Regions-Hash wie in der App, sonst greift "Nur meine Region" nicht
 
     for i in range(100):
-        base = archetypes[i % len(archetypes)]
+        base = ARCHETYPES[i % len(ARCHETYPES)]
         name = f"{base['name']} #{i+1}" if i >= 10 else base['name']
         
         # NEU: Zufällige Metadaten für die Filterlogik
@@ -43,9 +44,7 @@ def run_upgrade():
         loc = random.choice(CITIES)
         search = random.choice(SEARCH_OPTIONS)
 
-        print(f"➡️  Vektorisierung & Metadaten: {name} ({gender} in {loc})", end="\r")
-        
-        vector = get_embedding(base['bio'])
+        print(f"➡️  Metadaten: {name} ({gender} in {loc})", end="\r")
         
         profiles_db.append({
             "id": f"bot_{i}",
@@ -53,16 +52,25 @@ def run_upgrade():
             "gender": gender,
             "search": search,
             "loc": loc,
+            "region": region_hash(loc, region_key),
             "type": "test_R",
             "manifesto": base['bio'],
-            "vector": vector,
             "timestamp": "2025-12-26T21:00:00"
         })
 
-    with open('profiles_db.json', 'w', encoding='utf-8') as f:
-        json.dump(profiles_db, f, ensure_ascii=False, indent=2)
+    print(f"\n➡️  Vektorisierung: {len(profiles_db)} Profile...")
+    # Backend erst hier, damit CITIES & Co. ohne API-Key importierbar sind
+    backend = get_backend()
+    for profile, vector in zip(profiles_db, get_embeddings([p["manifesto"] for p in profiles_db], backend)):
+        profile["vector"] = vector
+        backend.tag(profile)
+
+    store = ProfileStore()
+    store.reset()
+    store.extend(profiles_db)
     
-    print(f"\n✅ [DONE] 100 Profile für v0.2.1 in 'profiles_db.json' aktualisiert!")
+    print(f"\n✅ [DONE] 100 Profile für v0.2.1 in '{store.root}' aktualisiert!")
+    print(f"📦 Embedding-Cache: {get_cache().stats()}")
 
 if __name__ == "__main__":
     run_upgrade()
\ No newline at end of file
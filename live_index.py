@@ -0,0 +1,124 @@
+import threading
+import numpy as np
+from ann_index import ANN_MIN_PROFILES, IVFIndex
+import warm_start
+from matching import MatchingIndex, SharedMatchingIndex
+from metrics import METRICS
+from sharding import FANOUT_MIN, RegionShards
+
+# --- LIVE-INDEX ---
+# Hält ProfileStore und Matching-Index zwischen Streamlit-Reruns im Speicher
+# (in app.py per st.cache_resource). Jede Anfrage prüft per stat(), ob sich
+# meta.jsonl geändert hat, und hängt nur die neuen Profile an – kein Neuladen der DB.
+# Nur wenn der Store ersetzt/geleert wurde (generation), wird neu aufgebaut.
+# Bearbeitete/gelöschte Profile (neue Meta-Zeile für einen alten Slot) werden an ihrer Position ersetzt.
+# Regionale Anfragen scannen nur ihren Shard, weite ab FANOUT_MIN alle Shards parallel (sharding.py).
+# Mit gemeinsamer Matrix startet der Index aus dem Warm-Start (warm_start.py) statt meta.jsonl zu parsen.
+
+
+class LiveIndex:
+    def __init__(self, store, build=MatchingIndex.from_store, shared=False, warm=True):
+        self.store = store
+        self._build = build
+        self._warm = shared and warm   # Warm-Start nur mit gemeinsamer Matrix (profile_store.SharedMatrix)
+        self._lock = threading.Lock()
+        self._rebuild(warm=self._warm)
+
+    def _rebuild(self, warm=False):
+        with METRICS.stage("index_build"):
+            loaded = warm_start.load(self.store) if warm else None
+            if loaded is not None:
+                columns, header = loaded
+                self.index = SharedMatchingIndex(self.store, *columns)
+                stale = warm_start.is_stale(self.store, header)
+            else:
+                self.store.refresh()
+                self.index = self._build(self.store)
+                stale = self._warm
+            if stale:
+                warm_start.build_in_background(self.store.root)
+            self.generation = self.store.generation
+            self.shards = RegionShards(self.index.regions)
+            self.ann = self._load_ann() if len(self.store) >= ANN_MIN_PROFILES else None
+
+    def _load_ann(self):
+        """IVF-Listen mit Slots; bewertet wird über die Matrix des Matching-Index (float32 geteilt oder int8)."""
+        return IVFIndex.load_or_build(self.store, scores=lambda query, ids: self.index.scores(query, ids))
+
+    def _sync(self):
+        """Bringt den Index auf den Stand des Stores (O(neue Profile))."""
+        with METRICS.stage("db_read"):
+            entries = self.store.refresh()
+            if self.store.generation != self.generation:
+                self._rebuild()
+                return
+            known, total = len(self.index), len(self.store)
+            changed = sorted({entry["slot"] for entry in entries if entry["slot"] < known})
+            if changed:
+                self._replace(changed)
+            if total <= known:
+                return
+            vectors = np.asarray(self.store.vectors()[known:total])
+            self.index.extend(vectors, [self.store.record(slot) for slot in range(known, total)])
+            self.shards.add(self.index.regions[known:total])
+            if self.ann is not None:
+                self.ann.add(np.arange(known, total), vectors)
+            elif total >= ANN_MIN_PROFILES:
+                self.ann = self._load_ann()
+
+    def _replace(self, slots):
+        vectors = np.asarray(self.store.vectors()[slots])
+        self.index.update(slots, vectors, [self.store.record(slot) for slot in slots])
+        self.shards.update(slots, self.index.regions[slots])
+        if self.ann is not None:
+            self.ann.update(slots, vectors)   # O(1) je Slot; die Datei holt das beim nächsten Laden nach
+
+    def refresh(self):
+        with self._lock:
+            self._sync()
+
+    def add(self, records):
+        """Speichert neue Profile und hängt sie direkt an den Index an. Liefert die Slots."""
+        with self._lock:
+            with METRICS.stage("db_write"):
+                slots = self.store.extend(records)
+            self._sync()
+        return slots
+
+    def update(self, slot, changes):
+        """Bearbeitet ein Profil (z.B. neues Manifest) – Store und Index in O(1)."""
+        with self._lock:
+            with METRICS.stage("db_write"):
+                entry = self.store.update(slot, changes)
+            self._sync()
+            self._replace([slot])
+        return entry
+
+    def delete(self, slot):
+        """Löscht ein Profil; es taucht sofort in keinem Match mehr auf."""
+        with self._lock:
+            with METRICS.stage("db_write"):
+                self.store.delete(slot)
+            self._sync()
+            self._replace([slot])
+
+    def query(self, vector, k=5, exclude=None, **filters):
+        """Top-k (Slot, Score). Mit `region` exakt im Shard der Region; sonst ab FANOUT_MIN exakt
+        über alle Shards parallel, ab ANN_MIN_PROFILES über den IVF-Index, darunter exakt."""
+        with self._lock:
+            self._sync()
+            with METRICS.stage("matching"):
+                if filters.get("region"):
+                    rows = self.shards.rows(filters["region"])
+                    return self.index.query(vector, k=k, exclude=exclude, rows=rows, **filters)
+                fan_out = len(self.index) >= FANOUT_MIN
+                if self.ann is None and not fan_out:
+                    return self.index.query(vector, k=k, exclude=exclude, **filters)
+                allowed = self.index.mask(**filters)
+                if exclude is not None:
+                    allowed[exclude] = False
+                if fan_out:
+                    return self.shards.fan_out(self.store, vector, k, allowed)
+                # Mit Re-Rank (int8/float16): mehr Kandidaten holen, die der Index aus dem memmap nachsortiert
+                ids, scores = self.ann.search(vector, k=max(k, self.index.rerank), allowed=allowed)
+                return self.index.rank(vector, ids, scores, k)
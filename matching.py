@@ -0,0 +1,240 @@
+import numpy as np
+from embedding_backends import space_of
+
+# --- MATCHING ENGINE ---
+# Alle Profil-Vektoren liegen in EINER vorab normierten float32-Matrix.
+# Eine Anfrage ist damit ein einziges Matrix-Vektor-Produkt plus argpartition,
+# statt einer Python-Schleife über calculate_similarity.
+
+ALL = "all"
+UNKNOWN_GENDER = ""   # DNA-Einträge fragen das eigene Geschlecht nicht ab
+
+# Die Generatoren speichern "search" als Freitext, die App "target_gender" als Code.
+SEARCH_TO_TARGET = {
+    "Partnerin (w)": "w",
+    "Partner (m)": "m",
+    "Freunde (egal)": ALL,
+}
+
+
+def target_of(record):
+    """Liefert das gesuchte Geschlecht eines Profils als Code ('m', 'w', 'd' oder 'all')."""
+    target = record.get("target_gender")
+    if target is None:
+        target = SEARCH_TO_TARGET.get(record.get("search"), ALL)
+    return target or ALL
+
+
+def accepts(target, gender):
+    """Findet, wer `target` sucht, ein Profil mit `gender`? Elementweise über Arrays oder Skalare.
+
+    Die eine Regel für Live-Suche (filter_mask) und Nacht-Tabelle (reciprocal_matches): 'all' nimmt jeden,
+    ein gezieltes Ziel nur genau dieses Geschlecht – ein unbekanntes Geschlecht erfüllt kein gezieltes Ziel.
+    """
+    target, gender = np.asarray(target, dtype=object), np.asarray(gender, dtype=object)
+    return (target == ALL) | ((target == gender) & (gender != UNKNOWN_GENDER))
+
+
+def normalize_loc(loc):
+    """Vergleichbare Form eines Ortsnamens (Groß/Klein und Leerzeichen egal)."""
+    return (loc or "").strip().casefold()
+
+
+def normalize_rows(matrix):
+    """Normiert jede Zeile auf Länge 1 (Nullvektoren bleiben Null)."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k(scores, k):
+    """Indizes der k höchsten Scores, absteigend sortiert (O(n) statt O(n log n))."""
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    idx = np.argpartition(-scores, k - 1)[:k]
+    return idx[np.argsort(-scores[idx], kind="stable")]
+
+
+def limit_blas_threads():
+    """Für Prozess-Pool-Worker (Nacht-Job, Shard-Fan-out): Parallelität kommt aus den Prozessen, nicht aus BLAS."""
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(1)
+    except ImportError:
+        pass
+
+
+def filter_mask(genders, targets, locs, spaces, alive, regions,
+                gender=None, target_gender=None, loc=None, space=None, region=None):
+    """Filter als Bool-Maske über Spalten-Arrays (auch ohne Vektor-Matrix nutzbar, z.B. für den ANN-Index).
+
+    `space`: nur Profile aus demselben Embedding-Raum sind überhaupt vergleichbar.
+    `region`: verschlüsselter Regions-Hash (siehe sharding.py), nie der Klartext-Ort.
+    `gender`: eigenes Geschlecht für die Gegenrichtung (accepts) – None prüft sie nicht,
+    UNKNOWN_GENDER ("") findet nur Profile, die 'all' suchen.
+    Gelöschte Profile (alive=False) fallen immer heraus.
+    """
+    mask = np.array(alive, dtype=bool)
+    if space:
+        mask &= spaces == space
+    if region:
+        mask &= regions == region
+    if target_gender:
+        mask &= accepts(target_gender, genders)
+    if gender is not None:
+        mask &= accepts(targets, gender)
+    if loc:
+        mask &= locs == normalize_loc(loc)
+    return mask
+
+
+def record_mask(records, gender=None, target_gender=None, loc=None, space=None, region=None, loc_of=None):
+    columns = [np.asarray(c, dtype=object) for c in columns_of(records, loc_of)]
+    return filter_mask(*columns, gender, target_gender, loc, space, region)
+
+
+def columns_of(records, loc_of=None):
+    loc_of = loc_of or (lambda r: r.get("loc", ""))
+    return (
+        [r.get("gender", "") for r in records],
+        [target_of(r) for r in records],
+        [normalize_loc(loc_of(r)) for r in records],
+        [space_of(r) for r in records],
+        [not r.get("deleted") for r in records],
+        [r.get("region", "") for r in records],
+    )
+
+
+class MatchingIndex:
+    """Normierte Vektor-Matrix plus Filter-Spalten für gender/target_gender/loc/Embedding-Raum.
+
+    Alle Spalten liegen in Puffern mit Reserve-Kapazität: neue Profile werden per
+    extend() angehängt (amortisiert O(1)), ohne die Matrix neu aufzubauen.
+    """
+
+    rerank = 0   # Kandidaten, die rank() mit voller Genauigkeit nachsortiert (quantization.QuantizedIndex)
+
+    def __init__(self, vectors, genders, targets, locs, spaces, alive, regions):
+        self._n = 0
+        self._columns = {}
+        self._append(self._encode(vectors), genders, targets, locs, spaces, alive, regions)
+
+    def _encode(self, vectors):
+        """Darstellung der Vektoren im Index (Unterklassen: komprimiert)."""
+        return {"matrix": normalize_rows(vectors)}
+
+    @staticmethod
+    def _with_columns(encoded, genders, targets, locs, spaces, alive, regions):
+        return dict(
+            encoded,
+            genders=np.asarray(genders, dtype=object),
+            targets=np.asarray(targets, dtype=object),
+            locs=np.asarray(locs, dtype=object),
+            spaces=np.asarray(spaces, dtype=object),
+            alive=np.asarray(alive, dtype=bool),
+            regions=np.asarray(regions, dtype=object),
+        )
+
+    def _append(self, encoded, *columns):
+        columns = self._with_columns(encoded, *columns)
+        needed = self._n + len(columns["genders"])
+        for name, values in columns.items():
+            buffer = self._columns.get(name)
+            if buffer is None or (self._n == 0 and buffer.shape[1:] != values.shape[1:]):
+                buffer = np.empty((0,) + values.shape[1:], dtype=values.dtype)
+            if needed > len(buffer):
+                grown = np.empty((max(needed, 2 * len(buffer)),) + values.shape[1:], dtype=values.dtype)
+                grown[:self._n] = buffer[:self._n]
+                buffer = grown
+            buffer[self._n:needed] = values
+            self._columns[name] = buffer
+        self._n = needed
+
+    def extend(self, vectors, records, loc_of=None):
+        """Hängt neue Profile an (z.B. frisch gespeicherte DNA) – ohne Neuaufbau."""
+        self._append(self._encode(vectors), *columns_of(records, loc_of))
+
+    def update(self, positions, vectors, records, loc_of=None):
+        """Überschreibt bestehende Profile (bearbeitet oder gelöscht) an ihrer Position."""
+        positions = np.asarray(positions, dtype=np.int64)
+        for name, values in self._with_columns(self._encode(vectors), *columns_of(records, loc_of)).items():
+            self._columns[name][positions] = values
+
+    matrix = property(lambda self: self._columns["matrix"][:self._n])
+    genders = property(lambda self: self._columns["genders"][:self._n])
+    targets = property(lambda self: self._columns["targets"][:self._n])
+    locs = property(lambda self: self._columns["locs"][:self._n])
+    spaces = property(lambda self: self._columns["spaces"][:self._n])
+    alive = property(lambda self: self._columns["alive"][:self._n])
+    regions = property(lambda self: self._columns["regions"][:self._n])
+
+    @classmethod
+    def from_profiles(cls, profiles, loc_of=None):
+        """Baut den Index aus Profil-Dicts. `loc_of` liefert den Ort (z.B. entschlüsselt)."""
+        vectors = [p["vector"] for p in profiles]
+        dim = len(vectors[0]) if vectors else 0
+        return cls(np.asarray(vectors, dtype=np.float32).reshape(len(vectors), dim),
+                   *columns_of(profiles, loc_of))
+
+    @classmethod
+    def from_store(cls, store, loc_of=None):
+        """Baut den Index direkt aus dem memmap eines ProfileStore (ohne Listen-Umweg)."""
+        return cls(store.vectors(), *columns_of(store.records(), loc_of))
+
+    def __len__(self):
+        return self._n
+
+    def mask(self, gender=None, target_gender=None, loc=None, space=None, region=None, rows=None):
+        """Boolesche Filtermaske: beide Seiten müssen zueinander passen. `rows`: nur diese Positionen."""
+        columns = (self.genders, self.targets, self.locs, self.spaces, self.alive, self.regions)
+        if rows is not None:
+            columns = [column[rows] for column in columns]
+        return filter_mask(*columns, gender, target_gender, loc, space, region)
+
+    def scores(self, vector, rows=None):
+        """Cosinus-Ähnlichkeit der Anfrage zu allen Profilen (oder nur zu `rows`)."""
+        query = normalize_rows(vector).ravel()
+        return (self.matrix if rows is None else self.matrix[rows]) @ query
+
+    def query(self, vector, k=5, gender=None, target_gender=None, loc=None, space=None, region=None,
+              exclude=None, rows=None):
+        """Top-k Matches als Liste von (Position, Score). `rows` begrenzt die Suche (z.B. auf einen Shard)."""
+        if len(self) == 0:
+            return []
+        positions = np.arange(len(self)) if rows is None else np.asarray(rows, dtype=np.int64)
+        scores = self.scores(vector, rows)
+        mask = self.mask(gender, target_gender, loc, space, region, rows)
+        if exclude is not None:
+            mask &= positions != exclude
+        scores = np.where(mask, scores, -np.inf)
+        best = top_k(scores, min(k, int(mask.sum())))
+        return [(int(positions[i]), float(scores[i])) for i in best]
+
+    def rank(self, vector, positions, scores, k=5):
+        """Top-k (Position, Score) aus schon bewerteten Kandidaten (z.B. aus dem IVF-Index)."""
+        return [(int(positions[i]), float(scores[i])) for i in top_k(np.asarray(scores), k)]
+
+
+class SharedMatchingIndex(MatchingIndex):
+    """MatchingIndex ohne eigene Matrix: liest zero-copy aus der gemeinsamen Datei des Stores.
+
+    Mehrere App-Prozesse hinter einem Proxy teilen sich so dieselben Seiten im Page-Cache
+    (siehe profile_store.SharedMatrix); pro Prozess bleiben nur die Filter-Spalten im RAM.
+    """
+
+    def __init__(self, store, genders, targets, locs, spaces, alive, regions):
+        self.store = store
+        super().__init__(None, genders, targets, locs, spaces, alive, regions)
+
+    def _encode(self, vectors):
+        return {}   # die Vektoren schreibt der Store selbst in die gemeinsame Matrix
+
+    @property
+    def matrix(self):
+        return self.store.shared_matrix()[:self._n]
+
+    @classmethod
+    def from_store(cls, store, loc_of=None):
+        return cls(store, *columns_of(store.records(), loc_of))
@@ -0,0 +1,241 @@
+import atexit
+import bisect
+import glob
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+import numpy as np
+
+# --- METRIKEN (HOT-PATH) ---
+# Zeitmessung pro Stufe (env, embedding, encryption, db_read, db_write, matching, telegram),
+# Zähler für API-Calls und Tokens sowie eine laufende €-Schätzung nach KOSTEN.md.
+#   with METRICS.request("dna"):          # ein Nutzer-Request = eine Spur
+#       with METRICS.stage("embedding"):   # Stufen darin landen in Histogramm UND Spur
+#           ...
+# Das Modul lebt über Streamlit-Reruns hinweg (sys.modules): Latenzen und Spuren gelten pro Prozess.
+# Zähler (API-Calls, Tokens, DNA, Pillar-Analysen ...) landen zusätzlich gebündelt in SQLite (flush bei
+# export() und Prozessende, z.B. der create_*-Skripte) – wie rate_limit.py: über Neustarts und für alle
+# Prozesse auf derselben Datei. Daraus rechnet die €-Schätzung.
+# Export als Prometheus-Textdateien (z.B. für den node_exporter textfile collector): Zähler und Kosten
+# aller Prozesse in aim_metrics.prom, die Histogramme jedes Prozesses in aim_metrics.<pid>.prom.
+
+METRICS_PATH = os.getenv("AIM_METRICS_PATH", "aim_metrics.prom")
+COUNTER_PATH = os.getenv("AIM_COUNTER_PATH", "aim_counters.sqlite")
+WINDOW = 1000        # rollendes Fenster je Stufe (für p50/p99 im Admin-Panel)
+TRACES = 50          # letzte Requests mit Aufschlüsselung nach Stufe
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# KOSTEN.md: C_total = C_fixed + Users × 0,006 €
+COST_FIXED = 10.00            # OpenAI Prepaid Credit als Puffer
+# Vektorisierung nach Tokens (text-embedding-3-small: ~0,02 € pro 1 Mio.) – ein Manifest besteht
+# seit multi_vector.py aus bis zu MAX_CHUNKS Abschnitten, "pro Text" wäre zu grob
+COST_EMBEDDING_TOKEN = float(os.getenv("AIM_EMBEDDING_EUR_PER_MTOK", "0.02")) / 1_000_000
+COST_PILLARS = 0.005          # KI-Extraktion (Pillars) pro Analyse
+COST_PER_USER = 0.006
+
+
+class Metrics:
+    def __init__(self, window=WINDOW, traces=TRACES, path=COUNTER_PATH):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self.path = path
+        self._db = None
+        self._pending = {}                 # seit dem letzten flush() gezählt
+        self._local = threading.local()
+        self.window = window
+        self.started = time.time()
+        self.recent = {}                   # stage -> deque der letzten Dauern (s)
+        self.buckets = {}                  # stage -> kumulative Bucket-Zähler (Prometheus)
+        self.totals = {}                   # stage -> [count, sum]
+        self.counters = {}                 # dieser Prozess seit dem Start
+        self.traces = deque(maxlen=traces)
+
+    def observe(self, stage, seconds, traced=True):
+        with self._lock:
+            if stage not in self.recent:
+                self.recent[stage] = deque(maxlen=self.window)
+                self.buckets[stage] = [0] * (len(BUCKETS) + 1)
+                self.totals[stage] = [0, 0.0]
+            self.recent[stage].append(seconds)
+            self.buckets[stage][bisect.bisect_left(BUCKETS, seconds)] += 1
+            self.totals[stage][0] += 1
+            self.totals[stage][1] += seconds
+        trace = getattr(self._local, "trace", None)
+        if traced and trace is not None:
+            trace["stages"][stage] = trace["stages"].get(stage, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, stage):
+        """Misst einen Block. In der Request-Spur zählt nur die äußerste Stufe (keine Doppelzählung)."""
+        depth = getattr(self._local, "depth", 0)
+        self._local.depth = depth + 1
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._local.depth = depth
+            self.observe(stage, time.perf_counter() - t0, traced=depth == 0)
+
+    @contextmanager
+    def request(self, kind):
+        """Sammelt alle Stufen eines Requests zu einer Spur (welche Stufe macht ihn langsam?)."""
+        trace = {"kind": kind, "time": time.time(), "stages": {}}
+        self._local.trace = trace
+        t0 = time.perf_counter()
+        try:
+            yield trace
+        finally:
+            self._local.trace = None
+            trace["total"] = time.perf_counter() - t0
+            self.observe(f"request_{kind}", trace["total"], traced=False)
+            with self._lock:
+                self.traces.append(trace)
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+            self._pending[name] = self._pending.get(name, 0) + n
+
+    # --- ZÄHLER ÜBER ALLE PROZESSE (SQLITE) ---
+    def _connect(self):
+        if self._db is None:
+            # isolation_level=None: Transaktionen steuern wir selbst (BEGIN IMMEDIATE)
+            self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=10)
+            self._db.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        return self._db
+
+    def flush(self):
+        """Addiert die seit dem letzten Mal gezählten Werte in der gemeinsamen SQLite-Datei auf."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        with self._flush_lock:
+            try:
+                db = self._connect()
+                db.execute("BEGIN IMMEDIATE")
+                try:
+                    db.executemany("INSERT INTO counters (name, value) VALUES (?, ?) "
+                                   "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                                   list(pending.items()))
+                    db.execute("COMMIT")
+                except BaseException:
+                    db.execute("ROLLBACK")
+                    raise
+            except sqlite3.Error:
+                with self._lock:   # beim nächsten Mal erneut versuchen, nichts geht verloren
+                    for name, n in pending.items():
+                        self._pending[name] = self._pending.get(name, 0) + n
+
+    def counter_totals(self):
+        """Zähler aller Prozesse über Neustarts hinweg (ohne lesbare Datei: nur dieser Prozess)."""
+        self.flush()
+        try:
+            with self._flush_lock:
+                return dict(self._connect().execute("SELECT name, value FROM counters").fetchall())
+        except sqlite3.Error:
+            with self._lock:
+                return dict(self.counters)
+
+    # --- AUSWERTUNG ---
+    def summary(self):
+        """Pro Stufe: Anzahl, p50/p99/max im rollenden Fenster (ms)."""
+        with self._lock:
+            recent = {stage: np.asarray(values) * 1000 for stage, values in self.recent.items()}
+            totals = {stage: list(t) for stage, t in self.totals.items()}
+        return {stage: {"count": totals[stage][0],
+                        "p50_ms": float(np.percentile(ms, 50)),
+                        "p99_ms": float(np.percentile(ms, 99)),
+                        "max_ms": float(ms.max())}
+                for stage, ms in recent.items() if len(ms)}
+
+    def samples(self, stage):
+        with self._lock:
+            return [s * 1000 for s in self.recent.get(stage, ())]
+
+    def cost_estimate(self, totals=None):
+        """Laufende €-Schätzung nach der KOSTEN.md-Formel – über alle Prozesse (counter_totals())."""
+        totals = self.counter_totals() if totals is None else totals
+        users = totals.get("dna_created", 0)
+        tokens = totals.get("embedding_tokens", 0)
+        analyses = totals.get("pillar_analyses", 0)
+        variable = tokens * COST_EMBEDDING_TOKEN + analyses * COST_PILLARS
+        return {
+            "users": users,
+            "variable_eur": variable,
+            "formula_eur": COST_FIXED + users * COST_PER_USER,
+            "credit_left_eur": COST_FIXED - variable,
+        }
+
+    # --- PROMETHEUS ---
+    def process_text(self):
+        """Histogramme dieses Prozesses (Label pid, damit mehrere Worker sich nicht überschreiben)."""
+        pid = os.getpid()
+        lines = ["# HELP aim_stage_seconds Dauer je Stufe im Hot-Path",
+                 "# TYPE aim_stage_seconds histogram"]
+        with self._lock:
+            for stage in sorted(self.buckets):
+                cumulative = 0
+                for le, n in zip(BUCKETS + ("+Inf",), self.buckets[stage]):
+                    cumulative += n
+                    lines.append(f'aim_stage_seconds_bucket{{pid="{pid}",stage="{stage}",le="{le}"}} {cumulative}')
+                count, total = self.totals[stage]
+                lines.append(f'aim_stage_seconds_sum{{pid="{pid}",stage="{stage}"}} {total:.6f}')
+                lines.append(f'aim_stage_seconds_count{{pid="{pid}",stage="{stage}"}} {count}')
+        lines += ["# TYPE aim_start_time_seconds gauge", f'aim_start_time_seconds{{pid="{pid}"}} {self.started:.0f}']
+        return "\n".join(lines) + "\n"
+
+    def totals_text(self):
+        """Zähler und Kosten aller Prozesse (aus SQLite)."""
+        totals = self.counter_totals()
+        lines = []
+        for name in sorted(totals):
+            lines += [f"# TYPE aim_{name}_total counter", f"aim_{name}_total {totals[name]}"]
+        cost = self.cost_estimate(totals)
+        lines += ["# TYPE aim_cost_eur gauge",
+                  f'aim_cost_eur{{kind="variable"}} {cost["variable_eur"]:.6f}',
+                  f'aim_cost_eur{{kind="formula"}} {cost["formula_eur"]:.6f}',
+                  f'aim_cost_eur{{kind="credit_left"}} {cost["credit_left_eur"]:.6f}']
+        return "\n".join(lines) + "\n"
+
+    def prometheus_text(self):
+        return self.totals_text() + self.process_text()
+
+    def export(self, path=METRICS_PATH):
+        """Schreibt die Prometheus-Dateien atomar (Scraper sieht nie eine halbe Datei).
+
+        `path`: Zähler/Kosten aller Prozesse; daneben <name>.<pid>.prom mit den Histogrammen dieses
+        Prozesses. Dateien beendeter Prozesse werden dabei entfernt.
+        """
+        base, ext = os.path.splitext(path)
+        own = f"{base}.{os.getpid()}{ext}"
+        for text, target in ((self.totals_text(), path), (self.process_text(), own)):
+            tmp = f"{target}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp, target)
+        for other in glob.glob(f"{glob.escape(base)}.*{ext}"):
+            pid = other[len(base) + 1:len(other) - len(ext)]
+            if pid.isdigit() and not _alive(int(pid)):
+                try:
+                    os.remove(other)
+                except FileNotFoundError:
+                    pass   # schon von einem anderen Prozess aufgeräumt
+        return path
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+METRICS = Metrics()
+atexit.register(METRICS.flush)   # auch kurzlebige Skripte (create_*) zählen mit
@@ -0,0 +1,159 @@
+import os
+import re
+import numpy as np
+from matching import normalize_rows, top_k
+from profile_store import ProfileStore
+
+# --- MULTI-VEKTOR-MANIFESTE ---
+# Ein langes Manifest in EINEM Vektor verwischt seine Themen (Musik, Werte, Resilienz ...),
+# die Master-Profile trennen sie deshalb von Hand in Säulen. Hier passiert das automatisch:
+#   chunk_text      -> Absätze/Sätze zu Abschnitten von ~CHUNK_CHARS Zeichen (höchstens MAX_CHUNKS)
+#   embed_manifestos -> alle Abschnitte aller Manifeste in EINEM gebatchten embed()-Aufruf
+#   ChunkSets       -> Vektor-Set pro Profil in einem eigenen Store (Unterordner chunks/, ohne
+#                      SharedMatrix), das Profil verweist per "chunks": [erster Slot, Anzahl] darauf
+# Der Profil-Vektor im Haupt-Store ist das nach Länge gewichtete Mittel der Abschnitte (pooled).
+# Er bleibt der Einstieg für Index, Shards, IVF und Nacht-Tabelle (Kandidaten-Vorauswahl);
+# nur die besten MULTI_PRUNE Kandidaten werden per Late Interaction über ein gepolstertes
+# Tensor (Kandidaten × Abschnitte × dim) neu bewertet. Kurze Manifeste = ein Abschnitt = wie bisher.
+
+CHUNK_DIR = "chunks"
+CHUNK_CHARS = int(os.getenv("AIM_CHUNK_CHARS", "500"))
+MAX_CHUNKS = int(os.getenv("AIM_MAX_CHUNKS", "8"))
+MULTI_PRUNE = int(os.getenv("AIM_MULTI_PRUNE", "50"))
+MULTI_SCORE = os.getenv("AIM_MULTI_SCORE", "maxsim")   # maxsim | mean
+SCORE_MODES = ("maxsim", "mean")
+
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+")
+_PARAGRAPH = re.compile(r"\n\s*\n")
+
+
+def chunk_text(text, chunk_chars=CHUNK_CHARS, max_chunks=MAX_CHUNKS):
+    """Zerlegt einen Text in thematische Abschnitte: Sätze werden bis `chunk_chars` gepackt,
+    ein neuer Absatz beginnt einen neuen Abschnitt, sobald der aktuelle ein Drittel voll ist."""
+    text = (text or "").strip()
+    if len(text) <= chunk_chars:
+        return [text] if text else []
+    chunk_chars = max(chunk_chars, -(-len(text) // max_chunks))   # lange Texte: größere Abschnitte
+    chunks, current = [], ""
+    for paragraph in _PARAGRAPH.split(text):
+        if current and len(current) >= chunk_chars // 3:
+            chunks.append(current)
+            current = ""
+        for sentence in _SENTENCE_END.split(paragraph.strip()):
+            sentence = " ".join(sentence.split())
+            if not sentence:
+                continue
+            if current and len(current) + 1 + len(sentence) > chunk_chars:
+                chunks.append(current)
+                current = sentence
+            else:
+                current = f"{current} {sentence}" if current else sentence
+    if current:
+        chunks.append(current)
+    if len(chunks) > max_chunks:
+        chunks[max_chunks - 1:] = [" ".join(chunks[max_chunks - 1:])]
+    return chunks
+
+
+def pool(vectors, weights):
+    """Gewichtetes Mittel normierter Abschnitts-Vektoren, wieder normiert (der Profil-Vektor)."""
+    return normalize_rows(np.asarray(weights, dtype=np.float32) @ vectors).ravel()
+
+
+def embed_manifestos(backend, texts):
+    """Liste von (pooled, Abschnitts-Vektoren (L, dim), Gewichte (L,)) – ein embed()-Aufruf für alles."""
+    return embed_chunked(backend, [chunk_text(text) or [text] for text in texts])
+
+
+def embed_chunked(backend, chunk_lists):
+    """Wie embed_manifestos, aber für bereits zerlegte Texte (z.B. Neu-Einbettung mit fester Abschnittszahl)."""
+    vectors = normalize_rows(backend.embed([chunk for chunks in chunk_lists for chunk in chunks]))
+    results, start = [], 0
+    for chunks in chunk_lists:
+        lengths = np.array([len(chunk) for chunk in chunks], dtype=np.float32)
+        weights = lengths / lengths.sum() if lengths.sum() else np.full(len(chunks), 1 / len(chunks), np.float32)
+        own = vectors[start:start + len(chunks)]
+        results.append((pool(own, weights), own, weights))
+        start += len(chunks)
+    return results
+
+
+def embed_manifesto(backend, text):
+    return embed_manifestos(backend, [text])[0]
+
+
+def late_interaction(query, query_weights, tensor, weights, mode=MULTI_SCORE):
+    """Scores (m,) aller Kandidaten in einem einsum über das gepolsterte Tensor.
+
+    query (q, dim) und tensor (m, L, dim) normiert; weights (m, L) mit 0 für Polster-Zeilen.
+      maxsim -> symmetrisch: jeder Abschnitt sucht seinen besten Partner-Abschnitt,
+                gewichtetes Mittel über beide Richtungen
+      mean   -> gewichtetes Mittel über alle Abschnitts-Paare
+    """
+    if mode not in SCORE_MODES:
+        raise ValueError(f"Unbekannter Score-Modus '{mode}' (erlaubt: {', '.join(SCORE_MODES)}).")
+    query_weights = np.asarray(query_weights, dtype=np.float32)
+    sims = np.einsum("qd,mld->mql", query, tensor)   # (m, q, L)
+    if mode == "mean":
+        return np.einsum("q,mql,ml->m", query_weights, sims, weights)
+    padded = (weights == 0)[:, None, :]
+    query_to_candidate = np.where(padded, -np.inf, sims).max(axis=2) @ query_weights
+    candidate_to_query = (np.where(padded, 0.0, sims).max(axis=1) * weights).sum(axis=1)
+    return (query_to_candidate + candidate_to_query) / 2
+
+
+class ChunkSets:
+    """Abschnitts-Vektoren aller Profile: eigener ProfileStore im Unterordner chunks/ des Haupt-Stores.
+
+    Append-only wie der Haupt-Store; ein geändertes Manifest bekommt ein neues Set,
+    das alte wird (wie gelöschte Profile) per Grabstein entfernt und sein Vektor genullt.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        # Abschnitte werden nie als Matrix gemappt (nur per Slot gelesen): keine gemeinsame Matrix
+        self.chunks = ProfileStore(os.path.join(store.root, CHUNK_DIR), shared=False)
+
+    def add(self, vectors, weights):
+        """Speichert ein Set und liefert den Verweis [erster Slot, Anzahl] für das Profil."""
+        slots = self.chunks.extend([{"weight": float(w), "vector": v} for v, w in zip(vectors, weights)])
+        return [slots[0], len(slots)]
+
+    def remove(self, record):
+        if record.get("chunks"):
+            first, count = record["chunks"]
+            for slot in range(first, first + count):
+                self.chunks.delete(slot)
+
+    def of(self, slot):
+        """Abschnitte (L, dim) und Gewichte (L,) eines Profils; ohne Set der Profil-Vektor allein."""
+        record = self.store.record(slot)
+        if not record.get("chunks") or self.chunks.dim != self.store.dim:   # auch: mitten in einer Umstellung
+            return normalize_rows(self.store.vectors()[slot][None]), np.ones(1, dtype=np.float32)
+        first, count = record["chunks"]
+        if first + count > len(self.chunks):
+            self.chunks.refresh()   # von einem anderen Prozess angelegt
+        weights = np.array([self.chunks.record(s).get("weight", 0.0) for s in range(first, first + count)],
+                           dtype=np.float32)
+        return normalize_rows(self.chunks.vectors()[first:first + count]), weights
+
+    def padded(self, slots):
+        """Gepolstertes Tensor (m, L, dim) und Gewichte (m, L) für die Kandidaten `slots`."""
+        self.chunks.refresh()   # neue Sets oder neue Vektor-Spalte (reembed.py) anderer Prozesse
+        sets = [self.of(slot) for slot in slots]
+        width = max((len(w) for _, w in sets), default=1)
+        tensor = np.zeros((len(sets), width, self.store.dim or 0), dtype=np.float32)
+        weights = np.zeros((len(sets), width), dtype=np.float32)
+        for i, (vectors, w) in enumerate(sets):
+            tensor[i, :len(w)] = vectors
+            weights[i, :len(w)] = w
+        return tensor, weights
+
+    def rerank(self, slots, query, query_weights, k=5, mode=MULTI_SCORE):
+        """Top-k (Slot, Score) der vorausgewählten `slots` nach Late Interaction."""
+        if not len(slots):
+            return []
+        slots = np.asarray(slots, dtype=np.int64)
+        tensor, weights = self.padded(slots)
+        scores = late_interaction(query, query_weights, tensor, weights, mode)
+        return [(int(slots[i]), float(scores[i])) for i in top_k(scores, k)]
@@ -0,0 +1,202 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+import telebot
+from telebot import apihelper
+from metrics import METRICS
+
+# --- TELEGRAM-BENACHRICHTIGUNGEN (HINTERGRUND) ---
+# Ein langlebiger Bot, ein Worker-Thread mit Queue: die Streamlit-Seite wartet nie auf Telegram.
+# Ereignisse innerhalb von COALESCE_WINDOW Sekunden werden zu einem Digest zusammengefasst,
+# zwischen zwei Nachrichten liegt mindestens MIN_INTERVAL (Telegram: ~1 Nachricht/s pro Chat),
+# ein 429 mit retry_after wird respektiert. Lehnt Telegram einen Digest ab (4xx), werden seine Ereignisse
+# einzeln nachgesendet – verworfen wird nur, was auch allein abgelehnt wird (Zähler telegram_dropped).
+# Fehler landen in METRICS-Zählern (telegram_errors, telegram_rate_limited) und `last_error`, nicht auf stdout.
+# Jedes Ereignis landet zuerst in der Outbox (SQLite, eine Zeile pro Ereignis mit dem PID seines
+# Prozesses) und wird nach dem Versand gelöscht. Mehrere App-Prozesse teilen sich die Datei, jeder
+# quittiert nur seine eigenen Zeilen. Offene Ereignisse eines beendeten Prozesses übernimmt genau
+# ein anderer (beim Start oder alle ORPHAN_CHECK Sekunden) und stellt sie erneut zu.
+#
+# Lokal testen: python fake_telegram_api.py 8081  +  TELEGRAM_API_URL=http://127.0.0.1:8081
+
+OUTBOX_PATH = "telegram_outbox.sqlite"
+COALESCE_WINDOW = 5.0
+MIN_INTERVAL = 1.0
+MAX_DIGEST = 20          # Ereignisse pro Nachricht (Telegram-Limit: 4096 Zeichen)
+MAX_BACKOFF = 300.0
+ORPHAN_CHECK = 60.0      # Sekunden zwischen zwei Suchen nach Ereignissen beendeter Prozesse
+SENT, REJECTED, STOPPED = "sent", "rejected", "stopped"
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass   # Prozess existiert, gehört nur einem anderen Nutzer
+    return True
+
+
+class TelegramNotifier:
+    def __init__(self, token, chat_id, outbox_path=OUTBOX_PATH, window=COALESCE_WINDOW,
+                 min_interval=MIN_INTERVAL, api_url=None):
+        if api_url:
+            # z.B. ein lokaler Fake-Server für Tests
+            apihelper.API_URL = api_url.rstrip("/") + "/bot{0}/{1}"
+        self.bot = telebot.TeleBot(token, threaded=False)
+        self.chat_id = int(chat_id)
+        self.outbox_path = outbox_path
+        self.window = window
+        self.min_interval = min_interval
+        self.sent = 0
+        self.failed = 0
+        self.last_error = None
+        self._queue = queue.Queue()
+        self._outbox_lock = threading.Lock()
+        self._outbox = sqlite3.connect(outbox_path, check_same_thread=False, timeout=10, isolation_level=None)
+        self._outbox.execute("CREATE TABLE IF NOT EXISTS outbox (id TEXT PRIMARY KEY, msg TEXT NOT NULL,"
+                             " silent INTEGER NOT NULL, ts REAL NOT NULL, owner INTEGER NOT NULL)")
+        self._last_send = 0.0
+        self._last_orphan_check = time.monotonic()
+        self._stop = threading.Event()
+        self._claim_orphans(own=True)
+        self._worker = threading.Thread(target=self._run, name="telegram-notifier", daemon=True)
+        self._worker.start()
+
+    # --- API FÜR DIE APP ---
+    def notify(self, msg, silent=False):
+        """Nicht-blockierend: Ereignis in Outbox und Queue legen."""
+        event = {"id": uuid.uuid4().hex, "msg": msg, "silent": silent, "ts": time.time()}
+        with self._outbox_lock:
+            self._append_outbox(event)
+            self._queue.put(event)
+
+    def flush(self, timeout=30.0):
+        """Wartet, bis die Queue abgearbeitet ist (für Skripte und Tests)."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.05)
+        return not self._queue.unfinished_tasks
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        self._worker.join(timeout)
+
+    # --- OUTBOX ---
+    def _append_outbox(self, event):
+        self._outbox.execute("INSERT INTO outbox (id, msg, silent, ts, owner) VALUES (?, ?, ?, ?, ?)",
+                             (event["id"], event["msg"], int(event["silent"]), event["ts"], os.getpid()))
+
+    def _claim_orphans(self, own=False):
+        """Übernimmt offene Ereignisse beendeter Prozesse; `own`: beim Start auch die eines früheren Laufs mit unserem PID."""
+        pid = os.getpid()
+        with self._outbox_lock:
+            self._outbox.execute("BEGIN IMMEDIATE")   # ein Prozess nach dem anderen: nichts doppelt übernommen
+            try:
+                owners = [row[0] for row in self._outbox.execute("SELECT DISTINCT owner FROM outbox")]
+                orphaned = [o for o in owners if (o == pid and own) or (o != pid and not _alive(o))]
+                rows = []
+                for owner in orphaned:
+                    rows += self._outbox.execute("SELECT id, msg, silent, ts FROM outbox WHERE owner = ?"
+                                                 " ORDER BY ts", (owner,)).fetchall()
+                    self._outbox.execute("UPDATE outbox SET owner = ? WHERE owner = ?", (pid, owner))
+                self._outbox.execute("COMMIT")
+            except BaseException:
+                self._outbox.execute("ROLLBACK")
+                raise
+            for id_, msg, silent, ts in sorted(rows, key=lambda row: row[3]):
+                self._queue.put({"id": id_, "msg": msg, "silent": bool(silent), "ts": ts})
+        self._last_orphan_check = time.monotonic()
+
+    def _ack(self, events):
+        with self._outbox_lock:
+            self._outbox.executemany("DELETE FROM outbox WHERE id = ?", [(e["id"],) for e in events])
+
+    # --- WORKER ---
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                first = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                if time.monotonic() - self._last_orphan_check > ORPHAN_CHECK:
+                    self._claim_orphans()
+                continue
+            batch = [first]
+            deadline = time.monotonic() + self.window
+            while len(batch) < MAX_DIGEST:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._deliver(batch)
+
+    def _deliver(self, batch):
+        result = self._send(batch)
+        if result == REJECTED and len(batch) > 1:
+            # Ein kaputtes Ereignis (z.B. Markdown) soll nicht den ganzen Digest mitreißen: einzeln nachsenden
+            for event in batch:
+                if self._send([event]) == REJECTED:
+                    self._drop([event])
+        elif result == REJECTED:
+            self._drop(batch)
+        for _ in batch:
+            self._queue.task_done()
+
+    def _drop(self, events):
+        METRICS.count("telegram_dropped", len(events))
+        self._ack(events)
+
+    def _send(self, events):
+        """Eine Nachricht für `events`, bis sie zugestellt ist: SENT, REJECTED (4xx) oder STOPPED."""
+        if len(events) == 1:
+            text = events[0]["msg"]
+        else:
+            text = f"📬 *{len(events)} Ereignisse*\n" + "\n".join(f"• {e['msg']}" for e in events)
+        silent = all(e["silent"] for e in events)
+        backoff = self.min_interval
+        while not self._stop.is_set():
+            wait = self._last_send + self.min_interval - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                with METRICS.stage("telegram_send"):
+                    self.bot.send_message(self.chat_id, text, parse_mode="Markdown", disable_notification=silent)
+                self._last_send = time.monotonic()
+                self.sent += 1
+                METRICS.count("telegram_messages")
+                self._ack(events)
+                return SENT
+            except apihelper.ApiTelegramException as e:
+                self._failed(e)
+                if e.error_code == 429:
+                    METRICS.count("telegram_rate_limited")
+                    time.sleep((e.result_json or {}).get("parameters", {}).get("retry_after", backoff))
+                    continue
+                if 400 <= e.error_code < 500:
+                    return REJECTED   # nicht wiederholbar: nicht endlos hängen
+            except Exception as e:
+                self._failed(e)
+            time.sleep(backoff)
+            backoff = min(backoff * 2, MAX_BACKOFF)
+        return STOPPED
+
+    def _failed(self, error):
+        self.failed += 1
+        self.last_error = f"{type(error).__name__}: {error}"
+        METRICS.count("telegram_errors")
+
+
+def notifier_from_env():
+    """Notifier aus TELEGRAM_BOT_TOKEN/TELEGRAM_ADMIN_ID, oder None ohne Konfiguration."""
+    token = os.getenv("TELEGRAM_BOT_TOKEN")
+    admin_id = os.getenv("TELEGRAM_ADMIN_ID")
+    if not (token and admin_id):
+        return None
+    return TelegramNotifier(token, admin_id, api_url=os.getenv("TELEGRAM_API_URL"))
@@ -0,0 +1,109 @@
+import json
+import sys
+import numpy as np
+from embedding_backends import space_of
+from matching import normalize_rows, top_k
+from metrics import METRICS
+
+# --- SÄULEN-MATCHING (MULTI-PILLAR) ---
+# Die Master-Profile bestehen aus Säulen (A-D) mit eigenem Vektor und Gewicht.
+# Alle Kandidaten liegen als Tensor (Säulen × Profile × dim) vor, damit die
+# gewichtete Säule-zu-Säule-Ähnlichkeit ein einziger gebatchter matmul ist.
+# Fehlende oder mit 0 gewichtete Säulen werden über Masken ausgeblendet.
+
+PILLAR_IDS = ("A", "B", "C", "D")
+
+
+def _pillar_arrays(profile, dim):
+    """Vektoren (P, dim) und Gewichte (P,) eines Profils; fehlende Säulen bleiben 0."""
+    vectors = np.zeros((len(PILLAR_IDS), dim), dtype=np.float32)
+    weights = np.zeros(len(PILLAR_IDS), dtype=np.float32)
+    for pillar in profile.get("pillars", []):
+        if pillar.get("id") in PILLAR_IDS and pillar.get("vector"):
+            p = PILLAR_IDS.index(pillar["id"])
+            vectors[p] = pillar["vector"]
+            weights[p] = pillar.get("weight", 0.0)
+    return normalize_rows(vectors), weights
+
+
+def _dim_of(profiles):
+    for profile in profiles:
+        for pillar in profile.get("pillars", []):
+            if pillar.get("vector"):
+                return len(pillar["vector"])
+    return 0
+
+
+class PillarIndex:
+    def __init__(self, profiles):
+        self.profiles = list(profiles)
+        self.dim = _dim_of(self.profiles)
+        n, P = len(self.profiles), len(PILLAR_IDS)
+        # Layout (P, n, dim): pro Säule eine zusammenhängende Matrix -> BLAS-freundlich
+        self.tensor = np.zeros((P, n, self.dim), dtype=np.float32)
+        self.weights = np.zeros((n, P), dtype=np.float32)
+        for i, profile in enumerate(self.profiles):
+            vectors, weights = _pillar_arrays(profile, self.dim)
+            self.tensor[:, i, :] = vectors
+            self.weights[i] = weights
+
+    def __len__(self):
+        return self.tensor.shape[1]
+
+    def pillar_scores(self, query_profile):
+        """Cosinus pro Säule für alle Kandidaten: (n, P), ein matmul über alle Säulen."""
+        q_vectors, q_weights = _pillar_arrays(query_profile, self.dim)
+        sims = np.matmul(self.tensor, q_vectors[:, :, None])[:, :, 0].T
+        # Geometrisches Mittel der Gewichte: fehlt eine Säule oder ist sie 0, zählt sie nicht
+        weights = np.sqrt(self.weights * q_weights[None, :])
+        return sims, weights
+
+    def scores(self, query_profile):
+        sims, weights = self.pillar_scores(query_profile)
+        total = weights.sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            scores = (sims * weights).sum(axis=1) / total
+        return np.where(total > 0, scores, -np.inf), sims, weights
+
+    def query(self, query_profile, k=5, mask=None):
+        """Top-k als Liste von (Position, Score, {Säule: Score}) – die Aufschlüsselung nur für die Treffer."""
+        if len(self) == 0:
+            return []
+        scores, sims, weights = self.scores(query_profile)
+        if mask is not None:
+            scores = np.where(mask, scores, -np.inf)
+        best = top_k(scores, min(k, int(np.isfinite(scores).sum())))
+        results = []
+        for i in best:
+            breakdown = {pid: float(sims[i, p]) for p, pid in enumerate(PILLAR_IDS) if weights[i, p] > 0}
+            results.append((int(i), float(scores[i]), breakdown))
+        return results
+
+
+def embed_pillars(backend, profile, pillars=None):
+    """Vektorisiert die Säulen eines Profils (Standard: alle) in einem Request und vermerkt den Raum.
+
+    Eine Säulen-Analyse im Sinne von KOSTEN.md (metrics: pillar_analyses).
+    """
+    pillars = profile["pillars"] if pillars is None else pillars
+    for pillar, vector in zip(pillars, backend.embed([p["text"] for p in pillars])):
+        pillar["vector"] = vector
+    backend.tag(profile)
+    METRICS.count("pillar_analyses")
+    return profile
+
+
+def load_master_profile(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+if __name__ == "__main__":
+    # z.B.: python pillar_matching.py marc_master_profile.json ivee_master_profile.json
+    query, *candidates = [load_master_profile(p) for p in sys.argv[1:]]
+    # Nur Profile aus demselben Embedding-Raum sind vergleichbar
+    candidates = [c for c in candidates if space_of(c) == space_of(query)]
+    index = PillarIndex(candidates)
+    for i, score, breakdown in index.query(query, k=len(candidates)):
+        parts = " | ".join(f"{pid}: {s:.1%}" for pid, s in breakdown.items())
+        print(f"{query['user']} ↔ {candidates[i]['user']}: {score:.1%}  ({parts})")
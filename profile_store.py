@@ -0,0 +1,707 @@
+import datetime
+import fcntl
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+import numpy as np
+
+# --- PROFIL-SPEICHER (BINÄR + MEMMAP) ---
+# Ersetzt die eingerückte profiles_db.json:
+#   vectors.f32  -> append-only float32-Matrix, per np.memmap geöffnet
+#   meta.jsonl   -> eine kompakte JSON-Zeile pro Profil (verschlüsselte Felder, Hash, Zeitstempel, Flags)
+#   manifest.json -> Dimension & Format
+#   keys.sqlite  -> Index vibe_key_hash -> Slot (Bearbeiten/Löschen per persönlichem Code)
+#   matrix.f32 + matrix.hdr -> normierte Kopie der Vektoren für alle App-Prozesse (SharedMatrix)
+# Nach einer Neu-Einbettung (reembed.py) nennt manifest.json abweichende Namen für Vektoren und Matrix.
+# Stores, die niemand als Matrix mappt (Abschnitts-Vektoren, multi_vector.py), haben "matrix": null.
+# Neue Profile werden an beide Dateien angehängt, nichts wird neu geschrieben.
+# Änderungen: Vektor an seiner Stelle überschreiben, neue Meta-Zeile mit gleichem Slot anhängen
+# (die letzte gewinnt). Löschen = Grabstein-Zeile + genullter Vektor. Die Kompaktierung schreibt
+# meta.jsonl mit nur einer Zeile pro Slot neu – erst dann sind alte Inhalte auch physisch weg.
+# DSGVO: ein gelöschter Slot landet zusätzlich in purge.pending; scrub() überschreibt seine alten Zeilen
+# an Ort und Stelle mit gleich langen Grabsteinen (Inode und Byte-Offsets bleiben, anders als beim Kompaktieren).
+# Den Zeitplan (samt den Snapshots) übernimmt snapshots.purge().
+
+STORE_DIR = "profiles_store"
+LEGACY_JSON = "profiles_db.json"
+VECTOR_FILE = "vectors.f32"
+MATRIX_NAME = "matrix"
+PURGE_FILE = "purge.pending"   # gelöschte Slots, deren alte Zeilen noch überschrieben werden müssen
+DTYPE = np.float32
+COMPACT_MIN_STALE = 1000    # überholte Meta-Zeilen, ab denen kompaktiert wird ...
+COMPACT_RATIO = 0.25        # ... wenn sie zudem 25 % der Profile übersteigen
+MATRIX_GROWTH = 1.5         # gemeinsame Matrix wächst in Sprüngen -> Leser müssen selten neu mappen
+MATRIX_MIN_ROWS = 4096
+
+
+class SpaceChanged(ValueError):
+    """Vektor passt nicht (mehr) zum Store: reembed.py hat ihn inzwischen auf einen anderen Raum umgestellt."""
+
+
+def _line(entry):
+    return (json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def is_scrubbed(entry):
+    """Grabstein oder bereits überschriebene Zeile: enthält keine Profildaten mehr."""
+    return bool(entry.get("deleted")) or entry.keys() == {"slot"}
+
+
+def scrubbed_line(line):
+    """Gleich lange Grabstein-Zeile für `line` (mit Leerzeichen aufgefüllt, json.loads ignoriert sie)."""
+    slot = json.loads(line)["slot"]
+    stone = _line({"slot": slot, "deleted": True})
+    if len(stone) > len(line):
+        stone = _line({"slot": slot})   # sehr kurze Zeilen (Abschnitte): der Grabstein folgt ohnehin später
+    return stone[:-1] + b" " * (len(line) - len(stone)) + b"\n"
+
+
+class KeyIndex:
+    """Persistenter Index vibe_key_hash -> Slot (SQLite-Primärschlüssel, ein Lookup pro Zugriff)."""
+
+    def __init__(self, path):
+        self.fresh = not os.path.exists(path)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._db.execute("CREATE TABLE IF NOT EXISTS keys (hash TEXT PRIMARY KEY, slot INTEGER NOT NULL) WITHOUT ROWID")
+
+    def get(self, key):
+        with self._lock:
+            row = self._db.execute("SELECT slot FROM keys WHERE hash = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def put_many(self, pairs, replace_all=False):
+        with self._lock, self._db:
+            if replace_all:
+                self._db.execute("DELETE FROM keys")
+            self._db.executemany("INSERT OR REPLACE INTO keys (hash, slot) VALUES (?, ?)", pairs)
+
+    def remove(self, key):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM keys WHERE hash = ?", (key,))
+
+    def close(self):
+        self._db.close()
+
+
+class SharedMatrix:
+    """Normierte Vektor-Matrix als gemeinsame mmap-Datei: ein Schreiber (unter dem Store-Lock), beliebig viele Leser.
+
+    Mehrere App-Prozesse mappen dieselbe Datei und teilen sich deren Seiten im Page-Cache –
+    der RAM wächst nicht mit der Zahl der Worker. Der Kopf (matrix.hdr) hält
+    [Generation, veröffentlichte Zeilen, Dimension]: neue Zeilen werden erst sichtbar, wenn
+    `rows` steigt; wird die Datei komplett neu geschrieben, steigt die Generation und
+    die Leser mappen beim nächsten Zugriff neu.
+    """
+
+    def __init__(self, root, name=MATRIX_NAME):
+        self.name = name
+        self.path = os.path.join(root, f"{name}.f32")
+        self.header_path = os.path.join(root, f"{name}.hdr")
+        self._map = None
+        self._key = None
+
+    def header(self):
+        """(generation, rows, dim) oder None, solange nichts veröffentlicht ist."""
+        try:
+            with open(self.header_path, "rb") as f:
+                generation, rows, dim = np.frombuffer(f.read(24), dtype="<i8")
+        except (FileNotFoundError, ValueError):
+            return None
+        return int(generation), int(rows), int(dim)
+
+    def _write_header(self, generation, rows, dim):
+        with open(self.header_path, "wb" if not os.path.exists(self.header_path) else "r+b") as f:
+            f.write(np.array([generation, rows, dim], dtype="<i8").tobytes())
+
+    @staticmethod
+    def _normalized(vectors):
+        vectors = np.asarray(vectors, dtype=DTYPE)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    # --- SCHREIBEN (nur unter ProfileStore._write_lock) ---
+    def rebuild(self, vectors, block=65536):
+        """Schreibt die ganze Matrix neu (neue Datei, neue Generation)."""
+        n, dim = vectors.shape
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            for start in range(0, n, block):
+                f.write(self._normalized(vectors[start:start + block]).tobytes())
+        os.replace(tmp, self.path)
+        header = self.header()
+        self._write_header((header[0] if header else 0) + 1, n, dim)
+
+    def write(self, start, vectors):
+        """Überschreibt/ergänzt Zeilen ab `start`; neue Zeilen sind erst nach commit() sichtbar."""
+        rows = self._normalized(vectors)
+        with open(self.path, "r+b") as f:
+            size = os.fstat(f.fileno()).st_size
+            needed = (start + len(rows)) * rows[0].nbytes
+            if needed > size:
+                f.truncate(max(needed, int(size * MATRIX_GROWTH), MATRIX_MIN_ROWS * rows[0].nbytes))
+            f.seek(start * rows[0].nbytes)
+            f.write(rows.tobytes())
+
+    def commit(self, rows):
+        generation, _, dim = self.header()
+        self._write_header(generation, rows, dim)
+
+    # --- LESEN (jeder Prozess) ---
+    def view(self):
+        """Zero-copy (rows, dim) auf die veröffentlichten Zeilen oder None. Neu gemappt wird nur bei
+        neuer Generation/Datei oder wenn die Datei über den gemappten Bereich hinaus gewachsen ist."""
+        header = self.header()
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        if header is None:
+            return None
+        generation, rows, dim = header
+        key = (generation, stat.st_ino, dim)
+        if self._key != key or self._map is None or len(self._map) < rows:
+            capacity = stat.st_size // (dim * np.dtype(DTYPE).itemsize) if dim else 0
+            self._map = (np.memmap(self.path, dtype=DTYPE, mode="r", shape=(capacity, dim)) if capacity
+                         else np.empty((0, dim), dtype=DTYPE))
+            self._key = key
+        return self._map[:rows]
+
+
+class ProfileStore:
+    def __init__(self, root=STORE_DIR, shared=True):
+        self.root = root
+        self.shared = shared   # Vorgabe für einen neuen Store; danach gilt "matrix" im Manifest
+        self.meta_path = os.path.join(root, "meta.jsonl")
+        self.manifest_path = os.path.join(root, "manifest.json")
+        self.keys_path = os.path.join(root, "keys.sqlite")
+        self.lock_path = os.path.join(root, ".lock")
+        self.purge_path = os.path.join(root, PURGE_FILE)
+        self.generation = 0   # steigt, wenn der Store komplett neu geladen werden musste
+        self.matrix = None
+        self._keys = None
+        self._reset_state()
+
+    def _reset_state(self):
+        if self._keys is not None:
+            # Der Store wurde ersetzt (reset/Restore in einem anderen Prozess): keys.sqlite ist evtl. eine
+            # gelöschte Datei – beim nächsten Zugriff neu öffnen (und ggf. aus meta.jsonl aufbauen)
+            self._keys.close()
+            self._keys = None
+        self.dim = None
+        self._meta = None
+        self._count = 0
+        self._lines = 0       # Meta-Zeilen in der Datei (inkl. überholter)
+        self._meta_pos = 0
+        self._meta_ino = None
+        self._offsets = None    # Warm-Start: Byte-Position der Meta-Zeile je Slot (siehe attach)
+        self._attached_pos = 0
+        self._read_manifest()
+
+    # --- LESEN ---
+    def _load_meta(self):
+        """Liest meta.jsonl einmal ein. Spätere Zeilen mit gleichem Slot gewinnen."""
+        if self._meta is None:
+            self._meta = {}
+            self._read_new_lines()
+        elif self._offsets is not None:
+            self._fill_meta()
+        return self._meta
+
+    def _fill_meta(self):
+        """Nach attach(): liest den übersprungenen Anfang von meta.jsonl nach (bereits gelesene Slots gewinnen)."""
+        head, remaining = {}, self._attached_pos
+        with open(self.meta_path, "rb") as f:
+            for line in f:
+                if remaining <= 0:
+                    break
+                remaining -= len(line)
+                if line.strip():
+                    entry = json.loads(line)
+                    head[entry["slot"]] = entry
+        for slot, entry in head.items():
+            self._meta.setdefault(slot, entry)
+        self._offsets = None
+
+    def _read_new_lines(self):
+        """Liest meta.jsonl ab der zuletzt gelesenen Byte-Position und liefert die neuen Einträge."""
+        entries = []
+        if not os.path.exists(self.meta_path):
+            return entries
+        with open(self.meta_path, "rb") as f:
+            self._meta_ino = os.fstat(f.fileno()).st_ino
+            f.seek(self._meta_pos)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break   # halb geschriebene Zeile eines anderen Prozesses: beim nächsten Mal
+                self._meta_pos += len(line)
+                if line.strip():
+                    self._lines += 1
+                    entry = json.loads(line)
+                    self._meta[entry["slot"]] = entry
+                    self._count = max(self._count, entry["slot"] + 1)
+                    entries.append(entry)
+        return entries
+
+    def refresh(self):
+        """Übernimmt, was andere Prozesse angehängt haben (nur die neuen Zeilen).
+
+        Liefert die neuen Meta-Einträge. Wurde der Store ersetzt oder geleert,
+        wird komplett neu geladen und `generation` erhöht.
+        """
+        if self._meta is None:
+            return list(self._load_meta().values())
+        try:
+            stat = os.stat(self.meta_path)
+        except FileNotFoundError:
+            stat = None
+        if stat is None and self._meta_ino is None:
+            return []
+        if stat is None or stat.st_ino != self._meta_ino or stat.st_size < self._meta_pos:
+            self.generation += 1
+            self._reset_state()
+            return list(self._load_meta().values())
+        if stat.st_size == self._meta_pos:
+            return []
+        if self.dim is None:
+            self._read_manifest()
+        return self._read_new_lines()
+
+    def _read_manifest(self):
+        manifest = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        self.dim = manifest.get("dim")
+        self.vector_path = os.path.join(self.root, manifest.get("vectors", VECTOR_FILE))
+        self.embedding = manifest.get("embedding")   # Backend/Modell/Dimension nach reembed.py switch, sonst None
+        name = manifest.get("matrix", MATRIX_NAME if self.shared else None)
+        if name is None:
+            self.matrix = None
+        elif self.matrix is None or self.matrix.name != name:
+            self.matrix = SharedMatrix(self.root, name)
+
+    def __len__(self):
+        if self._meta is None:
+            self._load_meta()
+        return self._count
+
+    def record(self, slot):
+        """Metadaten eines Profils (O(1)); nach attach() per Byte-Offset direkt aus meta.jsonl."""
+        if self._meta is None:
+            self._load_meta()
+        entry = self._meta.get(slot)
+        if entry is None and self._offsets is not None and 0 <= slot < len(self._offsets):
+            with open(self.meta_path, "rb") as f:
+                f.seek(int(self._offsets[slot]))
+                entry = self._meta[slot] = json.loads(f.readline())
+        if entry is None:
+            raise KeyError(slot)
+        return entry
+
+    def lookup(self, key_hash):
+        """Slot zum vibe_key_hash oder None – O(1), unabhängig von der Größe der DB."""
+        slot = self._key_index().get(key_hash)
+        if slot is not None and slot >= len(self):
+            self.refresh()   # von einem anderen Prozess angehängt
+        if slot is None or slot >= len(self):
+            return None
+        record = self.record(slot)
+        if record.get("deleted") or record.get("vibe_key_hash") != key_hash:
+            return None
+        return slot
+
+    def records(self):
+        """Metadaten aller Profile in Slot-Reihenfolge (ohne Vektoren). Gelöschte: {"slot", "deleted"}."""
+        meta = self._load_meta()
+        return [meta[slot] for slot in range(len(self))]
+
+    def line_offsets(self):
+        """Byte-Position der gültigen Meta-Zeile je Slot und (Ende, Inode, Zeilen) des gelesenen Stands.
+
+        Für den Warm-Start (warm_start.py); innerhalb von frozen() aufrufen, damit beides zusammenpasst.
+        """
+        self._load_meta()
+        offsets = np.zeros(self._count, dtype=np.int64)
+        pos = lines = 0
+        with open(self.meta_path, "rb") as f:
+            ino = os.fstat(f.fileno()).st_ino
+            for line in f:
+                if pos >= self._meta_pos:
+                    break
+                if line.strip():
+                    offsets[json.loads(line)["slot"]] = pos
+                    lines += 1
+                pos += len(line)
+        return offsets, pos, ino, lines
+
+    def position(self):
+        """(Byte-Position, Inode) von meta.jsonl, bis zu der der Store gelesen hat."""
+        if self._meta is None:
+            self._load_meta()
+        return self._meta_pos, self._meta_ino
+
+    def entries_since(self, pos):
+        """Meta-Einträge ab Byte-Position `pos` bis zum gelesenen Stand (z.B. seit dem Speichern eines Index)."""
+        entries, remaining = [], self._meta_pos - pos
+        if remaining <= 0:
+            return entries
+        with open(self.meta_path, "rb") as f:
+            f.seek(pos)
+            for line in f:
+                if remaining <= 0:
+                    break
+                remaining -= len(line)
+                if line.strip():
+                    entries.append(json.loads(line))
+        return entries
+
+    def attach(self, offsets, meta_pos, meta_ino, lines):
+        """Warm-Start: übernimmt den Stand bis `meta_pos`, ohne meta.jsonl zu parsen.
+
+        record() liest dann nur die Zeilen, die tatsächlich gebraucht werden; was danach
+        angehängt wurde, holt refresh() wie gewohnt. records() liest bei Bedarf alles nach.
+        """
+        self._meta = {}
+        self._offsets = offsets
+        self._count = len(offsets)
+        self._meta_pos = self._attached_pos = meta_pos
+        self._meta_ino = meta_ino
+        self._lines = lines
+
+    def vectors(self):
+        """Alle Vektoren als read-only memmap (n, dim) – lädt nichts in den RAM."""
+        n = len(self)
+        if n == 0 or not self.dim:
+            return np.empty((0, self.dim or 0), dtype=DTYPE)
+        return np.memmap(self.vector_path, dtype=DTYPE, mode="r", shape=(n, self.dim))
+
+    def shared_matrix(self):
+        """Normierte Vektoren zero-copy aus der gemeinsamen Datei (für den Matching-Index aller Prozesse).
+
+        Fehlt die Datei (Bestands-Store) oder hinkt sie hinterher, wird sie einmal veröffentlicht.
+        """
+        n = len(self)
+        view = self.matrix.view()
+        if view is None or len(view) < n or (n and view.shape[1] != self.dim):
+            with self._write_lock():
+                self.refresh()
+                self._publish()
+            view = self.matrix.view()
+        return view if view is not None else np.empty((0, self.dim or 0), dtype=DTYPE)
+
+    def profiles(self):
+        """Kompatibilitäts-Sicht im alten profiles_db.json-Format (Dicts mit 'vector')."""
+        vectors = self.vectors()
+        return [dict(record, vector=vectors[record["slot"]].tolist()) for record in self.records()]
+
+    # --- SCHREIBEN ---
+    @contextmanager
+    def _write_lock(self):
+        """Ein Schreiber zur Zeit über alle Prozesse (Slots vergeben, Kompaktierung)."""
+        os.makedirs(self.root, exist_ok=True)
+        with open(self.lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    @contextmanager
+    def frozen(self):
+        """Hält den Schreib-Lock auf aktuellem Stand: Meta und Vektoren ändern sich im Block nicht (Snapshots)."""
+        with self._write_lock():
+            self.refresh()
+            yield self
+
+    def _key_index(self):
+        if self._keys is None:
+            os.makedirs(self.root, exist_ok=True)
+            self._keys = KeyIndex(self.keys_path)
+            if self._keys.fresh:
+                # Bestehender Store ohne Index (oder Index verloren): einmal aus meta.jsonl aufbauen
+                self._rebuild_keys()
+        return self._keys
+
+    def _rebuild_keys(self):
+        pairs = [(r["vibe_key_hash"], r["slot"]) for r in self.records()
+                 if r.get("vibe_key_hash") and not r.get("deleted")]
+        self._keys.put_many(pairs, replace_all=True)
+
+    def _append_meta(self, entries):
+        with open(self.meta_path, "ab") as f:
+            f.write(b"".join(map(_line, entries)))
+            self._meta_pos = f.tell()
+            self._meta_ino = os.fstat(f.fileno()).st_ino
+        for entry in entries:
+            self._meta[entry["slot"]] = entry
+        self._lines += len(entries)
+
+    def _write_vector(self, slot, vector):
+        vector = np.asarray(vector, dtype=DTYPE)
+        if vector.shape != (self.dim,):
+            raise SpaceChanged(f"Vektor-Dimension {vector.shape} passt nicht zum Store ({self.dim}).")
+        with open(self.vector_path, "r+b") as f:
+            f.seek(slot * self.dim * vector.itemsize)
+            f.write(vector.tobytes())
+        self._publish()
+        if self.matrix is not None:
+            self.matrix.write(slot, vector[None])
+
+    def _publish(self):
+        """Gleicht die gemeinsame Matrix mit vectors.f32 ab: fehlende Zeilen nachtragen, sonst nichts."""
+        if not self.dim or self.matrix is None:
+            return
+        header = self.matrix.header()
+        if header is None or header[2] != self.dim or not os.path.exists(self.matrix.path):
+            self.matrix.rebuild(self.vectors())
+        elif header[1] < len(self):
+            self.matrix.write(header[1], self.vectors()[header[1]:])
+            self.matrix.commit(len(self))
+
+    def _init_dim(self, dim):
+        if self.dim is None:
+            os.makedirs(self.root, exist_ok=True)
+            self.dim = dim
+            manifest = {"version": 1, "dim": dim, "dtype": "float32"}
+            if not self.shared:
+                manifest["matrix"] = None
+            with open(self.manifest_path, "w", encoding="utf-8") as f:
+                json.dump(manifest, f)
+        elif dim != self.dim:
+            raise SpaceChanged(f"Vektor-Dimension {dim} passt nicht zum Store ({self.dim}).")
+
+    def _check_space(self, records):
+        """Unter dem Schreib-Lock: stammen die Vektoren aus dem Raum, auf den der Store gerade eingestellt ist?
+
+        Nach reembed.py switch nennt manifest.json den Raum; ein Datensatz, der vorher mit dem alten Backend
+        eingebettet wurde, darf nicht in die neue Spalte (gleiche Dimension) oder an ihr scheitern (andere).
+        """
+        space = (self.embedding or {}).get("space")
+        for record in records:
+            if space and record.get("embedding_space", space) != space:
+                raise SpaceChanged(f"Datensatz aus {record['embedding_space']}, der Store ist jetzt {space}.")
+
+    def extend(self, records):
+        """Hängt Profile (Dicts mit 'vector') an. Liefert die vergebenen Slots."""
+        records = list(records)
+        if not records:
+            return []
+        with self._write_lock():
+            slots = self._extend(records)
+        pairs = [(r["vibe_key_hash"], slot) for r, slot in zip(records, slots) if r.get("vibe_key_hash")]
+        if pairs:
+            self._key_index().put_many(pairs)
+        return slots
+
+    def _extend(self, records):
+        self.refresh()   # Slots anderer Prozesse nicht überschreiben (und ein neues Manifest sehen)
+        self._check_space(records)
+        vectors = np.asarray([r["vector"] for r in records], dtype=DTYPE)
+        self._init_dim(vectors.shape[1])
+        start = len(self)
+
+        # Erst die Vektoren, dann die Metadaten: bricht der Lauf ab, bleiben
+        # höchstens verwaiste Vektoren ohne Meta-Zeile zurück (werden ignoriert).
+        with open(self.vector_path, "ab") as f:
+            f.seek(start * self.dim * vectors.itemsize)
+            f.truncate()
+            f.write(vectors.tobytes())
+        # Gemeinsame Matrix vor der Meta-Zeile: wer den Slot sieht, findet auch seinen Vektor
+        self._publish()
+        if self.matrix is not None:
+            self.matrix.write(start, vectors)
+            self.matrix.commit(start + len(vectors))
+        entries = []
+        for offset, record in enumerate(records):
+            entry = {k: v for k, v in record.items() if k != "vector"}
+            entry["slot"] = start + offset
+            entries.append(entry)
+        self._append_meta(entries)
+        self._count = start + len(entries)
+        return [e["slot"] for e in entries]
+
+    def append(self, record):
+        return self.extend([record])[0]
+
+    def update(self, slot, changes):
+        """Ändert ein Profil: Vektor an Ort und Stelle, Metadaten als neue Zeile (O(1))."""
+        with self._write_lock():
+            self.refresh()
+            current = self.record(slot)
+            if current.get("deleted"):
+                raise KeyError(f"Slot {slot} ist gelöscht.")
+            if "vector" in changes:
+                self._check_space([changes])
+                self._write_vector(slot, changes["vector"])
+            entry = dict(current, **{k: v for k, v in changes.items() if k != "vector"}, slot=slot)
+            self._append_meta([entry])
+        if entry.get("vibe_key_hash") != current.get("vibe_key_hash"):
+            if current.get("vibe_key_hash"):
+                self._key_index().remove(current["vibe_key_hash"])
+            self._key_index().put_many([(entry["vibe_key_hash"], slot)])
+        self.maybe_compact()
+        return entry
+
+    def delete(self, slot):
+        """Löscht ein Profil: Grabstein-Zeile, Vektor genullt, Schlüssel aus dem Index (O(1)).
+
+        Die alten Meta-Zeilen überschreibt scrub() (über snapshots.purge(), samt den Snapshots).
+        """
+        with self._write_lock():
+            self.refresh()
+            current = self.record(slot)
+            if current.get("deleted"):
+                return
+            self._write_vector(slot, np.zeros(self.dim, dtype=DTYPE))
+            self._append_meta([{"slot": slot, "deleted": True,
+                                "timestamp": datetime.datetime.now().isoformat()}])
+            with open(self.purge_path, "a", encoding="utf-8") as f:
+                f.write(f"{slot}\n")
+        if current.get("vibe_key_hash"):
+            self._key_index().remove(current["vibe_key_hash"])
+        self.maybe_compact()
+
+    def pending_purge(self):
+        """Gelöschte Slots, deren alte Zeilen noch nicht überschrieben sind (aufsteigend)."""
+        try:
+            with open(self.purge_path, "r", encoding="utf-8") as f:
+                return sorted({int(line) for line in f if line.strip()})
+        except FileNotFoundError:
+            return []
+
+    def scrub(self, slots):
+        """Überschreibt alle Zeilen der Slots in meta.jsonl, die noch Profildaten tragen. Liefert ihre Anzahl.
+
+        Gleich lange Zeilen: Inode und Byte-Offsets (Warm-Start, IVF, Snapshot-Ketten) bleiben gültig.
+        """
+        slots, scrubbed = set(slots), 0
+        with self._write_lock():
+            self.refresh()
+            if not slots or not os.path.exists(self.meta_path):
+                return 0
+            with open(self.meta_path, "r+b") as f:
+                pos = 0
+                for line in f:
+                    if pos >= self._meta_pos:
+                        break
+                    if line.strip():
+                        entry = json.loads(line)
+                        if entry["slot"] in slots and not is_scrubbed(entry):
+                            os.pwrite(f.fileno(), scrubbed_line(line), pos)
+                            scrubbed += 1
+                    pos += len(line)
+                os.fsync(f.fileno())
+        return scrubbed
+
+    def purged(self, slots):
+        """Nimmt die Slots aus purge.pending (nachdem auch die Snapshots bereinigt sind)."""
+        slots = set(slots)
+        with self._write_lock():
+            remaining = [slot for slot in self.pending_purge() if slot not in slots]
+            tmp = self.purge_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.writelines(f"{slot}\n" for slot in remaining)
+            os.replace(tmp, self.purge_path)
+
+    def stale_lines(self):
+        if self._meta is None:
+            self._load_meta()
+        return self._lines - self._count
+
+    def maybe_compact(self):
+        stale = self.stale_lines()
+        if stale >= COMPACT_MIN_STALE and stale > COMPACT_RATIO * len(self):
+            self.compact()
+
+    def compact(self):
+        """Schreibt meta.jsonl mit genau einer Zeile pro Slot neu (atomar per rename).
+
+        Slots bleiben gleich, damit Vektor-Datei und abgeleitete Indizes gültig bleiben.
+        """
+        with self._write_lock():
+            self.refresh()
+            meta = self._load_meta()
+            tmp = self.meta_path + ".tmp"
+            with open(tmp, "wb") as f:
+                f.writelines(_line(meta[slot]) for slot in range(self._count))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.meta_path)
+            stat = os.stat(self.meta_path)
+            self._meta_pos, self._meta_ino, self._lines = stat.st_size, stat.st_ino, self._count
+            self._key_index()
+            self._rebuild_keys()
+            if self.dim and self.matrix is not None:
+                self.matrix.rebuild(self.vectors())   # heilt evtl. Abweichungen nach Abbrüchen
+
+    def switch_over(self, vectors_name, matrix_name, dim, records, embedding=None):
+        """Stellt den Store auf eine neue Vektor-Spalte um (reembed.py) – nur innerhalb von frozen().
+
+        `records`: die neuen Meta-Einträge aller Slots; `matrix_name` None = ohne gemeinsame Matrix;
+        `embedding`: Ziel-Backend (embedding_backends.describe), nach dem die App ihr Backend neu baut.
+        Erst manifest.json, dann meta.jsonl, beide per rename:
+        andere Prozesse sehen die neue Inode von meta.jsonl, laden neu und lesen dabei schon das neue
+        Manifest. Bis dahin lesen sie weiter konsistent die alte Spalte (entfernt erst `reembed.py cleanup`).
+        """
+        tmp = self.manifest_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "dim": dim, "dtype": "float32", "vectors": vectors_name, "matrix": matrix_name,
+                       "embedding": embedding}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.manifest_path)
+        tmp = self.meta_path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.writelines(_line(record) for record in records)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.meta_path)
+        self.generation += 1
+        self._reset_state()
+
+    def reset(self):
+        """Leert den Store (für Generatoren, die die komplette DB neu aufbauen).
+
+        Abgeleitete Dateien im Store-Ordner (z.B. der IVF-Index) werden mit gelöscht.
+        """
+        if self._keys is not None:
+            self._keys.close()   # vor dem Löschen der Datei
+            self._keys = None
+        if os.path.isdir(self.root):
+            shutil.rmtree(self.root)
+        self.generation += 1
+        self.matrix = None   # neu angelegt beim Lesen des (fehlenden) Manifests
+        self._reset_state()
+
+
+# --- MIGRATION ---
+def migrate_json(json_path=LEGACY_JSON, root=STORE_DIR):
+    """Einmalige Übernahme der alten profiles_db.json in den Binär-Store."""
+    with open(json_path, "r", encoding="utf-8") as f:
+        db = json.load(f)
+    store = ProfileStore(root)
+    if len(store):
+        raise RuntimeError(f"'{root}' ist nicht leer – Migration abgebrochen.")
+    store.extend(db)
+    return store
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["compact"]:
+        # python profile_store.py compact [store]
+        store = ProfileStore(sys.argv[2] if len(sys.argv) > 2 else STORE_DIR)
+        stale = store.stale_lines()
+        store.compact()
+        print(f"🧹 {stale} überholte Zeilen entfernt, {len(store)} Slots in '{store.root}'.")
+        sys.exit()
+    source = sys.argv[1] if len(sys.argv) > 1 else LEGACY_JSON
+    target = sys.argv[2] if len(sys.argv) > 2 else STORE_DIR
+    store = migrate_json(source, target)
+    size = os.path.getsize(store.vector_path) + os.path.getsize(store.meta_path)
+    print(f"✅ {len(store)} Profile aus '{source}' nach '{target}' migriert ({size / 1024:.0f} KB).")
@@ -0,0 +1,165 @@
+import glob
+import json
+import sys
+import numpy as np
+from matching import MatchingIndex, columns_of, normalize_rows, top_k
+
+# --- KOMPAKTE VEKTOREN: WENIGER DIMENSIONEN, FLOAT16, INT8 ---
+# 1536 × float32 = 6 KB pro Profil. Kompakter:
+#   - gekürzte Vektoren (text-embedding-3-* liefert per `dimensions` Matryoshka-Vektoren:
+#     die ersten d Komponenten, neu normiert – bestehende Vektoren lassen sich genauso kürzen)
+#   - float16 (2x kleiner) oder int8 mit Skalierung pro Vektor (4x kleiner)
+#   - optional: die besten Kandidaten mit den vollen float32-Vektoren nachsortieren (Re-Rank)
+
+PRECISIONS = ("float32", "float16", "int8")
+BLOCK = 16_384   # Zeilen pro Block beim Scoren/Komprimieren -> begrenzter Zwischenspeicher
+
+
+def truncate(vectors, dims=None):
+    """Kürzt auf die ersten `dims` Komponenten und normiert neu (wie der API-Parameter `dimensions`)."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if dims:
+        vectors = vectors[..., :dims]
+    return normalize_rows(vectors)
+
+
+def quantize_int8(vectors):
+    """Symmetrische int8-Quantisierung mit eigenem Skalierungsfaktor pro Vektor."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    scales = np.abs(vectors).max(axis=-1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.round(vectors / scales[..., None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def compress(vectors, precision="int8", dims=None):
+    """Normierte, gekürzte und komprimierte Matrix plus Skalen (bei float nur Einsen)."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    n = len(vectors)
+    width = min(dims or vectors.shape[1], vectors.shape[1]) if n else (dims or 0)
+    dtype = np.int8 if precision == "int8" else np.dtype(precision)
+    matrix = np.empty((n, width), dtype=dtype)
+    scales = np.ones(n, dtype=np.float32)
+    for start in range(0, n, BLOCK):
+        block = truncate(vectors[start:start + BLOCK], width)
+        if precision == "int8":
+            matrix[start:start + BLOCK], scales[start:start + BLOCK] = quantize_int8(block)
+        else:
+            matrix[start:start + BLOCK] = block
+    return matrix, scales
+
+
+def memory_bytes(matrix, scales):
+    return matrix.nbytes + (scales.nbytes if matrix.dtype == np.int8 else 0)
+
+
+class QuantizedIndex(MatchingIndex):
+    """MatchingIndex mit kompakter Matrix. Gleiche query()-Schnittstelle, optional mit Re-Rank."""
+
+    def __init__(self, vectors, genders, targets, locs, spaces, alive, regions, precision="int8", dims=None,
+                 rerank=0, full=None):
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unbekannte Präzision '{precision}' (erlaubt: {', '.join(PRECISIONS)}).")
+        self.precision, self.dims, self.rerank = precision, dims, rerank
+        # Für den Re-Rank bleiben die vollen Vektoren, wo sie sind: Array oder Callable
+        # (beim Store: store.vectors -> immer der aktuelle memmap auf der Platte)
+        self.full = (full if full is not None else vectors) if rerank else None
+        super().__init__(vectors, genders, targets, locs, spaces, alive, regions)
+
+    def _encode(self, vectors):
+        matrix, scales = compress(vectors, self.precision, self.dims)
+        return {"matrix": matrix, "scales": scales}
+
+    scales = property(lambda self: self._columns["scales"][:self._n])
+
+    @classmethod
+    def from_store(cls, store, precision="int8", dims=None, rerank=0, loc_of=None):
+        return cls(store.vectors(), *columns_of(store.records(), loc_of),
+                   precision=precision, dims=dims, rerank=rerank, full=store.vectors)
+
+    def scores(self, vector, rows=None):
+        """Quantisiertes Skalarprodukt, blockweise nach float32 (numpy hat kein int8-BLAS)."""
+        matrix, scales = (self.matrix, self.scales) if rows is None else (self.matrix[rows], self.scales[rows])
+        query = truncate(vector, matrix.shape[1]).ravel()
+        out = np.empty(len(matrix), dtype=np.float32)
+        for start in range(0, len(matrix), BLOCK):
+            block = matrix[start:start + BLOCK].astype(np.float32)
+            out[start:start + BLOCK] = block @ query
+        return out * scales
+
+    def query(self, vector, k=5, gender=None, target_gender=None, loc=None, space=None, region=None,
+              exclude=None, rows=None):
+        if len(self) == 0:
+            return []
+        positions = np.arange(len(self)) if rows is None else np.asarray(rows, dtype=np.int64)
+        mask = self.mask(gender, target_gender, loc, space, region, rows)
+        if exclude is not None:
+            mask &= positions != exclude
+        scores = np.where(mask, self.scores(vector, rows), -np.inf)
+        best = top_k(scores, min(max(k, self.rerank), int(mask.sum())))
+        return self.rank(vector, positions[best], scores[best], k)
+
+    def rank(self, vector, positions, scores, k=5):
+        """Mit Re-Rank: die Kandidaten mit den vollen float32-Vektoren neu bewerten."""
+        if not self.rerank or not len(positions):
+            return super().rank(vector, positions, scores, k)
+        # Sortierte Zugriffe schonen den memmap
+        candidates = np.sort(np.asarray(positions, dtype=np.int64))
+        full = self.full() if callable(self.full) else self.full
+        exact = normalize_rows(full[candidates]) @ normalize_rows(vector).ravel()
+        return [(int(candidates[i]), float(exact[i])) for i in top_k(exact, k)]
+
+
+# --- GENAUIGKEITS-REPORT ---
+def accuracy_report(vectors, k=5, dims_options=(None, 512, 256), rerank=0):
+    """Vergleicht jede Darstellung mit float32/voller Dimension (jeder Vektor einmal als Anfrage)."""
+    vectors = normalize_rows(vectors)
+    n = len(vectors)
+    k = min(k, n - 1)
+    exact = vectors @ vectors.T
+    np.fill_diagonal(exact, -np.inf)
+    truth = [set(top_k(row, k).tolist()) for row in exact]
+    full_bytes = vectors.nbytes
+    rows = []
+    for dims in dims_options:
+        if dims and dims >= vectors.shape[1]:
+            continue
+        for precision in PRECISIONS:
+            index = QuantizedIndex(vectors, [""] * n, ["all"] * n, [""] * n, [""] * n, [True] * n, [""] * n,
+                                   precision=precision, dims=dims, rerank=rerank)
+            hits, errors = 0, []
+            for i in range(n):
+                approx = index.scores(vectors[i])
+                errors.append(np.abs(np.delete(approx - exact[i], i)).mean())
+                hits += len(truth[i].intersection(r for r, _ in index.query(vectors[i], k=k, exclude=i)))
+            mem = memory_bytes(index.matrix, index.scales)
+            rows.append({
+                "dims": dims or vectors.shape[1],
+                "precision": precision,
+                "bytes_per_profile": mem / n,
+                "compression": full_bytes / mem,
+                "recall_at_k": hits / (k * n),
+                "mean_abs_score_error": float(np.mean(errors)),
+            })
+    return rows
+
+
+def existing_vectors(store_root=None):
+    """Alle Vektoren, die es im Repo gibt: Profil-Store plus Säulen der Master-Profile."""
+    from profile_store import ProfileStore, STORE_DIR
+    vectors = list(ProfileStore(store_root or STORE_DIR).vectors())
+    for path in glob.glob("*_master_profile.json"):
+        with open(path, "r", encoding="utf-8") as f:
+            vectors += [p["vector"] for p in json.load(f)["pillars"] if p.get("vector")]
+    return np.asarray(vectors, dtype=np.float32)
+
+
+if __name__ == "__main__":
+    vectors = existing_vectors(sys.argv[1] if len(sys.argv) > 1 else None)
+    if len(vectors) < 2:
+        sys.exit("Zu wenige Vektoren für einen Vergleich.")
+    print(f"📏 Genauigkeitsverlust auf {len(vectors)} vorhandenen Vektoren (Referenz: float32, volle Dimension)")
+    for row in accuracy_report(vectors):
+        print(f"   {row['dims']:>5}d {row['precision']:>7} | {row['bytes_per_profile']:7.0f} B/Profil "
+              f"({row['compression']:4.1f}x) | recall@k {row['recall_at_k']:6.1%} | "
+              f"Ø Score-Fehler {row['mean_abs_score_error']:.4f}")
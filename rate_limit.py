@@ -0,0 +1,106 @@
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from metrics import METRICS
+
+# --- RATE-LIMIT & SINGLE-FLIGHT ---
+# SKALIERUNG.md v1.0: "max. 3 Vibe-Checks pro User/Stunde" gegen die Kosten-Explosion.
+# Token-Bucket pro Schlüssel (Session und hash_key(vibe_key)), Zustand in SQLite:
+# überlebt Neustarts und gilt für alle Prozesse auf derselben Datei.
+# SingleFlight fasst gleichzeitige identische Anfragen zu EINER zusammen,
+# alle Wartenden bekommen dasselbe Ergebnis (oder denselben Fehler).
+
+RATE_LIMIT_PATH = os.getenv("AIM_RATE_LIMIT_PATH", "rate_limits.sqlite")
+VIBE_CHECKS_PER_HOUR = float(os.getenv("AIM_VIBE_CHECKS_PER_HOUR", "3"))
+PERIOD = 3600.0
+CLEANUP_EVERY = 100      # volle, lange unbenutzte Buckets gelegentlich löschen
+
+
+class RateLimiter:
+    """Token-Bucket: `capacity` Anfragen auf Vorrat, Nachfüllen mit capacity/period pro Sekunde."""
+
+    def __init__(self, path=RATE_LIMIT_PATH, capacity=VIBE_CHECKS_PER_HOUR, period=PERIOD):
+        self.path = path
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.period = period
+        self._lock = threading.Lock()
+        self._calls = 0
+        # isolation_level=None: Transaktionen steuern wir selbst (BEGIN IMMEDIATE)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            " key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS buckets_updated ON buckets(updated)")
+
+    def _level(self, key, now):
+        row = self._db.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return self.capacity
+        tokens, updated = row
+        return min(self.capacity, tokens + max(0.0, now - updated) * self.rate)
+
+    def acquire(self, keys, cost=1.0):
+        """Zieht `cost` von JEDEM Schlüssel ab – nur wenn alle genug haben (atomar).
+
+        Liefert (erlaubt, retry_after in Sekunden).
+        """
+        keys = [k for k in dict.fromkeys(keys) if k]
+        now = time.time()
+        with self._lock:
+            # BEGIN IMMEDIATE: Schreibsperre sofort, damit zwei Prozesse nicht beide den letzten Token nehmen
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                levels = {key: self._level(key, now) for key in keys}
+                short = max((cost - level for level in levels.values()), default=0.0)
+                allowed = short <= 0
+                if allowed:
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                        [(key, level - cost, now) for key, level in levels.items()],
+                    )
+                self._calls += 1
+                if self._calls % CLEANUP_EVERY == 0:
+                    # Nach einer Periode ohne Nutzung ist jeder Bucket wieder voll -> Zeile überflüssig
+                    self._db.execute("DELETE FROM buckets WHERE updated < ?", (now - self.period,))
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        METRICS.count("rate_limit_allowed" if allowed else "rate_limit_denied")
+        return allowed, 0.0 if allowed else short / self.rate
+
+    def remaining(self, key):
+        with self._lock:
+            return self._level(key, time.time())
+
+
+class SingleFlight:
+    """Höchstens ein laufender Aufruf pro Schlüssel; gleichzeitige Aufrufer teilen sich das Ergebnis."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func, *args, **kwargs):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            METRICS.count("singleflight_shared")
+            return future.result()
+        try:
+            result = func(*args, **kwargs)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
@@ -0,0 +1,164 @@
+import argparse
+import datetime
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from matching import accepts, columns_of, limit_blas_threads
+from profile_store import DTYPE, STORE_DIR, ProfileStore
+
+# --- GEGENSEITIGE MATCHES (NÄCHTLICHER BATCH-JOB) ---
+# Alle Paare einmal pro Nacht statt Einzelsuche pro Klick:
+#   1. Ähnlichkeit in Kacheln (Zeilenblock × Spaltenblock) -> RAM bleibt fix, egal wie groß die DB
+#   2. Reziprok-Filter vektorisiert: A sucht B's Geschlecht UND B sucht A's, gleicher Embedding-Raum
+#   3. Top-k pro Profil laufend aktualisiert (k Kandidaten + k aus der Kachel -> wieder k)
+#   4. Zeilenblöcke parallel auf alle Kerne, jeder Worker liest die Vektoren per memmap (geteilter Page-Cache)
+# Ergebnis: eine Tabelle mit fester Zeilenbreite (Slot -> k Slots + Scores), per memmap in O(1) gelesen.
+#   python reciprocal_matches.py               (z.B. per cron: 0 3 * * * cd /app && python reciprocal_matches.py)
+
+MATCH_FILE = "reciprocal_matches.npy"
+TOP_K = 20
+ROW_BLOCK = 1024
+COL_BLOCK = 8192      # Kachel 1024 × 8192 float32 = 32 MB pro Worker
+
+
+def _codes(values):
+    """Strings -> kleine Integer-Codes (für vektorisierte Vergleiche)."""
+    vocabulary, codes = np.unique(np.asarray(values, dtype=str), return_inverse=True)
+    return vocabulary, codes.astype(np.int32)
+
+
+def compatibility(genders, targets):
+    """Codes plus Tabelle accepts[Ziel-Code, Geschlechts-Code]: wer sucht, wen er findet (matching.accepts)."""
+    vocabulary, codes = _codes(list(genders) + list(targets))
+    gender_codes, target_codes = codes[:len(genders)], codes[len(genders):]
+    return gender_codes, target_codes, accepts(vocabulary[:, None], vocabulary[None, :])
+
+
+# Worker-Zustand: einmal pro Prozess gesetzt (initializer), nicht pro Block übertragen
+_STATE = {}
+
+
+def _init_worker(vector_path, dim, genders, targets, spaces, accept_table, norms):
+    limit_blas_threads()
+    vectors = np.memmap(vector_path, dtype=DTYPE, mode="r", shape=(len(genders), dim))
+    _STATE.update(vectors=vectors, genders=genders, targets=targets,
+                  spaces=spaces, accepts=accept_table, norms=norms)
+
+
+def _row_block(start, stop, k, col_block=COL_BLOCK):
+    """Top-k gegenseitige Matches für die Zeilen [start, stop)."""
+    s = _STATE
+    n = len(s["genders"])
+    rows = np.asarray(s["vectors"][start:stop], dtype=np.float32) / s["norms"][start:stop, None]
+    g_row, t_row, sp_row = s["genders"][start:stop], s["targets"][start:stop], s["spaces"][start:stop]
+    best_scores = np.full((stop - start, k), -np.inf, dtype=np.float32)
+    best_ids = np.full((stop - start, k), -1, dtype=np.int64)
+    for c0 in range(0, n, col_block):
+        c1 = min(c0 + col_block, n)
+        cols = np.asarray(s["vectors"][c0:c1], dtype=np.float32) / s["norms"][c0:c1, None]
+        scores = rows @ cols.T
+        # A akzeptiert B und B akzeptiert A, gleicher Raum, nicht man selbst
+        mask = s["accepts"][t_row[:, None], s["genders"][None, c0:c1]]
+        mask &= s["accepts"][s["targets"][None, c0:c1], g_row[:, None]]
+        mask &= (sp_row[:, None] == s["spaces"][None, c0:c1]) & (sp_row[:, None] >= 0)
+        overlap = np.arange(max(start, c0), min(stop, c1))
+        mask[overlap - start, overlap - c0] = False
+        scores[~mask] = -np.inf
+        # Kachel-Top-k mit den bisherigen Besten zusammenführen
+        kk = min(k, c1 - c0)
+        part = np.argpartition(-scores, kk - 1, axis=1)[:, :kk]
+        merged_scores = np.concatenate([best_scores, np.take_along_axis(scores, part, axis=1)], axis=1)
+        merged_ids = np.concatenate([best_ids, part + c0], axis=1)
+        keep = np.argpartition(-merged_scores, k - 1, axis=1)[:, :k]
+        best_scores = np.take_along_axis(merged_scores, keep, axis=1)
+        best_ids = np.take_along_axis(merged_ids, keep, axis=1)
+    order = np.argsort(-best_scores, axis=1, kind="stable")
+    best_scores = np.take_along_axis(best_scores, order, axis=1)
+    best_ids = np.take_along_axis(best_ids, order, axis=1)
+    best_ids[~np.isfinite(best_scores)] = -1
+    return start, best_ids, best_scores
+
+
+def compute(store, k=TOP_K, row_block=ROW_BLOCK, workers=None):
+    """Alle gegenseitigen Top-k Matches des Stores als strukturiertes Array (ein Eintrag pro Slot)."""
+    store.refresh()
+    n = len(store)
+    genders, targets, _, spaces, alive, _ = columns_of(store.records())
+    gender_codes, target_codes, accept_table = compatibility(genders, targets)
+    # Gelöschte Profile bekommen einen eigenen Raum-Code (-1) und matchen mit niemandem
+    _, space_codes = _codes(spaces)
+    space_codes[~np.asarray(alive, dtype=bool)] = -1
+    norms = np.empty(n, dtype=np.float32)
+    vectors = store.vectors()
+    for start in range(0, n, COL_BLOCK):
+        norms[start:start + COL_BLOCK] = np.linalg.norm(vectors[start:start + COL_BLOCK], axis=1)
+    norms[norms == 0] = 1.0
+
+    table = np.zeros(n, dtype=[("ids", np.int32, (k,)), ("scores", np.float16, (k,))])
+    table["ids"] = -1
+    if n == 0:
+        return table
+    init = (store.vector_path, store.dim, gender_codes, target_codes, space_codes, accept_table, norms)
+    blocks = [(start, min(start + row_block, n)) for start in range(0, n, row_block)]
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker,
+                             initargs=init) as pool:
+        futures = [pool.submit(_row_block, start, stop, k) for start, stop in blocks]
+        for future in futures:
+            start, ids, scores = future.result()
+            table["ids"][start:start + len(ids)] = ids
+            table["scores"][start:start + len(ids)] = np.where(ids >= 0, scores, 0)
+    return table
+
+
+def save(table, path):
+    tmp = path + ".tmp.npy"
+    np.save(tmp, table)
+    os.replace(tmp, path)
+
+
+class MatchTable:
+    """Vorberechnete gegenseitige Matches: Slot -> [(Slot, Score)] in O(1) (memmap, eine Zeile)."""
+
+    def __init__(self, path):
+        self.path = path
+        self.table = np.load(path, mmap_mode="r")
+        self.built = datetime.datetime.fromtimestamp(os.path.getmtime(path)).isoformat()
+
+    @classmethod
+    def load(cls, store):
+        path = os.path.join(store.root, MATCH_FILE)
+        return cls(path) if os.path.exists(path) else None
+
+    def __len__(self):
+        return len(self.table)
+
+    def __contains__(self, slot):
+        return 0 <= slot < len(self.table)
+
+    def lookup(self, slot, k=None):
+        row = self.table[slot]
+        hits = [(int(i), float(s)) for i, s in zip(row["ids"], row["scores"]) if i >= 0]
+        return hits[:k] if k else hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nächtliche Vorberechnung gegenseitiger Matches")
+    parser.add_argument("--root", default=STORE_DIR)
+    parser.add_argument("--k", type=int, default=TOP_K)
+    parser.add_argument("--block", type=int, default=ROW_BLOCK)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    store = ProfileStore(args.root)
+    t0 = time.perf_counter()
+    table = compute(store, k=args.k, row_block=args.block, workers=args.workers)
+    path = os.path.join(store.root, MATCH_FILE)
+    save(table, path)
+    with_matches = int((table["ids"][:, 0] >= 0).sum()) if len(table) else 0
+    print(f"✅ {len(table)} Profile, {with_matches} mit gegenseitigen Matches "
+          f"in {time.perf_counter() - t0:.1f}s -> '{path}' ({os.path.getsize(path) / 2**20:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,365 @@
+import argparse
+import datetime
+import glob
+import hashlib
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import numpy as np
+import crypto_layer
+from ann_index import INDEX_FILE
+from embedding_backends import LocalBackend, OpenAIBackend, describe
+from embedding_cache import DEFAULT_DIMENSIONS, DEFAULT_MODEL
+from multi_vector import CHUNK_DIR, chunk_text, embed_chunked
+from profile_store import DTYPE, MATRIX_NAME, STORE_DIR, ProfileStore, SharedMatrix
+from reciprocal_matches import MATCH_FILE
+from warm_start import WARM_FILE
+
+# --- NEU-EINBETTUNG (MODELL-/DIMENSIONSWECHSEL) ---
+# Jeder Vektor hängt an seinem Embedding-Raum (Backend, Modell, Dimension). Ein Wechsel heißt:
+# alle Manifeste neu einbetten – ohne die App anzuhalten und ohne Alles-oder-nichts-Neuschreiben.
+#   run     -> streamt die Profile in Batches, entschlüsselt das Manifest und bettet es (mehrere Batches
+#              gleichzeitig, höchstens 2 × workers in Arbeit) in den neuen Raum ein. Die Vektoren landen
+#              in einer Spalte NEBEN der alten: vectors.<tag>.f32 (und chunks/vectors.<tag>.f32 für die
+#              Abschnitts-Sets aus multi_vector.py). Die App liest weiter die alte Spalte.
+#   Checkpoint: pro Slot ein Fingerabdruck des eingebetteten Stands (Manifest, Set, gelöscht) in
+#              reembed.<tag>.state – nach einem Absturz macht `run` dort weiter, wo er war. Was die App
+#              inzwischen geändert oder angehängt hat, hat einen anderen Fingerabdruck und wird nachgeholt.
+#   switch  -> unter dem Schreib-Lock: letzte Nachzügler einbetten, normierte Matrix bauen, dann
+#              atomar umstellen (ProfileStore.switch_over: manifest.json, dann meta.jsonl per rename).
+#              Abgeleitete Dateien (IVF, Warm-Start, Nacht-Tabelle) werden verworfen und neu gebaut.
+#              manifest.json nennt das Ziel-Backend: laufende App-Prozesse bauen ihr Backend danach neu.
+#              Was noch mit dem alten Backend eingebettet wurde, lehnt der Store unter dem Schreib-Lock ab
+#              (profile_store.SpaceChanged) – die App bettet dann einmal neu ein.
+#              Profile ohne gespeichertes Manifest lassen sich nicht neu einbetten (sie fielen aus jedem
+#              Match) – switch bricht dann ab, außer mit --allow-missing.
+#   cleanup -> entfernt die alte Spalte (bis dahin ist ein Zurück per Hand möglich)
+#   python reembed.py run --backend openai --model text-embedding-3-large --dims 1024
+#   python reembed.py status | switch | abort | cleanup
+
+STATE_FILE = "reembed.json"
+BATCH = int(os.getenv("AIM_REEMBED_BATCH", "256"))
+WORKERS = int(os.getenv("AIM_REEMBED_WORKERS", "4"))
+CHECKPOINT_EVERY = 8   # Batches zwischen zwei Checkpoints
+
+STATE_DTYPE = np.dtype([("fingerprint", "<u8"), ("status", "u1")])
+PENDING, DONE, MISSING, UNCHUNKED = 0, 1, 2, 3   # UNCHUNKED: neu eingebettet, Abschnitts-Set passt nicht mehr
+
+
+def make_backend(kind="openai", model=None, dims=None):
+    """Ziel-Backend der Migration (ein fester Raum – 'auto' würde Räume mischen)."""
+    if kind == "local":
+        return LocalBackend()
+    return OpenAIBackend(model=model or DEFAULT_MODEL, dimensions=dims or DEFAULT_DIMENSIONS)
+
+
+def fingerprint(record):
+    """Stand eines Profils, der die Einbettung bestimmt: Manifest, Verweis aufs Abschnitts-Set, gelöscht."""
+    key = json.dumps([record.get("manifesto", ""), record.get("chunks"), bool(record.get("deleted"))])
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little") or 1
+
+
+class _Column:
+    """Datei mit festen Zeilen, in die per Slot geschrieben wird (wächst bei Bedarf, Lücken bleiben 0)."""
+
+    def __init__(self, path, dtype, width=1):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.row_bytes = self.dtype.itemsize * width
+        self.width = width
+        if not os.path.exists(path):
+            open(path, "wb").close()
+
+    def write(self, start, rows):
+        with open(self.path, "r+b") as f:
+            f.seek(start * self.row_bytes)
+            f.write(np.ascontiguousarray(rows, dtype=self.dtype).tobytes())
+
+    def read(self, n):
+        size = os.path.getsize(self.path) // self.row_bytes
+        rows = np.zeros(n, dtype=self.dtype) if self.width == 1 else np.zeros((n, self.width), dtype=self.dtype)
+        if min(n, size):
+            shape = (size,) if self.width == 1 else (size, self.width)
+            rows[:min(n, size)] = np.memmap(self.path, dtype=self.dtype, mode="r", shape=shape)[:n]
+        return rows
+
+    def resize(self, n):
+        with open(self.path, "r+b") as f:
+            f.truncate(n * self.row_bytes)
+
+    def sync(self):
+        with open(self.path, "rb") as f:
+            os.fsync(f.fileno())
+
+
+class Migration:
+    """Zustand einer laufenden Neu-Einbettung in `root` (reembed.json + Seiten-Spalten)."""
+
+    def __init__(self, root, state):
+        self.root = root
+        self.state = state
+        self.tag = state["tag"]
+        self.store = ProfileStore(root)
+        self.chunk_store = ProfileStore(os.path.join(root, CHUNK_DIR), shared=False)
+        self.vectors = _Column(os.path.join(root, f"vectors.{self.tag}.f32"), DTYPE, state["dim"])
+        self.chunk_vectors = None
+        self._chunk_column()
+        self.status = _Column(os.path.join(root, f"reembed.{self.tag}.state"), STATE_DTYPE)
+        self._cipher = None
+
+    def _chunk_column(self):
+        """Seiten-Spalte der Abschnitts-Sets – erst, sobald es den Abschnitts-Store gibt."""
+        if self.chunk_vectors is None:
+            self.chunk_store.refresh()
+            if self.chunk_store.dim:
+                path = os.path.join(self.chunk_store.root, f"vectors.{self.tag}.f32")
+                self.chunk_vectors = _Column(path, DTYPE, self.state["dim"])
+        return self.chunk_vectors
+
+    @classmethod
+    def open(cls, root, backend=None):
+        """Setzt eine Migration fort oder beginnt eine neue für `backend`."""
+        path = os.path.join(root, STATE_FILE)
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            if backend is not None and state["space"] != backend.space:
+                raise RuntimeError(f"Es läuft bereits eine Migration nach {state['space']} "
+                                   f"(erst 'switch' oder 'abort').")
+            return cls(root, state)
+        if backend is None:
+            raise FileNotFoundError(f"Keine Migration in '{root}'.")
+        probe = np.asarray(backend.embed(["dimension"])[0])
+        state = {"tag": datetime.datetime.now().strftime("%Y%m%d%H%M%S"), "space": backend.space,
+                 "backend": backend.name, "dim": int(probe.shape[0]),
+                 "started": datetime.datetime.now().isoformat()}
+        migration = cls(root, state)
+        migration.checkpoint()
+        return migration
+
+    def checkpoint(self, statuses=()):
+        """Erst die Vektoren auf die Platte, dann die Fingerabdrücke, dann reembed.json (jeweils fsync/rename)."""
+        self.vectors.sync()
+        if self.chunk_vectors:
+            self.chunk_vectors.sync()
+        for slot, row in statuses:
+            self.status.write(slot, np.array([row], dtype=STATE_DTYPE))
+        self.status.sync()
+        self.state["updated"] = datetime.datetime.now().isoformat()
+        tmp = os.path.join(self.root, STATE_FILE + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, os.path.join(self.root, STATE_FILE))
+
+    def _text(self, record):
+        value = record.get("manifesto", "")
+        if crypto_layer.is_encrypted(value) and self._cipher is None:
+            from dotenv import load_dotenv
+            load_dotenv()
+            self._cipher = crypto_layer.get_cipher()
+        text = crypto_layer.reveal_value(value, self._cipher)
+        return "" if text == crypto_layer.DECRYPT_ERROR else text.strip()
+
+    def pending(self):
+        """Slots, deren eingebetteter Stand nicht (mehr) zum Store passt."""
+        self.store.refresh()
+        current = self.status.read(len(self.store))
+        return [slot for slot in range(len(self.store))
+                if current["status"][slot] == PENDING or current["fingerprint"][slot] != fingerprint(self.store.record(slot))]
+
+    def _item(self, slot):
+        """(slot, Fingerabdruck, Abschnitte, Verweis) – Abschnitte None: nichts einzubetten (gelöscht/ohne Text)."""
+        record = self.store.record(slot)
+        text = "" if record.get("deleted") else self._text(record)
+        if not text:
+            return slot, fingerprint(record), None, None
+        ref = record.get("chunks")
+        if ref:
+            chunks = chunk_text(text, max_chunks=ref[1])
+            if len(chunks) == ref[1]:
+                return slot, fingerprint(record), chunks, ref
+            return slot, fingerprint(record), chunk_text(text) or [text], None
+        return slot, fingerprint(record), [text], None   # ohne Set: wie bisher der ganze Text in einem Vektor
+
+    def _embed(self, backend, items):
+        todo = [item for item in items if item[2] is not None]
+        return todo, embed_chunked(backend, [chunks for _, _, chunks, _ in todo]) if todo else []
+
+    def _store(self, items, todo, results):
+        """Schreibt einen fertigen Batch in die Seiten-Spalten; liefert die Status-Zeilen für den Checkpoint."""
+        statuses = {}
+        for slot, mark, chunks, _ in items:
+            if chunks is None:
+                self.vectors.write(slot, np.zeros((1, self.state["dim"])))
+                deleted = self.store.record(slot).get("deleted")
+                statuses[slot] = (mark, DONE if deleted else MISSING)
+        for (slot, mark, _, ref), (pooled, chunk_vectors, _) in zip(todo, results):
+            self.vectors.write(slot, pooled[None])
+            column = self._chunk_column() if ref is not None else None
+            if column is not None:
+                column.write(ref[0], chunk_vectors)
+            had_set = bool(self.store.record(slot).get("chunks"))
+            statuses[slot] = (mark, UNCHUNKED if had_set and column is None else DONE)
+        return sorted(statuses.items())
+
+    def embed(self, backend, slots, batch=BATCH, workers=WORKERS, log=print):
+        """Bettet `slots` in Batches ein; mehrere Batches gleichzeitig, Checkpoint alle CHECKPOINT_EVERY Batches."""
+        batches = [slots[i:i + batch] for i in range(0, len(slots), batch)]
+        done, statuses = 0, []
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            in_flight = {}
+            for batch_slots in batches:
+                items = [self._item(slot) for slot in batch_slots]   # Store nur im Haupt-Thread lesen
+                in_flight[pool.submit(self._embed, backend, items)] = items
+                if len(in_flight) >= 2 * workers:   # Backpressure
+                    done, statuses = self._collect(in_flight, statuses, done, len(batches), log, FIRST_COMPLETED)
+            while in_flight:
+                done, statuses = self._collect(in_flight, statuses, done, len(batches), log, FIRST_COMPLETED)
+        self.checkpoint(statuses)
+        return len(slots)
+
+    def _collect(self, in_flight, statuses, done, total, log, return_when):
+        finished, _ = wait(in_flight, return_when=return_when)
+        for future in finished:
+            items = in_flight.pop(future)
+            statuses += self._store(items, *future.result())
+            done += 1
+            if done % CHECKPOINT_EVERY == 0:
+                self.checkpoint(statuses)
+                statuses = []
+                log(f"  {done}/{total} Batches")
+        return done, statuses
+
+    def counts(self):
+        current = self.status.read(len(self.store))["status"]
+        return {"profiles": len(self.store), "done": int(np.isin(current, (DONE, UNCHUNKED)).sum()),
+                "missing": int((current == MISSING).sum()), "unchunked": int((current == UNCHUNKED).sum())}
+
+
+def run(root=STORE_DIR, backend=None, batch=BATCH, workers=WORKERS, log=print):
+    """Neu-Einbettung starten oder fortsetzen; die App bedient weiter die alte Spalte."""
+    migration = Migration.open(root, backend)
+    pending = migration.pending()
+    log(f"🧬 {len(pending)} von {len(migration.store)} Profilen nach {migration.state['space']} einbetten ...")
+    migration.embed(backend, pending, batch, workers, log)
+    return migration.counts()
+
+
+def switch(root=STORE_DIR, backend=None, log=print, allow_missing=False):
+    """Atomare Umstellung auf die neue Spalte (unter dem Schreib-Lock beider Stores).
+
+    `allow_missing`: auch umstellen, wenn Profile ohne Manifest bleiben (alter Raum, Nullvektor).
+    """
+    migration = Migration.open(root)
+    if backend is None or backend.space != migration.state["space"]:
+        raise RuntimeError(f"switch braucht das Ziel-Backend {migration.state['space']} für die Nachzügler.")
+    run(root, backend, log=log)   # das Meiste vor dem Lock nachholen
+    store, chunk_store, tag, dim = migration.store, migration.chunk_store, migration.tag, migration.state["dim"]
+    with store.frozen(), chunk_store.frozen():
+        late = migration.pending()
+        if late:
+            log(f"⏳ {len(late)} Nachzügler unter dem Lock ...")
+            migration.embed(backend, late, workers=1, log=log)
+        n = len(store)
+        current = migration.status.read(n)["status"]
+        missing = int((current == MISSING).sum())
+        if missing and not allow_missing:
+            raise RuntimeError(f"{missing} Profile ohne Manifest würden aus jedem Match fallen – "
+                               f"Manifeste nachtragen oder switch --allow-missing.")
+        migration.vectors.resize(n)
+        matrix = SharedMatrix(root, f"{MATRIX_NAME}.{tag}")
+        matrix.rebuild(np.memmap(migration.vectors.path, dtype=DTYPE, mode="r", shape=(n, dim)) if n
+                       else np.empty((0, dim), dtype=DTYPE))
+        records = []
+        for slot, record in enumerate(store.records()):
+            record = dict(record)
+            if not record.get("deleted") and current[slot] in (DONE, UNCHUNKED):
+                record["embedding_space"], record["embedding_backend"] = backend.space, backend.name
+                if current[slot] == UNCHUNKED:
+                    record.pop("chunks", None)
+            records.append(record)   # MISSING: alter Raum + Nullvektor -> taucht in keinem Match auf
+        store.switch_over(os.path.basename(migration.vectors.path), matrix.name, dim, records, describe(backend))
+        column = migration._chunk_column()
+        if column is not None:
+            m = len(chunk_store)
+            column.resize(m)
+            chunk_store.switch_over(os.path.basename(column.path), None, dim, chunk_store.records())
+        for name in (INDEX_FILE, WARM_FILE, MATCH_FILE):   # aus dem alten Raum abgeleitet
+            if os.path.exists(os.path.join(root, name)):
+                os.remove(os.path.join(root, name))
+    counts = migration.counts()
+    _remove_state(root, tag)
+    return counts
+
+
+def _remove_state(root, tag):
+    for path in (os.path.join(root, STATE_FILE), os.path.join(root, f"reembed.{tag}.state")):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def abort(root=STORE_DIR):
+    """Verwirft eine laufende Migration samt Seiten-Spalten; der Store bleibt unverändert."""
+    migration = Migration.open(root)
+    for column in (migration.vectors, migration.chunk_vectors):
+        if column is not None and os.path.exists(column.path):
+            os.remove(column.path)
+    _remove_state(root, migration.tag)
+
+
+def cleanup(root=STORE_DIR):
+    """Entfernt Vektor-/Matrix-Dateien, auf die kein Manifest (mehr) zeigt. Liefert die gelöschten Pfade."""
+    if os.path.exists(os.path.join(root, STATE_FILE)):
+        raise RuntimeError("Migration läuft noch – erst 'switch' oder 'abort'.")
+    removed = []
+    for folder in (root, os.path.join(root, CHUNK_DIR)):
+        store = ProfileStore(folder, shared=folder == root)   # Abschnitts-Store: ohne gemeinsame Matrix
+        if not store.dim:
+            continue
+        keep = {store.vector_path} | ({store.matrix.path, store.matrix.header_path} if store.matrix else set())
+        patterns = ("vectors*.f32", f"{MATRIX_NAME}*.f32", f"{MATRIX_NAME}*.hdr")
+        for path in sorted({p for pattern in patterns for p in glob.glob(os.path.join(folder, pattern))} - keep):
+            os.remove(path)
+            removed.append(path)
+    return removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Neu-Einbettung des Profil-Stores (Modell-/Dimensionswechsel)")
+    parser.add_argument("command", choices=["run", "status", "switch", "abort", "cleanup"])
+    parser.add_argument("--root", default=STORE_DIR)
+    parser.add_argument("--backend", choices=["openai", "local"], default="openai")
+    parser.add_argument("--model", default=None)
+    parser.add_argument("--dims", type=int, default=None)
+    parser.add_argument("--batch", type=int, default=BATCH)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--allow-missing", action="store_true", help="switch trotz Profilen ohne Manifest")
+    args = parser.parse_args()
+
+    if args.command in ("run", "switch"):
+        backend = make_backend(args.backend, args.model, args.dims)
+        if args.command == "run":
+            counts = run(args.root, backend, args.batch, args.workers)
+            print(f"✅ {counts['done']}/{counts['profiles']} eingebettet, {counts['missing']} ohne Manifest, "
+                  f"{counts['unchunked']} ohne passendes Abschnitts-Set. Weiter mit: python reembed.py switch")
+        else:
+            counts = switch(args.root, backend, allow_missing=args.allow_missing)
+            print(f"🔀 Umgestellt auf {backend.space} ({counts['done']}/{counts['profiles']} Profile). "
+                  f"Die App übernimmt das Backend aus manifest.json; alte Spalte: python reembed.py cleanup")
+    elif args.command == "status":
+        migration = Migration.open(args.root)
+        counts = migration.counts()
+        print(f"{migration.state['space']} seit {migration.state['started']}: {counts['done']}/{counts['profiles']} "
+              f"eingebettet, {len(migration.pending())} offen, {counts['missing']} ohne Manifest")
+    elif args.command == "abort":
+        abort(args.root)
+        print("🗑️ Migration verworfen, der Store ist unverändert.")
+    else:
+        for path in cleanup(args.root):
+            print(f"🗑️ {path}")
+
+
+if __name__ == "__main__":
+    main()
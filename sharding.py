@@ -0,0 +1,154 @@
+import atexit
+import hashlib
+import hmac
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from matching import limit_blas_threads, normalize_loc, normalize_rows, top_k
+from profile_store import DTYPE, STORE_DIR, ProfileStore
+
+# --- REGIONALE SHARDS ---
+# "Präsenz" ist das Feld für regionales Matching. Statt bei jeder Anfrage alle Profile
+# zu scannen, liegt jeder Slot in einem Regions-Bucket:
+#   region = HMAC(REGION_KEY, normalisierter Ort)[:16]   -> kein Klartext-Ort in meta.jsonl
+#   bucket = region % REGION_BUCKETS                      -> mehrere Orte teilen sich einen Bucket
+# Regionale Suche: nur die Slots des einen Buckets (Filter region == region entfernt Fremd-Orte).
+# Weite Suche ("egal"): ab FANOUT_MIN die Bucket-Gruppen parallel auf einem Prozess-Pool,
+# jeder Worker liest seine Zeilen per memmap, die Top-k werden danach zusammengeführt.
+# Die Partition ist logisch: Vektor-Datei und Slots bleiben global (Schlüssel-Index, Nacht-Tabelle und IVF gelten weiter).
+#   python sharding.py backfill [store]      (Region für Bestandsprofile nachtragen)
+
+REGION_BUCKETS = int(os.getenv("AIM_REGION_BUCKETS", "64"))
+FANOUT_MIN = int(os.getenv("AIM_FANOUT_MIN", "100000"))
+FANOUT_WORKERS = int(os.getenv("AIM_FANOUT_WORKERS", "0")) or os.cpu_count()
+SCAN_BLOCK = 16384       # Zeilen pro Gather im Worker (16384 × 1536 float32 = 96 MB)
+
+
+def region_hash(loc, key):
+    """Verschlüsselter Regions-Schlüssel eines Orts ("" ohne Ort)."""
+    loc = normalize_loc(loc)
+    if not loc:
+        return ""
+    return hmac.new(key, loc.encode("utf-8"), hashlib.sha256).hexdigest()[:16]
+
+
+class RegionShards:
+    """Slot-Listen pro Regions-Bucket (aufsteigend sortiert); der letzte Bucket sammelt Profile ohne Region."""
+
+    def __init__(self, regions=(), n_buckets=REGION_BUCKETS):
+        self.n_buckets = n_buckets
+        self._slots = [np.empty(0, dtype=np.int64) for _ in range(n_buckets + 1)]
+        self._bucket = np.empty(0, dtype=np.int32)
+        self.add(regions)
+
+    def bucket_of(self, region):
+        return int(region[:8], 16) % self.n_buckets if region else self.n_buckets
+
+    def add(self, regions):
+        """Hängt neue Slots an (fortlaufend nach den bekannten)."""
+        buckets = np.fromiter((self.bucket_of(r) for r in regions), dtype=np.int32)
+        slots = np.arange(len(self._bucket), len(self._bucket) + len(buckets))
+        self._bucket = np.concatenate([self._bucket, buckets])
+        for bucket in np.unique(buckets):
+            self._slots[bucket] = np.concatenate([self._slots[bucket], slots[buckets == bucket]])
+
+    def update(self, slots, regions):
+        """Verschiebt bearbeitete Profile, deren Region sich geändert hat."""
+        for slot, region in zip(slots, regions):
+            old, new = self._bucket[slot], self.bucket_of(region)
+            if old == new:
+                continue
+            self._slots[old] = self._slots[old][self._slots[old] != slot]
+            rows = self._slots[new]
+            self._slots[new] = np.insert(rows, np.searchsorted(rows, slot), slot)
+            self._bucket[slot] = new
+
+    def rows(self, region):
+        """Slots des Buckets einer Region – die einzigen Kandidaten einer regionalen Suche."""
+        return self._slots[self.bucket_of(region)]
+
+    def groups(self, n):
+        """Alle Buckets in n etwa gleich große, sortierte Slot-Gruppen (größte zuerst verteilen)."""
+        groups, sizes = [[] for _ in range(n)], [0] * n
+        for rows in sorted(self._slots, key=len, reverse=True):
+            i = sizes.index(min(sizes))
+            groups[i].append(rows)
+            sizes[i] += len(rows)
+        return [np.sort(np.concatenate(g)) for g, size in zip(groups, sizes) if size]
+
+    def __len__(self):
+        return len(self._bucket)
+
+    def fan_out(self, store, vector, k, allowed):
+        """Exakte Top-k über alle Shards parallel; `allowed` ist die Filtermaske über alle Slots."""
+        query = normalize_rows(vector).ravel()
+        shape = (len(self), store.dim)
+        futures = [_pool().submit(_scan, store.vector_path, shape, rows[allowed[rows]], query, k)
+                   for rows in self.groups(FANOUT_WORKERS)]
+        results = [future.result() for future in futures]
+        ids = np.concatenate([ids for ids, _ in results] or [np.empty(0, dtype=np.int64)])
+        scores = np.concatenate([scores for _, scores in results] or [np.empty(0, dtype=np.float32)])
+        best = top_k(scores, k)
+        return list(zip(ids[best].tolist(), scores[best].tolist()))
+
+
+# --- PROZESS-POOL ---
+# spawn statt fork: die App hat Threads (Notifier, Streamlit), fork würde deren Locks mitkopieren.
+_POOL = None
+_POOL_LOCK = threading.Lock()
+_VECTORS = {}
+
+
+def _pool():
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = ProcessPoolExecutor(max_workers=FANOUT_WORKERS, initializer=limit_blas_threads,
+                                        mp_context=multiprocessing.get_context("spawn"))
+            atexit.register(_POOL.shutdown, cancel_futures=True)
+        return _POOL
+
+
+def _scan(vector_path, shape, rows, query, k):
+    """Worker: Top-k der Zeilen `rows` (sortiert, damit der memmap vorwärts liest)."""
+    if _VECTORS.get("key") != (vector_path, shape):
+        _VECTORS.update(key=(vector_path, shape), vectors=np.memmap(vector_path, dtype=DTYPE, mode="r", shape=shape))
+    vectors = _VECTORS["vectors"]
+    scores = np.empty(len(rows), dtype=np.float32)
+    for start in range(0, len(rows), SCAN_BLOCK):
+        block = rows[start:start + SCAN_BLOCK]
+        scores[start:start + len(block)] = normalize_rows(vectors[block]) @ query
+    best = top_k(scores, k)
+    return rows[best], scores[best]
+
+
+# --- BACKFILL ---
+def backfill(root=STORE_DIR):
+    """Trägt den Regions-Hash für Profile ohne "region" nach (Ort wird dafür kurz entschlüsselt)."""
+    import crypto_layer
+    from dotenv import load_dotenv
+    load_dotenv()
+    cipher, key = crypto_layer.get_cipher(), crypto_layer.load_region_key()
+    store = ProfileStore(root)
+    store.refresh()
+    done = 0
+    for slot in range(len(store)):
+        record = store.record(slot)
+        if record.get("deleted") or "region" in record:
+            continue
+        loc = crypto_layer.reveal_value(record.get("loc", ""), cipher)
+        if loc == crypto_layer.DECRYPT_ERROR:
+            continue
+        store.update(slot, {"region": region_hash(loc, key)})
+        done += 1
+    return done
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "backfill":
+        sys.exit("Aufruf: python sharding.py backfill [store]")
+    n = backfill(*sys.argv[2:3])
+    print(f"✅ Region für {n} Profile nachgetragen.")
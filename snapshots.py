@@ -0,0 +1,502 @@
+import argparse
+import datetime
+import fcntl
+import gzip
+import hashlib
+import importlib.util
+import json
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+import numpy as np
+from metrics import METRICS
+from multi_vector import CHUNK_DIR
+from profile_store import DTYPE, STORE_DIR, VECTOR_FILE, ProfileStore, is_scrubbed, scrubbed_line
+
+# --- SNAPSHOTS (BACKUP) ---
+# SKALIERUNG.md: "Datenverlust: Ein falscher Skript-Lauf überschreibt die DB" -> regelmäßige Sicherung.
+# Der Store ist append-only (meta.jsonl wächst, Vektoren werden angehängt oder an Ort und Stelle ersetzt):
+#   voll          -> meta.jsonl komplett + alle Vektoren
+#   inkrementell  -> nur die seit dem letzten Snapshot angehängten Meta-Bytes + die Vektoren der darin genannten Slots
+# Nach einer Kompaktierung/reset (neue meta.jsonl) oder nach FULL_EVERY Inkrementen gibt es wieder einen vollen.
+# Unter dem Schreib-Lock des Stores wird nur der Stand festgehalten (Anzahl, Ende von meta.jsonl); die Vektoren
+# kopiert der Snapshot ohne Lock in eine Spool-Datei, danach holt ein zweiter kurzer Lock nur die Slots nach,
+# die inzwischen geschrieben wurden. Komprimiert (zstd, sonst gzip) und geprüft (sha256) wird ohne Lock;
+# jede Datei entsteht als .tmp + rename. manifest.json (Vektor-Spalte, Embedding-Raum) reist im Kopf mit.
+# snapshots.jsonl im Ziel ist das Manifest: Wiederherstellung = letzter voller + seine Inkremente bis `until`.
+# Die Abschnitts-Vektoren der Manifeste (multi_vector.py, Unterordner chunks/) sind ein eigener Store
+# mit eigener Kette in <ziel>/chunks – gesichert nach dem Haupt-Store, damit jedes gesicherte Profil sein Set findet.
+# DSGVO: gelöschte Profile (purge.pending im Store) entfernt purge() vor jedem Snapshot physisch – in meta.jsonl
+# (ProfileStore.scrub) und in jeder gesicherten Datei, deren Meta noch eine Zeile mit Profildaten des Slots
+# enthält: Zeile -> gleich langer Grabstein, Vektor -> Nullen, sha256/bytes in snapshots.jsonl neu.
+#   python snapshots.py snapshot | list | verify | purge | restore <ziel> [--until 2026-10-17T12:00]
+
+SNAPSHOT_DIR = os.getenv("AIM_SNAPSHOT_DIR", "profiles_snapshots")
+SNAPSHOT_INTERVAL = float(os.getenv("AIM_SNAPSHOT_INTERVAL", "900"))   # Sekunden, 0 = kein Hintergrund-Thread
+SNAPSHOT_KEEP = int(os.getenv("AIM_SNAPSHOT_KEEP", "7"))               # volle Ketten, die aufbewahrt werden
+FULL_EVERY = int(os.getenv("AIM_SNAPSHOT_FULL_EVERY", "24"))
+# zstandard ist optional (sonst gzip) und wird erst beim Komprimieren geladen, nicht beim App-Start
+CODEC = os.getenv("AIM_SNAPSHOT_CODEC", "zstd" if importlib.util.find_spec("zstandard") else "gzip")
+MANIFEST = "snapshots.jsonl"
+CHUNK = 1 << 20
+
+
+# --- HILFSFUNKTIONEN ---
+@contextmanager
+def _target_lock(target):
+    """Ein Snapshot/Prune zur Zeit pro Ziel (mehrere App-Prozesse haben je einen Hintergrund-Thread)."""
+    os.makedirs(target, exist_ok=True)
+    with open(os.path.join(target, ".lock"), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("Codec zstd braucht das Paket 'zstandard' (pip install zstandard).") from None
+    return zstandard
+
+
+def _compressor(raw, codec):
+    if codec == "zstd":
+        return _zstandard().ZstdCompressor(level=3).stream_writer(raw, closefd=False)
+    return gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6)
+
+
+def _decompressor(raw, codec):
+    if codec == "zstd":
+        return _zstandard().ZstdDecompressor().stream_reader(raw)
+    return gzip.GzipFile(fileobj=raw, mode="rb")
+
+
+def _read_exact(f, n):
+    parts = []
+    while n:
+        part = f.read(min(n, CHUNK))
+        if not part:
+            raise ValueError("Snapshot ist unvollständig.")
+        parts.append(part)
+        n -= len(part)
+    return b"".join(parts)
+
+
+def _read_line(f):
+    """Kopfzeile Byte für Byte lesen (der zstd-Stream hat kein readline)."""
+    line = bytearray()
+    while not line.endswith(b"\n"):
+        line += _read_exact(f, 1)
+    return bytes(line)
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(CHUNK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _fsynced_replace(tmp, path):
+    with open(tmp, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def entries(target=SNAPSHOT_DIR):
+    """Alle Manifest-Einträge in zeitlicher Reihenfolge (halb geschriebene letzte Zeile wird ignoriert)."""
+    path = os.path.join(target, MANIFEST)
+    if not os.path.exists(path):
+        return []
+    with open(path, "rb") as f:
+        return [json.loads(line) for line in f if line.endswith(b"\n") and line.strip()]
+
+
+def _append_manifest(target, entry):
+    with open(os.path.join(target, MANIFEST), "ab") as f:
+        f.write((json.dumps(entry, separators=(",", ":")) + "\n").encode("utf-8"))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _chain(all_entries, until=None):
+    """Letzter voller Snapshot bis `until` plus die lückenlos anschließenden Inkremente."""
+    candidates = [e for e in all_entries if until is None or e["created"] <= until]
+    fulls = [i for i, e in enumerate(candidates) if e["kind"] == "full"]
+    if not fulls:
+        return []
+    chain = [candidates[fulls[-1]]]
+    for entry in candidates[fulls[-1] + 1:]:
+        if entry["kind"] == "incremental" and entry["root"] == chain[0]["root"] \
+                and entry["meta_ino"] == chain[-1]["meta_ino"] and entry["meta_from"] == chain[-1]["meta_to"]:
+            chain.append(entry)
+    return chain
+
+
+# --- SICHERN ---
+def _slots_in(meta):
+    return {json.loads(line)["slot"] for line in meta.splitlines() if line.strip()}
+
+
+def _write_rows(out, vectors, slots, row_bytes):
+    rows = max(1, CHUNK // row_bytes)
+    for i in range(0, len(slots), rows):
+        out.write(np.ascontiguousarray(vectors[slots[i:i + rows]]).tobytes())
+
+
+def snapshot(store, target=SNAPSHOT_DIR, codec=CODEC, full=False):
+    """Sichert, was seit dem letzten Snapshot dazukam (oder alles). Liefert den Manifest-Eintrag oder None.
+
+    Der Schreib-Lock wird nur zweimal kurz gehalten: erst für den Stand (Anzahl, Ende von meta.jsonl),
+    dann – nach dem Kopieren ohne Lock – für das, was inzwischen geschrieben wurde: die Meta-Zeilen
+    dahinter und die Vektoren genau der darin genannten Slots (an Ort und Stelle ersetzt oder neu).
+    """
+    root = os.path.abspath(store.root)
+    with _target_lock(target):
+        chain = [e for e in _chain(entries(target)) if e["root"] == root]
+        created = datetime.datetime.now()
+        name = created.strftime("%Y%m%dT%H%M%S%f")
+        spool = os.path.join(target, f"{name}.raw.tmp")
+        with store.frozen():
+            if not os.path.exists(store.meta_path) or not store.dim:
+                return None
+            meta_file = open(store.meta_path, "rb")   # hält die Inode, auch wenn kompaktiert wird
+            stat = os.fstat(meta_file.fileno())
+            last = chain[-1] if chain else None
+            incremental = (not full and last is not None and len(chain) <= FULL_EVERY
+                           and last["meta_ino"] == stat.st_ino and last["meta_to"] <= stat.st_size)
+            start = last["meta_to"] if incremental else 0
+            count, dim, vector_path = len(store), store.dim, store.vector_path
+            with open(store.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        try:
+            with meta_file:
+                if incremental and start == stat.st_size:
+                    return None   # nichts Neues seit dem letzten Snapshot
+                row_bytes = dim * np.dtype(DTYPE).itemsize
+                # Ohne Lock: was bis stat.st_size in meta.jsonl steht, ändert sich nicht mehr (append-only)
+                meta_file.seek(start)
+                meta = _read_exact(meta_file, stat.st_size - start)
+                if incremental:
+                    copied = np.array(sorted(_slots_in(meta)), dtype=np.int64)
+                else:
+                    copied = np.arange(count, dtype=np.int64)
+                vectors = np.memmap(vector_path, dtype=DTYPE, mode="r", shape=(count, dim)) if count else None
+                with open(spool, "wb") as out:
+                    _write_rows(out, vectors, copied, row_bytes)
+                del vectors
+                # Kurz unter dem Lock: was seitdem geschrieben wurde, überschreibt die kopierten Zeilen
+                with store.frozen():
+                    if os.stat(store.meta_path).st_ino != stat.st_ino:
+                        return None   # inzwischen kompaktiert: beim nächsten Lauf ein voller Snapshot
+                    tail = _read_exact(meta_file, os.stat(store.meta_path).st_size - stat.st_size)
+                    changed = np.array(sorted(_slots_in(tail)), dtype=np.int64)
+                    fresh = np.asarray(store.vectors()[changed]) if len(changed) else np.empty((0, dim), DTYPE)
+                    count, meta_to = len(store), stat.st_size + len(tail)
+            meta += tail
+            slots = np.union1d(copied, changed) if incremental else np.arange(count, dtype=np.int64)
+            header = {"meta_bytes": len(meta), "slots": len(slots), "dim": dim, "manifest": manifest}
+
+            kind = "incremental" if incremental else "full"
+            path = os.path.join(target, f"{name}.{kind}.snap.{'zst' if codec == 'zstd' else 'gz'}")
+            spooled = (np.memmap(spool, dtype=DTYPE, mode="r", shape=(len(copied), dim)) if len(copied)
+                       else np.empty((0, dim), dtype=DTYPE))
+            with open(path + ".tmp", "wb") as raw:
+                with _compressor(raw, codec) as out:
+                    out.write((json.dumps(header) + "\n").encode("utf-8"))
+                    out.write(meta)
+                    out.write(slots.tobytes())
+                    # Zeile je Slot: aus dem Spool (ohne Lock kopiert) oder, falls inzwischen geschrieben, frisch
+                    spooled_at, fresh_at = np.full(count, -1, np.int64), np.full(count, -1, np.int64)
+                    spooled_at[copied], fresh_at[changed] = np.arange(len(copied)), np.arange(len(changed))
+                    rows = max(1, CHUNK // row_bytes)
+                    for i in range(0, len(slots), rows):
+                        block = slots[i:i + rows]
+                        part = np.empty((len(block), dim), dtype=DTYPE)
+                        from_spool, from_fresh = spooled_at[block], fresh_at[block]
+                        part[from_spool >= 0] = spooled[from_spool[from_spool >= 0]]
+                        part[from_fresh >= 0] = fresh[from_fresh[from_fresh >= 0]]
+                        out.write(part.tobytes())
+            del spooled
+            _fsynced_replace(path + ".tmp", path)
+        finally:
+            if os.path.exists(spool):
+                os.remove(spool)
+        entry = {
+            "id": name, "kind": kind, "file": os.path.basename(path), "codec": codec,
+            "created": created.isoformat(), "root": root,
+            "meta_ino": stat.st_ino, "meta_from": start, "meta_to": meta_to,
+            "count": count, "dim": dim, "slots": len(slots),
+            "bytes": os.path.getsize(path), "sha256": _sha256(path),
+        }
+        _append_manifest(target, entry)
+    return entry
+
+
+def verify(target=SNAPSHOT_DIR):
+    """Prüfsummen aller Snapshots: Liste (Eintrag, ok)."""
+    result = []
+    for entry in entries(target):
+        path = os.path.join(target, entry["file"])
+        result.append((entry, os.path.exists(path) and _sha256(path) == entry["sha256"]))
+    return result
+
+
+def prune(target=SNAPSHOT_DIR, keep=SNAPSHOT_KEEP):
+    """Behält die letzten `keep` vollen Snapshots samt ihren Inkrementen."""
+    with _target_lock(target):
+        all_entries = entries(target)
+        fulls = [i for i, e in enumerate(all_entries) if e["kind"] == "full"]
+        if len(fulls) <= keep:
+            return 0
+        cut = fulls[-keep]
+        _write_manifest(target, all_entries[cut:])
+        for entry in all_entries[:cut]:
+            try:
+                os.remove(os.path.join(target, entry["file"]))
+            except FileNotFoundError:
+                pass
+        return cut
+
+
+# --- LÖSCHEN (DSGVO) ---
+def _write_manifest(target, all_entries):
+    tmp = os.path.join(target, MANIFEST + ".tmp")
+    with open(tmp, "wb") as f:
+        f.writelines((json.dumps(e, separators=(",", ":")) + "\n").encode("utf-8") for e in all_entries)
+    _fsynced_replace(tmp, os.path.join(target, MANIFEST))
+
+
+def _scrub_file(target, entry, slots):
+    """Schreibt eine Snapshot-Datei ohne die Profildaten der Slots neu. False, wenn sie keine enthält."""
+    path = os.path.join(target, entry["file"])
+    with open(path, "rb") as raw, _decompressor(raw, entry["codec"]) as f:
+        head = _read_line(f)
+        header = json.loads(head)
+        lines = _read_exact(f, header["meta_bytes"]).splitlines(keepends=True)
+        entries_in = [(i, json.loads(line)) for i, line in enumerate(lines) if line.strip()]
+        hit = [i for i, entry in entries_in if entry["slot"] in slots and not is_scrubbed(entry)]
+        if not hit:
+            return False   # nur Kopf und Meta gelesen, der Rest der Datei bleibt unangetastet
+        for i in hit:
+            lines[i] = scrubbed_line(lines[i])
+        saved = np.frombuffer(_read_exact(f, header["slots"] * 8), dtype=np.int64)
+        wiped = np.isin(saved, np.fromiter(slots, dtype=np.int64))
+        row_bytes = header["dim"] * np.dtype(DTYPE).itemsize
+        rows = max(1, CHUNK // row_bytes)
+        with open(path + ".tmp", "wb") as out_raw:
+            with _compressor(out_raw, entry["codec"]) as out:
+                out.write(head)
+                out.write(b"".join(lines))
+                out.write(saved.tobytes())
+                for i in range(0, len(saved), rows):
+                    block = np.frombuffer(_read_exact(f, min(rows, len(saved) - i) * row_bytes), dtype=DTYPE)
+                    block = block.reshape(-1, header["dim"]).copy()
+                    block[wiped[i:i + rows]] = 0
+                    out.write(block.tobytes())
+    _fsynced_replace(path + ".tmp", path)
+    entry["bytes"], entry["sha256"] = os.path.getsize(path), _sha256(path)
+    return True
+
+
+def purge(store, target=SNAPSHOT_DIR):
+    """Entfernt gelöschte Profile aus meta.jsonl und allen Snapshots des Stores. Liefert die Anzahl Slots.
+
+    Erst wenn beides bereinigt ist, verlassen die Slots purge.pending – ein Abbruch wird beim nächsten Lauf
+    wiederholt (bereits überschriebene Zeilen erkennt is_scrubbed, die Datei wird dann nicht mehr angefasst).
+    """
+    root = os.path.abspath(store.root)
+    with _target_lock(target):
+        slots = store.pending_purge()
+        if not slots:
+            return 0
+        store.scrub(slots)
+        all_entries = entries(target)
+        wanted = set(slots)
+        changed = [entry for entry in all_entries
+                   if entry["root"] == root and os.path.exists(os.path.join(target, entry["file"]))
+                   and _scrub_file(target, entry, wanted)]
+        if changed:
+            _write_manifest(target, all_entries)
+        store.purged(slots)
+    return len(slots)
+
+
+def purge_all(root=STORE_DIR, target=SNAPSHOT_DIR):
+    """purge() für die Profile und ihre Abschnitts-Vektoren."""
+    return sum(purge(ProfileStore(path), dest) for path, dest in _stores(root, target))
+
+
+def _stores(root, target):
+    """(Store-Ordner, Ziel) in Sicherungs-Reihenfolge: erst die Profile, dann ihre Abschnitts-Vektoren."""
+    return [(root, target), (os.path.join(root, CHUNK_DIR), os.path.join(target, CHUNK_DIR))]
+
+
+# --- WIEDERHERSTELLEN ---
+def restore(dest, target=SNAPSHOT_DIR, until=None):
+    """Stellt den Stand zum Zeitpunkt `until` (ISO, Standard: neuester) als Store in `dest` wieder her.
+
+    `dest` darf nicht existieren oder muss leer sein; aufgebaut wird in dest.restore.tmp, dann umbenannt.
+    Schlüssel-Index und gemeinsame Matrix baut der Store beim ersten Zugriff selbst neu auf.
+    """
+    chain = _chain(entries(target), until)
+    if not chain:
+        raise FileNotFoundError(f"Kein Snapshot in '{target}'" + (f" bis {until}" if until else "") + ".")
+    if os.path.isdir(dest) and os.listdir(dest):
+        raise FileExistsError(f"'{dest}' ist nicht leer.")
+    tmp = dest.rstrip(os.sep) + ".restore.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    dim = chain[-1]["dim"]
+    row_bytes = dim * np.dtype(DTYPE).itemsize
+    try:
+        with open(os.path.join(tmp, "meta.jsonl"), "wb") as meta_out, \
+                open(os.path.join(tmp, VECTOR_FILE), "wb") as vector_out:
+            for entry in chain:
+                path = os.path.join(target, entry["file"])
+                if _sha256(path) != entry["sha256"]:
+                    raise ValueError(f"Prüfsumme falsch: {entry['file']}")
+                with open(path, "rb") as raw, _decompressor(raw, entry["codec"]) as f:
+                    header = json.loads(_read_line(f))
+                    meta_out.write(_read_exact(f, header["meta_bytes"]))
+                    slots = np.frombuffer(_read_exact(f, header["slots"] * 8), dtype=np.int64)
+                    contiguous = len(slots) and slots[-1] - slots[0] + 1 == len(slots)
+                    if contiguous:
+                        vector_out.seek(int(slots[0]) * row_bytes)
+                        remaining = len(slots) * row_bytes
+                        while remaining:
+                            block = _read_exact(f, min(CHUNK, remaining))
+                            vector_out.write(block)
+                            remaining -= len(block)
+                    else:
+                        for slot in slots:
+                            vector_out.seek(int(slot) * row_bytes)
+                            vector_out.write(_read_exact(f, row_bytes))
+            vector_out.truncate(chain[-1]["count"] * row_bytes)
+            for f in (meta_out, vector_out):
+                f.flush()
+                os.fsync(f.fileno())
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    # Manifest unverändert aus dem jüngsten Snapshot (ältere ohne: Standard-Spalte, kein Raum)
+    manifest = header.get("manifest") or {"version": 1, "dim": dim, "dtype": "float32"}
+    if manifest.get("vectors", VECTOR_FILE) != VECTOR_FILE:
+        os.replace(os.path.join(tmp, VECTOR_FILE), os.path.join(tmp, manifest["vectors"]))
+    with open(os.path.join(tmp, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    if os.path.isdir(dest):
+        os.rmdir(dest)
+    os.replace(tmp, dest)
+    return chain[-1]
+
+
+def restore_all(dest, target=SNAPSHOT_DIR, until=None):
+    """restore() samt Abschnitts-Vektoren: deren erster Snapshot nach dem Profil-Stand deckt alle Sets ab."""
+    entry = restore(dest, target, until)
+    chunk_target = os.path.join(target, CHUNK_DIR)
+    chunk_entries = entries(chunk_target)
+    if chunk_entries:
+        later = [e["created"] for e in chunk_entries if e["created"] >= entry["created"]]
+        restore(os.path.join(dest, CHUNK_DIR), chunk_target, later[0] if later else None)
+    return entry
+
+
+# --- HINTERGRUND ---
+class Snapshotter:
+    """Hintergrund-Thread: alle `interval` Sekunden ein Snapshot (meist inkrementell), sofort nach trigger().
+
+    Vor jedem Snapshot werden gelöschte Profile bereinigt (purge), nach einer Löschung also sofort per trigger().
+    """
+
+    def __init__(self, root=STORE_DIR, target=SNAPSHOT_DIR, interval=SNAPSHOT_INTERVAL, keep=SNAPSHOT_KEEP):
+        # eigene Instanzen: der Thread teilt keinen Zustand mit der Seite
+        self.stores = [(ProfileStore(path), dest) for path, dest in _stores(root, target)]
+        self.target = target
+        self.interval = interval
+        self.keep = keep
+        self.last = None
+        self.error = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._worker = threading.Thread(target=self._run, name="snapshotter", daemon=True)
+        self._worker.start()
+
+    def trigger(self):
+        self._wake.set()
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        self._wake.set()
+        self._worker.join(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                for i, (store, target) in enumerate(self.stores):
+                    with METRICS.stage("snapshot"):
+                        purged = purge(store, target)
+                        entry = snapshot(store, target)
+                        prune(target, self.keep)
+                    if purged:
+                        METRICS.count("purged_slots", purged)
+                    if entry:
+                        METRICS.count("snapshots")
+                        if i == 0:
+                            self.last = entry
+                self.error = None
+            except Exception as e:   # der Thread darf nie sterben, der Fehler landet im Admin-Panel
+                self.error = e
+                METRICS.count("snapshot_errors")
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+
+def snapshotter_from_env(root=STORE_DIR):
+    """Snapshotter laut AIM_SNAPSHOT_* oder None, wenn AIM_SNAPSHOT_INTERVAL=0."""
+    return Snapshotter(root) if SNAPSHOT_INTERVAL > 0 else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Snapshots des Profil-Stores")
+    parser.add_argument("command", choices=["snapshot", "list", "verify", "purge", "restore"])
+    parser.add_argument("dest", nargs="?", help="Zielordner für restore")
+    parser.add_argument("--root", default=STORE_DIR)
+    parser.add_argument("--target", default=SNAPSHOT_DIR)
+    parser.add_argument("--full", action="store_true")
+    parser.add_argument("--until", default=None, help="ISO-Zeitpunkt, z.B. 2026-10-17T12:00")
+    args = parser.parse_args()
+
+    if args.command == "snapshot":
+        for root, target in _stores(args.root, args.target):
+            entry = snapshot(ProfileStore(root), target, full=args.full)
+            if entry is None:
+                print(f"✅ {root}: nichts Neues seit dem letzten Snapshot.")
+            else:
+                print(f"💾 {entry['kind']} -> '{entry['file']}' ({entry['slots']} Slots, {entry['bytes'] / 1024:.0f} KB)")
+    elif args.command == "list":
+        for entry in entries(args.target):
+            print(f"{entry['created']}  {entry['kind']:<11}  {entry['count']:>8} Profile  "
+                  f"{entry['bytes'] / 1024:>8.0f} KB  {entry['file']}")
+    elif args.command == "purge":
+        print(f"🧽 {purge_all(args.root, args.target)} gelöschte Slots aus Store und Snapshots entfernt.")
+    elif args.command == "verify":
+        results = verify(args.target)
+        for entry, ok in results:
+            print(f"{'✅' if ok else '❌'} {entry['file']}")
+        if not all(ok for _, ok in results):
+            raise SystemExit(1)
+    else:
+        if not args.dest:
+            parser.error("restore braucht einen Zielordner")
+        entry = restore_all(args.dest, args.target, args.until)
+        print(f"✅ Stand vom {entry['created']} ({entry['count']} Profile) nach '{args.dest}' wiederhergestellt.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import warm_start
+from live_index import LiveIndex
+from matching import SharedMatchingIndex
+from profile_store import STORE_DIR, ProfileStore
+from version import VERSION, VERSION_VIBE
+
+# --- STARTUP-PROFIL ---
+# Wo geht beim Aufwachen der App (CAX11, Streamlit Cloud) die Zeit hin?
+#   1. Import-Zeit: `python -X importtime -c "import app"` in einem frischen Prozess,
+#      je direktem Import von app.py (kumulativ) plus die schweren Pakete, die trotzdem geladen wurden
+#      (plotly, openai, telebot, psutil, cryptography, sklearn, zstandard sollten erst bei Bedarf kommen –
+#      was schon `import streamlit` selbst lädt (z.B. plotly fürs Chart-Theme), zählt nicht)
+#   2. Index-Start: LiveIndex kalt (meta.jsonl parsen) gegen Warm-Start (warm_start.py, mmap),
+#      jeweils inklusive der ersten Anfrage; gemessen auf einer Kopie des Stores
+#   python startup_profile.py [--module app] [--root profiles_store] [--top 15] [--json startup.json]
+
+LAZY_PACKAGES = ("plotly", "openai", "telebot", "psutil", "cryptography", "sklearn", "joblib", "zstandard")
+
+
+def _entries(stderr):
+    """(Tiefe, Paket, self ms, kumulativ ms) je Zeile von -X importtime (Einrückung: zwei Leerzeichen pro Ebene)."""
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line.split(":", 1)[1].split("|")
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        yield depth, name.strip(), int(self_us) / 1000, int(cumulative_us) / 1000
+
+
+def _importtime(module):
+    """(Einträge, ok) von -X importtime für `import module` in einem frischen Prozess."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    return list(_entries(result.stderr)), result.returncode == 0
+
+
+def _packages(entries):
+    return {name.split(".")[0] for _, name, _, _ in entries}
+
+
+def import_report(module="app", top=15, baseline="streamlit"):
+    """Import-Zeiten von `module` in einem frischen Prozess (nichts im Page-Cache des Interpreters).
+
+    `lazy_loaded`: schwere Pakete, die `module` lädt, obwohl `import baseline` allein sie nicht lädt.
+    """
+    entries, ok = _importtime(module)
+    total = sum(cumulative for depth, _, _, cumulative in entries if depth == 0)
+    direct = sorted(((name, cumulative) for depth, name, _, cumulative in entries if depth == 1),
+                    key=lambda item: -item[1])
+    loaded = _packages(entries) & set(LAZY_PACKAGES)
+    if baseline and loaded:
+        loaded -= _packages(_importtime(baseline)[0])
+    return {"module": module, "ok": ok, "total_ms": total,
+            "direct_ms": dict(direct[:top]), "lazy_loaded": sorted(loaded)}
+
+
+def _timed(func):
+    t0 = time.perf_counter()
+    result = func()
+    return result, (time.perf_counter() - t0) * 1000
+
+
+def index_report(root=STORE_DIR, k=5):
+    """Kaltstart gegen Warm-Start des LiveIndex (Start + erste Anfrage) auf einer Kopie von `root`."""
+    if not os.path.exists(os.path.join(root, "meta.jsonl")):
+        return None
+    workdir = tempfile.mkdtemp(prefix="aim_startup_")
+    try:
+        copy = os.path.join(workdir, "store")
+        shutil.copytree(root, copy, ignore=shutil.ignore_patterns(warm_start.WARM_FILE, ".lock"))
+        query = np.asarray(ProfileStore(copy).vectors()[0])
+        report = {"profiles": len(ProfileStore(copy))}
+        for name, warm in (("cold", False), ("warm", True)):
+            if warm:
+                warm_start.build(ProfileStore(copy))
+            live, start_ms = _timed(lambda: LiveIndex(ProfileStore(copy), build=SharedMatchingIndex.from_store,
+                                                      shared=True, warm=warm))
+            hits, query_ms = _timed(lambda: live.query(query, k=k))
+            _, record_ms = _timed(lambda: [live.store.record(slot) for slot, _ in hits])
+            report[name] = {"start_ms": start_ms, "first_query_ms": query_ms, "records_ms": record_ms}
+        return report
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup-Profil der App (Imports + Index-Start)")
+    parser.add_argument("--module", default="app")
+    parser.add_argument("--root", default=STORE_DIR)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--json", default=None, help="Ergebnis zusätzlich als JSON speichern")
+    args = parser.parse_args()
+
+    imports = import_report(args.module, args.top)
+    print(f"⏱️ Startup-Profil {VERSION} ({VERSION_VIBE})")
+    print(f"\nImport von '{args.module}': {imports['total_ms']:.0f} ms" + ("" if imports["ok"] else " (mit Fehler)"))
+    for name, ms in imports["direct_ms"].items():
+        print(f"  {name:<28} {ms:>8.1f} ms")
+    if imports["lazy_loaded"]:
+        print(f"⚠️ Beim Start geladen, obwohl erst bei Bedarf gebraucht: {', '.join(imports['lazy_loaded'])}")
+    else:
+        print("✅ Keine der schweren Bibliotheken wird beim Start geladen.")
+
+    index = index_report(args.root)
+    if index is None:
+        print(f"\nKein Store in '{args.root}' – Index-Start übersprungen.")
+    else:
+        print(f"\nIndex-Start ({index['profiles']} Profile):")
+        for name in ("cold", "warm"):
+            r = index[name]
+            print(f"  {name:<5} Start {r['start_ms']:>8.1f} ms · erste Anfrage {r['first_query_ms']:>7.1f} ms"
+                  f" · Treffer-Metadaten {r['records_ms']:>6.1f} ms")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"version": VERSION, "vibe": VERSION_VIBE, "imports": imports, "index": index}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import hashlib
+import re
+import time
+from types import SimpleNamespace
+import numpy as np
+from generate_test_data import ARCHETYPES, CITIES, GENDERS, SEARCH_OPTIONS
+from crypto_layer import load_region_key
+from matching import normalize_rows
+from sharding import region_hash
+
+# --- SYNTHETISCHE PROFILE & FAKE-EMBEDDER (OFFLINE) ---
+# Last erzeugen ohne Netzwerk: Metadaten mit denselben Verteilungen wie
+# generate_test_data.py, Vektoren als Cluster um die Archetypen herum.
+# FakeEmbeddingClient spricht dieselbe Schnittstelle wie client.embeddings.create
+# und ist deterministisch – gleicher Text, gleicher Vektor.
+
+DIM = 1536
+CHUNK = 50_000   # Profile pro Block beim Erzeugen (begrenzt den RAM auch bei 1M)
+OFFLINE_REGION_KEY = b"aim-synthetic-region"   # nur ohne Secrets: Benchmarks laufen auch ohne ENCRYPTION_KEY
+
+
+def clustered_vectors(n, dim=DIM, n_clusters=64, spread=0.6, seed=0):
+    """Normierte Vektoren um zufällige Zentren – echte Embeddings sind ebenfalls geclustert."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_clusters, dim), dtype=np.float32)
+    labels = rng.integers(0, n_clusters, n)
+    noise = rng.standard_normal((n, dim), dtype=np.float32) * spread
+    return normalize_rows(centers[labels] + noise)
+
+
+def synthetic_region_key():
+    """Regions-Key der App (crypto_layer), ohne Secrets ein fester Offline-Key."""
+    try:
+        return load_region_key()
+    except RuntimeError:
+        return OFFLINE_REGION_KEY
+
+
+def generate_profiles(n, dim=DIM, seed=0, chunk=CHUNK, region_key=None):
+    """Erzeugt n Profile blockweise (Generator), im Format des ProfileStore."""
+    key = region_key or synthetic_region_key()
+    regions = {city: region_hash(city, key) for city in CITIES}   # 7 Städte: einmal hashen statt pro Profil
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((len(ARCHETYPES), dim), dtype=np.float32)
+    for start in range(0, n, chunk):
+        size = min(chunk, n - start)
+        archetype = rng.integers(0, len(ARCHETYPES), size)
+        noise = rng.standard_normal((size, dim), dtype=np.float32) * 0.8
+        vectors = normalize_rows(centers[archetype] + noise)
+        genders = rng.choice(GENDERS, size)
+        searches = rng.choice(SEARCH_OPTIONS, size)
+        locs = rng.choice(CITIES, size)
+        for j in range(size):
+            i = start + j
+            base = ARCHETYPES[archetype[j]]
+            yield {
+                "id": f"synth_{i}",
+                "name": f"{base['name']} #{i + 1}",
+                "gender": str(genders[j]),
+                "search": str(searches[j]),
+                "loc": str(locs[j]),
+                "region": regions[locs[j]],
+                "type": "synthetic",
+                "manifesto": base["bio"],
+                "vector": vectors[j],
+                "timestamp": "2025-12-26T21:00:00",
+            }
+
+
+# --- FAKE-EMBEDDER ---
+def _token_vector(token, dim):
+    seed = int.from_bytes(hashlib.sha256(token.encode("utf-8")).digest()[:8], "little")
+    return np.random.default_rng(seed).standard_normal(dim, dtype=np.float32)
+
+
+def fake_embedding(text, dim=DIM):
+    """Deterministisch: Summe fester Zufallsvektoren pro Wort, normiert.
+
+    Texte mit gemeinsamen Wörtern landen nah beieinander – genug Struktur für Benchmarks.
+    """
+    tokens = re.findall(r"\w+", text.lower()) or [""]
+    vector = np.sum([_token_vector(t, dim) for t in tokens], axis=0)
+    return normalize_rows(vector).tolist()
+
+
+class FakeEmbeddingClient:
+    """Drop-in für OpenAI() bei embed_texts – ohne Netzwerk, optional mit Latenz."""
+
+    def __init__(self, dim=DIM, latency=0.0):
+        self.dim = dim
+        self.latency = latency
+        self.requests = 0
+        self.embeddings = SimpleNamespace(create=self._create)
+
+    def _create(self, input, model=None, dimensions=None):
+        self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        texts = [input] if isinstance(input, str) else list(input)
+        dim = dimensions or self.dim
+        data = [SimpleNamespace(index=i, embedding=fake_embedding(t, dim)) for i, t in enumerate(texts)]
+        return SimpleNamespace(data=data)
@@ -0,0 +1,22 @@
+import os
+import sys
+import tempfile
+import numpy as np
+import pytest
+
+# Module liegen flach im Repo-Wurzelordner; Zähler der Tests nicht in die echte aim_counters.sqlite
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("AIM_COUNTER_PATH", os.path.join(tempfile.mkdtemp(prefix="aim-tests-"), "counters.sqlite"))
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(0)
+
+
+def profiles(rng, n, dim=16, start=0):
+    """n Profile im Format des ProfileStore, mit Klartext-Feldern wie aus generate_test_data.py."""
+    vectors = rng.standard_normal((n, dim)).astype(np.float32)
+    return [{"name": f"p{start + i}", "manifesto": f"manifest {start + i}", "gender": "mw"[i % 2],
+             "search": "Freunde (egal)", "vibe_key_hash": f"key{start + i}", "vector": vectors[i]}
+            for i in range(n)]
@@ -0,0 +1,59 @@
+import threading
+import time
+import embedding_cache
+from embedding_cache import EmbeddingCache
+
+
+def test_put_get_and_hit_rate(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"), max_entries=10)
+    assert cache.get("a") is None
+    cache.put_many([("a", [1.0, 2.0]), ("b", [3.0, 4.0])])
+    cache.put("a", [5.0, 6.0])
+    assert cache.get("a") == [5.0, 6.0]
+    assert cache.stats() == {"entries": 2, "hits": 1, "misses": 1, "hit_rate": 0.5}
+
+
+def test_eviction_drops_least_recently_used_in_batches(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"), max_entries=20)
+    cache.evict_batch = 5
+    for i in range(20):
+        cache.put(f"k{i}", [float(i)])
+    cache.get("k0")
+    cache.put("k0", [0.0])   # schreibt auch den gesammelten Treffer
+    cache.put("k20", [20.0])
+
+    assert len(cache) == 15   # 21 - (Überlauf 1 + Vorrat 5)
+    assert cache.get("k0") == [0.0]
+    assert cache.get("k1") is None
+    assert cache.get("k20") == [20.0]
+
+
+def test_lru_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    first = EmbeddingCache(path, max_entries=3)
+    first.evict_batch = 1
+    for key in ("a", "b", "c"):
+        first.put(key, [1.0])
+    # Ein zweiter Prozess liest "a": sein Zeitstempel gilt auch für die Verdrängung im ersten
+    second = EmbeddingCache(path, max_entries=3)
+    second.get("a")
+    second.put("x", [1.0])
+    first.put("d", [1.0])
+    assert first.get("a") == [1.0]
+    assert first.get("b") is None
+
+
+def test_get_cache_creates_one_instance(monkeypatch, tmp_path):
+    def slow_cache():
+        time.sleep(0.01)   # gleichzeitige erste Aufrufe überlappen sicher
+        return EmbeddingCache(str(tmp_path / "cache.sqlite"))
+
+    monkeypatch.setattr(embedding_cache, "_shared", None)
+    monkeypatch.setattr(embedding_cache, "EmbeddingCache", slow_cache)
+    seen = []
+    threads = [threading.Thread(target=lambda: seen.append(embedding_cache.get_cache())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({id(cache) for cache in seen}) == 1
@@ -0,0 +1,71 @@
+import numpy as np
+from ann_index import ANN_MIN_PROFILES, IVFIndex
+from conftest import profiles
+from live_index import LiveIndex
+from matching import normalize_rows
+from profile_store import ProfileStore
+
+
+def exact(vectors, query, k, alive=None):
+    scores = normalize_rows(vectors) @ normalize_rows(query).ravel()
+    if alive is not None:
+        scores = np.where(alive, scores, -np.inf)
+    return list(np.argsort(-scores, kind="stable")[:k])
+
+
+def test_ivf_with_all_lists_is_exact(rng):
+    vectors = rng.standard_normal((400, 16)).astype(np.float32)
+    index = IVFIndex.train(vectors, n_lists=8)
+    index.nprobe = index.n_lists
+    for query in rng.standard_normal((5, 16)):
+        ids, _ = index.search(query, k=10)
+        assert list(ids) == exact(vectors, query, 10)
+
+
+def test_ivf_update_and_remove_match_exact(rng):
+    vectors = rng.standard_normal((300, 16)).astype(np.float32)
+    index = IVFIndex.train(vectors, n_lists=8)
+    index.nprobe = index.n_lists
+    moved = np.arange(0, 300, 7)
+    vectors[moved] = rng.standard_normal((len(moved), 16))
+    index.update(moved, vectors[moved])
+    index.remove([5, 6])
+    alive = np.ones(300, dtype=bool)
+    alive[[5, 6]] = False
+
+    assert len(index) == 298
+    query = vectors[14]
+    ids, _ = index.search(query, k=10)
+    assert list(ids) == exact(vectors, query, 10, alive)
+
+
+def test_live_index_ann_agrees_with_exact_search(tmp_path, rng):
+    store = ProfileStore(str(tmp_path / "store"))
+    store.extend(profiles(rng, ANN_MIN_PROFILES + 50))
+    live = LiveIndex(store)
+    assert live.ann is not None
+    live.ann.nprobe = live.ann.n_lists
+
+    query = rng.standard_normal(16)
+    assert live.query(query, k=10) == live.index.query(query, k=10)
+
+    # Bearbeitet, gelöscht und angehängt: Index und IVF folgen dem Store ohne Neuaufbau
+    live.update(3, {"vector": query})
+    top = live.query(query, k=1)[0][0]
+    live.delete(top)
+    live.add(profiles(rng, 5, start=ANN_MIN_PROFILES + 50))
+    result = live.query(query, k=10)
+    assert top not in [slot for slot, _ in result]
+    assert result == live.index.query(query, k=10)
+    assert len(live.index) == len(store) == ANN_MIN_PROFILES + 55
+
+
+def test_live_index_picks_up_writes_of_other_processes(tmp_path, rng):
+    live = LiveIndex(ProfileStore(str(tmp_path / "store")))
+    other = ProfileStore(str(tmp_path / "store"))
+    other.extend(profiles(rng, 4))
+    other.delete(1)
+
+    live.refresh()
+    assert len(live.index) == 4
+    assert 1 not in [slot for slot, _ in live.query(other.vectors()[2], k=4)]
@@ -0,0 +1,86 @@
+import json
+import numpy as np
+import pytest
+from conftest import profiles
+from profile_store import ProfileStore
+
+
+def test_extend_assigns_slots_and_persists(tmp_path, rng):
+    store = ProfileStore(str(tmp_path / "store"))
+    records = profiles(rng, 5)
+    assert store.extend(records[:3]) == [0, 1, 2]
+    assert store.extend(records[3:]) == [3, 4]
+
+    reopened = ProfileStore(store.root)
+    assert len(reopened) == 5
+    assert reopened.record(4)["name"] == "p4"
+    np.testing.assert_allclose(reopened.vectors(), np.stack([r["vector"] for r in records]))
+    assert reopened.lookup("key2") == 2
+
+
+def test_extend_sees_slots_of_other_instances(tmp_path, rng):
+    a, b = ProfileStore(str(tmp_path / "store")), ProfileStore(str(tmp_path / "store"))
+    a.extend(profiles(rng, 2))
+    assert b.extend(profiles(rng, 2, start=2)) == [2, 3]
+    assert a.refresh()[-1]["slot"] == 3
+
+
+def test_update_replaces_vector_and_keeps_slot(tmp_path, rng):
+    store = ProfileStore(str(tmp_path / "store"))
+    store.extend(profiles(rng, 3))
+    vector = np.ones(16, dtype=np.float32)
+    store.update(1, {"manifesto": "neu", "vibe_key_hash": "other", "vector": vector})
+
+    reopened = ProfileStore(store.root)
+    assert len(reopened) == 3
+    assert reopened.record(1)["manifesto"] == "neu"
+    np.testing.assert_array_equal(reopened.vectors()[1], vector)
+    assert reopened.lookup("key1") is None
+    assert reopened.lookup("other") == 1
+    assert reopened.stale_lines() == 1
+
+
+def test_delete_tombstones_and_queues_purge(tmp_path, rng):
+    store = ProfileStore(str(tmp_path / "store"))
+    store.extend(profiles(rng, 3))
+    store.delete(0)
+
+    reopened = ProfileStore(store.root)
+    assert reopened.record(0)["deleted"]
+    assert not reopened.vectors()[0].any()
+    assert reopened.lookup("key0") is None
+    assert reopened.pending_purge() == [0]
+    with pytest.raises(KeyError):
+        reopened.update(0, {"manifesto": "zu spät"})
+
+
+def test_scrub_overwrites_old_lines_in_place(tmp_path, rng):
+    store = ProfileStore(str(tmp_path / "store"))
+    store.extend(profiles(rng, 3))
+    store.update(1, {"manifesto": "geheim"})
+    store.delete(1)
+    size = (tmp_path / "store" / "meta.jsonl").stat().st_size
+
+    assert store.scrub([1]) == 2
+    raw = (tmp_path / "store" / "meta.jsonl").read_bytes()
+    assert len(raw) == size
+    assert b"geheim" not in raw and b"manifest 1" not in raw
+    assert b"manifest 2" in raw
+    assert ProfileStore(store.root).record(1)["deleted"]
+
+
+def test_compact_keeps_one_line_per_slot(tmp_path, rng):
+    store = ProfileStore(str(tmp_path / "store"))
+    store.extend(profiles(rng, 4))
+    for i in range(3):
+        store.update(2, {"manifesto": f"v{i}"})
+    store.delete(3)
+    before = [dict(r) for r in store.records()]
+
+    store.compact()
+    lines = (tmp_path / "store" / "meta.jsonl").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["slot"] for line in lines] == [0, 1, 2, 3]
+    reopened = ProfileStore(store.root)
+    assert reopened.records() == before
+    assert reopened.stale_lines() == 0
+    assert reopened.lookup("key2") == 2
@@ -0,0 +1,64 @@
+import threading
+import time
+import pytest
+from rate_limit import RateLimiter, SingleFlight
+
+
+def test_rate_limiter_allows_capacity_then_denies(tmp_path):
+    limiter = RateLimiter(str(tmp_path / "limits.sqlite"), capacity=3, period=3600)
+    assert [limiter.acquire(["session"])[0] for _ in range(3)] == [True] * 3
+    allowed, retry_after = limiter.acquire(["session"])
+    assert not allowed
+    assert 0 < retry_after <= 1200
+    assert limiter.acquire(["other"])[0]
+
+
+def test_rate_limiter_is_all_or_nothing_and_shared(tmp_path):
+    path = str(tmp_path / "limits.sqlite")
+    first = RateLimiter(path, capacity=1, period=3600)
+    assert first.acquire(["session-a", "vibe"])[0]
+    # zweiter Prozess auf derselben Datei: "vibe" ist leer, also bleibt auch "session-b" unangetastet
+    second = RateLimiter(path, capacity=1, period=3600)
+    assert not second.acquire(["session-b", "vibe"])[0]
+    assert second.remaining("session-b") == pytest.approx(1.0)
+
+
+def test_rate_limiter_refills(tmp_path):
+    limiter = RateLimiter(str(tmp_path / "limits.sqlite"), capacity=1, period=0.2)
+    assert limiter.acquire(["k"])[0]
+    assert not limiter.acquire(["k"])[0]
+    time.sleep(0.25)
+    assert limiter.acquire(["k"])[0]
+
+
+def test_single_flight_shares_one_call():
+    flight, calls, started = SingleFlight(), [], threading.Event()
+    release = threading.Event()
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "vektor"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("text", slow)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flight.do("text", slow))) for _ in range(4)]
+    for thread in followers:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join(5)
+    assert results == ["vektor"] * 5
+    assert len(calls) == 1
+    assert flight.do("text", lambda: "neu") == "neu"   # danach wieder ein eigener Aufruf
+
+
+def test_single_flight_raises_and_forgets_the_key():
+    flight = SingleFlight()
+    with pytest.raises(ValueError):
+        flight.do("key", lambda: (_ for _ in ()).throw(ValueError("kaputt")))
+    assert flight.do("key", lambda: 1) == 1
@@ -0,0 +1,66 @@
+import hashlib
+import numpy as np
+import pytest
+import reembed
+from conftest import profiles
+from embedding_backends import EmbeddingBackend
+from live_index import LiveIndex
+from matching import SharedMatchingIndex
+from profile_store import ProfileStore, SpaceChanged
+
+
+class HashBackend(EmbeddingBackend):
+    """Deterministisch und offline; `fail_after` Aufrufe, danach ein Fehler (Absturz mitten im Lauf)."""
+
+    name = "test"
+
+    def __init__(self, dim=8, fail_after=None):
+        super().__init__("hash", dim)
+        self.fail_after = fail_after
+        self.texts = []
+
+    def embed(self, texts):
+        if self.fail_after is not None and len(self.texts) >= self.fail_after:
+            raise RuntimeError("Verbindung verloren")
+        self.texts += texts
+        return [np.random.default_rng(int.from_bytes(hashlib.sha256(t.encode()).digest()[:8], "little"))
+                .standard_normal(self.dim).tolist() for t in texts]
+
+
+@pytest.fixture
+def store(tmp_path, rng):
+    store = ProfileStore(str(tmp_path / "store"))
+    store.extend(profiles(rng, 12))
+    return store
+
+
+def test_run_resumes_after_a_crash(store, monkeypatch):
+    monkeypatch.setattr(reembed, "CHECKPOINT_EVERY", 1)
+    crashing = HashBackend(fail_after=5)
+    with pytest.raises(RuntimeError):
+        reembed.run(store.root, crashing, batch=2, workers=1, log=lambda *a: None)
+
+    backend = HashBackend()
+    counts = reembed.run(store.root, backend, batch=2, workers=1, log=lambda *a: None)
+    assert counts["done"] == 12
+    # Ohne den Probe-Text des ersten Laufs: jedes Manifest genau einmal, fertige Batches nicht wiederholt
+    assert crashing.texts[1:] and backend.texts
+    assert sorted(crashing.texts[1:] + backend.texts) == sorted(f"manifest {i}" for i in range(12))
+
+
+def test_switch_embeds_late_edits_and_changes_the_space(store):
+    live = LiveIndex(ProfileStore(store.root), build=SharedMatchingIndex.from_store, shared=True)
+    backend = HashBackend()
+    reembed.run(store.root, backend, log=lambda *a: None)
+    store.update(3, {"manifesto": "nach dem Lauf geändert"})
+
+    reembed.switch(store.root, backend, log=lambda *a: None)
+    live.refresh()
+    assert live.store.dim == backend.dim
+    assert live.store.embedding["space"] == backend.space
+    expected = np.asarray(backend.embed(["nach dem Lauf geändert"])[0], dtype=np.float32)
+    np.testing.assert_allclose(live.store.vectors()[3], expected / np.linalg.norm(expected), rtol=1e-5)
+    assert all(r["embedding_space"] == backend.space for r in live.store.records())
+
+    with pytest.raises(SpaceChanged):
+        ProfileStore(store.root).extend(profiles(np.random.default_rng(1), 1))   # alte Dimension
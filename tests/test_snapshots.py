@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+import snapshots
+from conftest import profiles
+from profile_store import ProfileStore
+
+
+def assert_same(restored, store):
+    assert restored.records() == store.records()
+    np.testing.assert_array_equal(restored.vectors(), store.vectors())
+
+
+def test_full_and_incremental_round_trip(tmp_path, rng):
+    store = ProfileStore(str(tmp_path / "store"))
+    target = str(tmp_path / "snaps")
+    store.extend(profiles(rng, 20))
+    assert snapshots.snapshot(store, target, codec="gzip")["kind"] == "full"
+    store.update(4, {"manifesto": "neu", "vector": np.ones(16, dtype=np.float32)})
+    store.extend(profiles(rng, 3, start=20))
+    assert snapshots.snapshot(store, target, codec="gzip")["kind"] == "incremental"
+    assert snapshots.snapshot(store, target, codec="gzip") is None   # nichts Neues
+
+    assert all(ok for _, ok in snapshots.verify(target))
+    snapshots.restore(str(tmp_path / "restored"), target)
+    assert_same(ProfileStore(str(tmp_path / "restored")), store)
+
+
+def test_restore_until_and_non_empty_destination(tmp_path, rng):
+    store = ProfileStore(str(tmp_path / "store"))
+    target = str(tmp_path / "snaps")
+    store.extend(profiles(rng, 5))
+    first = snapshots.snapshot(store, target, codec="gzip")
+    store.extend(profiles(rng, 5, start=5))
+    snapshots.snapshot(store, target, codec="gzip")
+
+    snapshots.restore(str(tmp_path / "old"), target, until=first["created"])
+    assert len(ProfileStore(str(tmp_path / "old"))) == 5
+    with pytest.raises(FileExistsError):
+        snapshots.restore(str(tmp_path / "old"), target)
+
+
+def test_purge_removes_deleted_profile_from_snapshots(tmp_path, rng):
+    store = ProfileStore(str(tmp_path / "store"))
+    target = str(tmp_path / "snaps")
+    store.extend(profiles(rng, 6))
+    snapshots.snapshot(store, target, codec="gzip")
+    store.delete(2)
+
+    assert snapshots.purge(store, target) == 1
+    assert store.pending_purge() == []
+    assert all(ok for _, ok in snapshots.verify(target))
+    snapshots.restore(str(tmp_path / "restored"), target)
+    restored = ProfileStore(str(tmp_path / "restored"))
+    assert restored.record(2)["deleted"]
+    assert not restored.vectors()[2].any()
+    assert restored.record(3)["manifesto"] == "manifest 3"
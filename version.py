@@ -0,0 +1,4 @@
+# --- VERSIONEN ---
+# Zentral, damit App, Skripte und Benchmarks dieselben Stände melden.
+VERSION = "v0.4.1-ARCHITECT"
+VERSION_VIBE = "v0.4.0-AIM-VIBE"
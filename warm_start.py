@@ -0,0 +1,164 @@
+import argparse
+import datetime
+import json
+import os
+import struct
+import threading
+import numpy as np
+from crypto_layer import is_encrypted
+from matching import columns_of
+from metrics import METRICS
+from profile_store import STORE_DIR, ProfileStore
+
+# --- WARM-START ---
+# Beim Kaltstart parst der Index ganz meta.jsonl (json.loads pro Profil) und baut daraus die Filter-Spalten.
+# Der Warm-Start legt diesen Stand vorgebaut in EINE Datei im Store-Ordner, die per mmap geladen wird:
+#   AIMWARM1 | Header-Länge | Header-JSON (Stand von meta.jsonl, Vokabular je Spalte) | Tabelle
+#   Tabelle: pro Slot Byte-Offset seiner Meta-Zeile, alive und die Codes der Filter-Spalten
+# Die Vokabulare bleiben klein (Geschlechter, Räume, Regionen, Klartext-Orte): verschlüsselte Orte sind
+# pro Profil eindeutig und stehen als "" im Warm-Start – ein Orts-Filter (Klartext) trifft sie ohnehin nie.
+# Die normierte Matrix selbst liegt schon als matrix.f32 im Store (profile_store.SharedMatrix, mmap),
+# der IVF-Index als ivf_index.npz – zusammen startet der Index ohne eine einzige JSON-Zeile zu parsen.
+# Was nach dem Warm-Start angehängt wurde, holt LiveIndex wie gewohnt inkrementell nach.
+# Gebaut wird nach jedem Kaltstart im Hintergrund, oder per Hand/Cron:
+#   python warm_start.py build | info
+
+WARM_FILE = "warm_start.bin"
+MAGIC = b"AIMWARM1"
+FORMAT = 2
+ALIGN = 64
+CATEGORICAL = ("genders", "targets", "locs", "spaces", "regions")
+COLUMNS = ("genders", "targets", "locs", "spaces", "alive", "regions")   # Reihenfolge wie columns_of
+TABLE_DTYPE = np.dtype([("offset", "<i8"), ("alive", "u1")] + [(name, "<u4") for name in CATEGORICAL])
+STALE_RATIO = 0.1   # seit dem Warm-Start angehängte Meta-Bytes, ab denen er im Hintergrund neu gebaut wird
+
+_building = threading.Lock()
+last_error = None   # letzter Fehler des Hintergrund-Baus (Zähler: warm_start_errors)
+
+
+def build(store, path=None):
+    """Schreibt den Warm-Start des Stores (atomar per rename). Liefert den Header oder None bei leerem Store."""
+    path = path or os.path.join(store.root, WARM_FILE)
+    with store.frozen():
+        if not len(store) or not store.dim:
+            return None
+        records = store.records()
+        offsets, meta_pos, meta_ino, lines = store.line_offsets()
+        dim = store.dim
+    columns = dict(zip(COLUMNS, columns_of(records, loc_of=_plain_loc)))
+    table = np.zeros(len(records), dtype=TABLE_DTYPE)
+    table["offset"] = offsets
+    table["alive"] = columns["alive"]
+    vocab = {}
+    for name in CATEGORICAL:
+        values, codes = np.unique(np.asarray(columns[name], dtype=str), return_inverse=True)
+        vocab[name] = values.tolist()
+        table[name] = codes
+    header = {
+        "format": FORMAT, "count": len(records), "dim": dim, "built": datetime.datetime.now().isoformat(),
+        "meta_pos": meta_pos, "meta_ino": meta_ino, "lines": lines, "vocab": vocab,
+    }
+    raw = json.dumps(header, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    raw += b" " * (-(len(MAGIC) + 8 + len(raw)) % ALIGN)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC + struct.pack("<Q", len(raw)) + raw)
+        f.write(table.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return header
+
+
+def _plain_loc(record):
+    loc = record.get("loc", "")
+    return "" if is_encrypted(loc) else loc
+
+
+def read(path):
+    """(Header, Tabelle) – die Tabelle ist ein read-only mmap über die Datei, nichts wird kopiert."""
+    data = np.memmap(path, dtype=np.uint8, mode="r")
+    start = len(MAGIC) + 8
+    if bytes(data[:len(MAGIC)]) != MAGIC:
+        raise ValueError(f"'{path}' ist keine Warm-Start-Datei.")
+    size, = struct.unpack("<Q", bytes(data[len(MAGIC):start]))
+    header = json.loads(bytes(data[start:start + size]))
+    table = data[start + size:start + size + header["count"] * TABLE_DTYPE.itemsize].view(TABLE_DTYPE)
+    if len(table) != header["count"]:
+        raise ValueError(f"'{path}' ist unvollständig.")
+    return header, table
+
+
+def load(store, path=None):
+    """Hängt einen frisch geöffneten Store an den Warm-Start an und liefert (Filter-Spalten, Header).
+
+    None, wenn die Datei fehlt oder nicht mehr zum Store passt (kompaktiert, neu aufgebaut, andere Dimension).
+    """
+    path = path or os.path.join(store.root, WARM_FILE)
+    try:
+        header, table = read(path)
+        stat = os.stat(store.meta_path)
+    except (FileNotFoundError, ValueError):
+        return None
+    if header.get("format") != FORMAT or header["meta_ino"] != stat.st_ino \
+            or header["meta_pos"] > stat.st_size or header["dim"] != store.dim:
+        return None
+    store.attach(table["offset"], header["meta_pos"], header["meta_ino"], header["lines"])
+    columns = []
+    for name in COLUMNS:
+        if name == "alive":
+            columns.append(table["alive"].astype(bool))
+        else:
+            columns.append(np.asarray(header["vocab"][name], dtype=object)[table[name]])
+    return columns, header
+
+
+def is_stale(store, header):
+    """Wurde seit dem Warm-Start so viel angehängt, dass sich ein neuer lohnt?"""
+    try:
+        size = os.path.getsize(store.meta_path)
+    except FileNotFoundError:
+        return False
+    return size - header["meta_pos"] > STALE_RATIO * max(header["meta_pos"], 1)
+
+
+def build_in_background(root=STORE_DIR):
+    """Baut den Warm-Start in einem Daemon-Thread (eigene Store-Instanz, höchstens einer pro Prozess)."""
+    def run():
+        global last_error
+        if not _building.acquire(blocking=False):
+            return
+        try:
+            build(ProfileStore(root))
+            METRICS.count("warm_start_builds")
+        except Exception as e:   # nur ein Beschleuniger: ohne Datei startet der Index wie bisher
+            last_error = f"{type(e).__name__}: {e}"
+            METRICS.count("warm_start_errors")
+        finally:
+            _building.release()
+    threading.Thread(target=run, name="warm-start", daemon=True).start()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm-Start des Matching-Index")
+    parser.add_argument("command", choices=["build", "info"])
+    parser.add_argument("--root", default=STORE_DIR)
+    args = parser.parse_args()
+    path = os.path.join(args.root, WARM_FILE)
+
+    if args.command == "build":
+        header = build(ProfileStore(args.root))
+        if header is None:
+            print("✅ Store ist leer, nichts zu tun.")
+        else:
+            print(f"🔥 Warm-Start für {header['count']} Profile -> '{path}' ({os.path.getsize(path) / 1024:.0f} KB)")
+    else:
+        header, _ = read(path)
+        store = ProfileStore(args.root)
+        stale = " (veraltet)" if is_stale(store, header) else ""
+        print(f"{header['built']}  {header['count']} Profile  dim {header['dim']}  "
+              f"Stand bis Byte {header['meta_pos']}{stale}")
+
+
+if __name__ == "__main__":
+    main()